@@ -1,14 +1,30 @@
-from fastapi import FastAPI, Request, Form
+import json
+import sys
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request, Form, HTTPException
 import uvicorn
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, HTMLResponse
+from fastapi.responses import Response, HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import numpy as np
 
-from src.forest.constant.application import APP_HOST, APP_PORT
-from src.forest.pipeline.train_pipeline import TrainPipeline
-from src.forest.pipeline.prediction_pipeline import PredictionPipeline
+from src.forest.cloud_storage.artifact_cache import ArtifactCache
+from src.forest.constant.application import APP_HOST, APP_PORT, MODEL_SERVING_BATCH_MAX_SIZE
+from src.forest.constant.prediction_pipeline import COVER_TYPE_NAMES
+from src.forest.entity.feature_assembler import get_feature_assembler
+from src.forest.logger import logging
+from src.forest.serving.batcher import BatcherQueueFull, PredictionBatcher
+from src.forest.serving.executors import ExecutorSaturated, ServingExecutors, predict_feature_matrix
+from src.forest.serving.jobs import JOB_QUEUED, JOB_RUNNING, JobManager
+from src.forest.serving.metrics import METRICS, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, \
+    observe_stage_timings, stage_timer
+from src.forest.serving.model_holder import ModelHolder, ModelVersionWatcher
+from src.forest.serving.prediction_cache import PredictionCache
+from src.forest.serving.streaming import CSV_FORMAT, RecordChunker, StreamFormatError, iter_record_chunks, \
+    stream_format
 
 app = FastAPI()
 TEMPLATES = Jinja2Templates(directory='templates')
@@ -25,6 +41,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request counters, latency and in-flight requests per endpoint, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Thread pool for S3/MongoDB work and process pool for inference, shared by all handlers
+SERVING_EXECUTORS = ServingExecutors()
+# Local worker pool running /train and /predict pipelines in the background
+JOB_MANAGER = JobManager()
+
+@app.on_event("startup")
+async def load_serving_model():
+    SERVING_EXECUTORS.start()
+    if not SERVING_EXECUTORS.uses_processes:
+        # Load the registry model once and keep it fresh in the background;
+        # worker processes do the same for themselves when inference runs out of process
+        await SERVING_EXECUTORS.run_io(ModelHolder.default().start)
+    else:
+        # the prediction cache still needs the registry version the workers are moving to
+        await SERVING_EXECUTORS.run_io(MODEL_VERSION_WATCHER.start)
+    PREDICTION_BATCHER.start()
+
+
+@app.on_event("shutdown")
+async def stop_serving_model():
+    await PREDICTION_BATCHER.stop()
+    ModelHolder.default().stop()
+    MODEL_VERSION_WATCHER.stop()
+    SERVING_EXECUTORS.shutdown()
+    JOB_MANAGER.shutdown()
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 # Pydantic model for live prediction input
 class LivePredictionInput(BaseModel):
@@ -39,31 +88,146 @@ class LivePredictionInput(BaseModel):
     hillshade_3pm: float
     horizontal_distance_to_fire_points: float
 
+
+# Model input layout compiled once from config/schema.yaml, shared with PredictionPipeline
+FEATURE_ASSEMBLER = get_feature_assembler()
+# Predictions per assembled feature vector and model version, shared by live and batch scoring
+PREDICTION_CACHE = PredictionCache()
+# Registry version followed by this process when worker processes own the model
+MODEL_VERSION_WATCHER = ModelVersionWatcher.default()
+
+
+def served_model_version() -> Optional[str]:
+    # worker processes own the model when inference runs out of process and refresh it on their own;
+    # this process then reads the registry version itself, workers may report an older one for a while
+    if SERVING_EXECUTORS.uses_processes:
+        return MODEL_VERSION_WATCHER.version
+    return ModelHolder.default().version
+
+
+async def score_feature_matrix(matrix, path: str, use_cache: bool = True, wait_when_saturated: bool = False):
+    """
+    Score a feature matrix laid out like FEATURE_ASSEMBLER.columns on the inference executor
+    :param path: Prediction path the stage timings are recorded under
+    :param use_cache: Store the predictions in PREDICTION_CACHE
+    :param wait_when_saturated: Wait for a free executor slot instead of raising ExecutorSaturated
+    """
+    run_cpu = SERVING_EXECUTORS.run_cpu_when_free if wait_when_saturated else SERVING_EXECUTORS.run_cpu
+    with stage_timer(path, "inference"):
+        predictions, model_version, timings = await run_cpu(predict_feature_matrix, matrix, FEATURE_ASSEMBLER.columns)
+    # model_predict and any model load stages were measured where the model lives
+    observe_stage_timings(path, timings)
+    if use_cache:
+        PREDICTION_CACHE.store(matrix, predictions, model_version)
+    else:
+        PREDICTION_CACHE.observe_version(model_version)
+    return predictions, model_version
+
+
+async def score_live_matrix(matrix):
+    predictions, _ = await score_feature_matrix(matrix, path="live")
+    return predictions
+
+
+async def score_with_cache(matrix, path: str = "batch"):
+    """
+    Look up every row in PREDICTION_CACHE and send only the misses to the model
+    :return: (predictions, model version, cache hits)
+    """
+    with stage_timer(path, "cache_lookup"):
+        predictions, hits, model_version = PREDICTION_CACHE.lookup(matrix, model_version=served_model_version())
+    n_hits = int(hits.sum())
+    if n_hits == len(matrix):
+        return predictions, model_version, n_hits
+
+    misses = np.flatnonzero(~hits)
+    miss_predictions, miss_model_version = await score_feature_matrix(matrix[misses], path=path)
+    if n_hits and miss_model_version != model_version:
+        # the model changed since the hits were cached; keep the response on one version
+        all_predictions, miss_model_version = await score_feature_matrix(matrix, path=path)
+        return all_predictions, miss_model_version, 0
+    predictions[misses] = list(miss_predictions)
+    return predictions, miss_model_version, n_hits
+
+
+async def predict_live_row(row):
+    """
+    Serve one assembled row from PREDICTION_CACHE, or through the micro-batcher on a miss
+    """
+    with stage_timer("live", "cache_lookup"):
+        predictions, hits, _ = PREDICTION_CACHE.lookup(row[np.newaxis, :], model_version=served_model_version())
+    if hits[0]:
+        return predictions[0]
+    # queue wait plus the batch's inference, see the live "inference" stage for the latter
+    with stage_timer("live", "micro_batch"):
+        return await PREDICTION_BATCHER.submit(row)
+
+
+# Coalesces concurrent /predict_live requests into batched model calls
+PREDICTION_BATCHER = PredictionBatcher(predict_fn=score_live_matrix,
+                                       max_concurrent_batches=max(SERVING_EXECUTORS.cpu_workers, 1))
+
+
+# Pydantic model for batch prediction input: either a list of records or one list per field
+class BatchPredictionInput(BaseModel):
+    records: Optional[List[LivePredictionInput]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+
 # ✅ YOUR ORIGINAL ROUTES (UNCHANGED)
 @app.get("/", status_code=200, response_class=HTMLResponse)
 @app.post("/", response_class=HTMLResponse)
 async def index(request: Request):
     return TEMPLATES.TemplateResponse(name='index.html', context={"request": request, "prediction": None})
 
+def run_training_job(stage_tracker):
+    # training (neuro_mf, MongoDB, model selection) is imported on the first /train job only
+    from src.forest.pipeline.train_pipeline import TrainPipeline
+
+    train_pipeline = TrainPipeline()
+    train_pipeline.run_pipeline(stage_tracker=stage_tracker)
+    # Pick up a newly pushed model right away instead of waiting for the next refresh
+    model_holder = ModelHolder.default()
+    if model_holder.is_loaded:
+        model_holder.refresh()
+    if SERVING_EXECUTORS.uses_processes:
+        MODEL_VERSION_WATCHER.check()
+
+def run_prediction_job(stage_tracker):
+    from src.forest.pipeline.prediction_pipeline import PredictionPipeline
+
+    prediction_pipeline = PredictionPipeline()
+    prediction_pipeline.initiate_prediction(stage_tracker=stage_tracker)
+
+def job_accepted_response(job, created: bool) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "state": job.state,
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job.job_id}",
+    })
+
 @app.get("/train")
 async def trainRouteClient():
-    try:
-        train_pipeline = TrainPipeline()
-        train_pipeline.run_pipeline()
-        return Response("<h1>Training successful !!<h1>")
-    except Exception as e:
-        return Response(f"Error Occurred! {e}")
+    # A training request while another one is queued or running returns the existing job
+    job, created = JOB_MANAGER.submit("train", run_training_job, deduplicate=True)
+    return job_accepted_response(job, created)
 
 @app.get("/predict")
 async def predictRouteClient():
-    try:
-        prediction_pipeline = PredictionPipeline()
-        prediction_pipeline.initiate_prediction()
-        return Response(
-            "<h1>Prediction successful and predictions are stored in s3 bucket !!<h1>"
-        )
-    except Exception as e:
-        return Response(f"Error Occurred! {e}")
+    job, created = JOB_MANAGER.submit("predict", run_prediction_job)
+    return job_accepted_response(job, created)
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.to_dict() for job in JOB_MANAGER.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
 
 # ✅ NEW LIVE PREDICTION ROUTE (ADDED)
 @app.post("/predict_live", response_class=HTMLResponse)
@@ -95,119 +259,229 @@ async def predict_live(
             horizontal_distance_to_fire_points=horizontal_distance_to_fire_points
         )
         
-        # Make live prediction
-        prediction_result = make_live_prediction(input_data)
+        # Make live prediction from the cache or through the micro-batcher
+        with stage_timer("live", "assemble"):
+            row = FEATURE_ASSEMBLER.assemble_record(input_data.dict())[0]
+        prediction = await predict_live_row(row)
+
+        with stage_timer("live", "render"):
+            prediction_result = format_prediction(prediction)
+            return TEMPLATES.TemplateResponse("index.html", {
+                "request": request,
+                "prediction": prediction_result
+            })
         
+    except (BatcherQueueFull, ExecutorSaturated) as e:
         return TEMPLATES.TemplateResponse("index.html", {
-            "request": request, 
-            "prediction": prediction_result
-        })
-        
+            "request": request,
+            "prediction": f"Error: {str(e)}"
+        }, status_code=503)
     except Exception as e:
         return TEMPLATES.TemplateResponse("index.html", {
             "request": request, 
             "prediction": f"Error: {str(e)}"
         })
 
+@app.get("/serving/stats")
+async def serving_stats():
+    return {
+        "model_version": current_model_version(),
+        "micro_batcher": PREDICTION_BATCHER.stats(),
+        "prediction_cache": PREDICTION_CACHE.stats(),
+        "executors": SERVING_EXECUTORS.stats(),
+        "jobs": JOB_MANAGER.stats(),
+        "artifact_cache": artifact_cache_stats(),
+    }
+
+def current_model_version() -> Optional[str]:
+    return served_model_version() or PREDICTION_CACHE.model_version
+
+def artifact_cache_stats() -> Dict[str, float]:
+    # counts the downloads of this process: the model when it is served in process, and pipeline jobs
+    artifact_cache = ArtifactCache.default()
+    return {} if artifact_cache is None else artifact_cache.stats()
+
+# Values other serving components already keep are read when /metrics is scraped
+METRICS.callback("forest_model_info", "Currently served model version", "gauge",
+                 lambda: {(current_model_version(),): 1} if current_model_version() else {}, ["version"])
+METRICS.callback("forest_micro_batch_queue_depth", "Rows waiting in the /predict_live micro-batcher", "gauge",
+                 lambda: {(): PREDICTION_BATCHER.queue_depth})
+METRICS.callback("forest_executor_pending_jobs", "Jobs submitted to a serving executor and not finished", "gauge",
+                 lambda: {("io",): SERVING_EXECUTORS.stats()["io_pending"],
+                          ("cpu",): SERVING_EXECUTORS.stats()["cpu_pending"]}, ["executor"])
+METRICS.callback("forest_background_jobs", "Background /train and /predict jobs by state", "gauge",
+                 lambda: {(state,): JOB_MANAGER.stats()[state] for state in (JOB_QUEUED, JOB_RUNNING)}, ["state"])
+METRICS.callback("forest_prediction_cache_lookups_total", "Prediction cache lookups by result", "counter",
+                 lambda: {("hit",): PREDICTION_CACHE.hits_total, ("miss",): PREDICTION_CACHE.misses_total},
+                 ["result"])
+METRICS.callback("forest_prediction_cache_size", "Rows held in the prediction cache", "gauge",
+                 lambda: {(): PREDICTION_CACHE.stats()["size"]})
+METRICS.callback("forest_micro_batch_rows_total", "Rows scored through the micro-batcher", "counter",
+                 lambda: {(): PREDICTION_BATCHER.rows_total})
+METRICS.callback("forest_micro_batch_rejected_total", "/predict_live rows rejected because the queue was full",
+                 "counter", lambda: {(): PREDICTION_BATCHER.rejected_total})
+METRICS.callback("forest_artifact_cache_lookups_total", "Artifact cache lookups of downloaded S3 objects by result",
+                 "counter", lambda: {("hit",): artifact_cache_stats().get("hits"),
+                                     ("miss",): artifact_cache_stats().get("misses")}, ["result"])
+METRICS.callback("forest_artifact_cache_bytes_total", "Bytes of S3 objects read from the artifact cache or downloaded",
+                 "counter", lambda: {("cache",): artifact_cache_stats().get("bytes_saved"),
+                                     ("download",): artifact_cache_stats().get("bytes_downloaded")}, ["source"])
+METRICS.callback("forest_artifact_cache_evictions_total", "Artifact cache entries evicted to stay under its size",
+                 "counter", lambda: {(): artifact_cache_stats().get("evictions")})
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=METRICS.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.post("/predict_batch")
+async def predict_batch(payload: BatchPredictionInput):
+    """
+    Score many rows with a single model.predict call; rows found in the prediction cache are not rescored.
+    Predictions are returned in the same order as the input rows.
+    """
+    with stage_timer("batch", "assemble"):
+        matrix = build_batch_matrix(payload, max_rows=MODEL_SERVING_BATCH_MAX_SIZE)
+    if len(matrix) == 0:
+        return {"count": 0, "model_version": current_model_version(), "cache_hits": 0,
+                "cover_type": [], "cover_type_name": []}
+
+    try:
+        predictions, model_version, cache_hits = await score_with_cache(matrix)
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
+
+    cover_types = [int(prediction) for prediction in predictions]
+    return {
+        "count": len(cover_types),
+        "model_version": model_version,
+        "cache_hits": cache_hits,
+        "cover_type": cover_types,
+        "cover_type_name": [COVER_TYPE_NAMES.get(cover_type, f"Unknown Type ({cover_type})")
+                            for cover_type in cover_types],
+    }
+
+@app.post("/predict_stream")
+async def predict_stream(request: Request):
+    """
+    Score a CSV (header line first) or NDJSON request body chunk by chunk and stream the predictions back.
+    The response has the request's format, one line per input row and in input order.
+    """
+    data_format = stream_format(request.headers.get("content-type"))
+    # parsing runs on the io executor, waiting for a slot since the stream cannot be answered 503 midway
+    chunks = iter_record_chunks(request.stream(), RecordChunker(data_format), SERVING_EXECUTORS.run_io_when_free)
+    try:
+        # parse and validate the first chunk so a malformed upload still gets a 422
+        with stage_timer("stream", "receive_parse"):
+            first_chunk = await chunks.__anext__()
+        check_stream_columns(first_chunk)
+    except StopAsyncIteration:
+        first_chunk = None
+    except StreamFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    media_type = "text/csv" if data_format == CSV_FORMAT else "application/x-ndjson"
+    return StreamingResponse(stream_predictions(first_chunk, chunks, data_format), media_type=media_type)
+
+async def stream_predictions(first_chunk, chunks, data_format: str):
+    if data_format == CSV_FORMAT:
+        yield "row,cover_type,cover_type_name\n"
+    dataframe = first_chunk
+    try:
+        while dataframe is not None:
+            check_stream_columns(dataframe)
+            with stage_timer("stream", "assemble"):
+                values = {column: dataframe[column] for column in dataframe.columns}
+                matrix = FEATURE_ASSEMBLER.assemble_columns(values, len(dataframe))
+            predictions = await score_stream_chunk(matrix)
+            with stage_timer("stream", "format"):
+                lines = format_stream_predictions(dataframe.index, predictions, data_format)
+            yield lines
+            try:
+                with stage_timer("stream", "receive_parse"):
+                    dataframe = await chunks.__anext__()
+            except StopAsyncIteration:
+                dataframe = None
+    except Exception as e:
+        # the status line is already sent, so the failure is reported as the last line
+        logging.error(f"Streaming prediction failed: {e}")
+        if data_format == CSV_FORMAT:
+            yield f"error,,{json.dumps(str(e))}\n"
+        else:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+def check_stream_columns(dataframe) -> None:
+    provided_fields = {str(column).lower() for column in dataframe.columns}
+    missing_fields = [field for field in LivePredictionInput.__fields__
+                      if field in FEATURE_ASSEMBLER.field_index and field not in provided_fields]
+    if missing_fields:
+        raise StreamFormatError(f"Missing fields: {missing_fields}", sys)
+
+async def score_stream_chunk(matrix):
+    """
+    Score one stream chunk on the inference executor, waiting while it is saturated.
+    Stream rows bypass PREDICTION_CACHE so a large upload does not evict the live entries.
+    """
+    predictions, _ = await score_feature_matrix(matrix, path="stream", use_cache=False, wait_when_saturated=True)
+    return predictions
+
+def format_stream_predictions(rows, predictions, data_format: str) -> str:
+    cover_types = [int(prediction) for prediction in predictions]
+    names = [COVER_TYPE_NAMES.get(cover_type, f"Unknown Type ({cover_type})") for cover_type in cover_types]
+    if data_format == CSV_FORMAT:
+        return "".join(f"{row},{cover_type},{name}\n" for row, cover_type, name in zip(rows, cover_types, names))
+    return "".join(json.dumps({"row": int(row), "cover_type": cover_type, "cover_type_name": name}) + "\n"
+                   for row, cover_type, name in zip(rows, cover_types, names))
+
+def build_batch_matrix(payload: BatchPredictionInput, max_rows: int):
+    """
+    Assemble a batch payload into one feature matrix laid out like the training columns
+    """
+    if (payload.records is None) == (payload.columns is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'records' or 'columns'")
+
+    if payload.records is not None:
+        n_rows = len(payload.records)
+        values = {field: [getattr(record, field) for record in payload.records] for field in LivePredictionInput.__fields__}
+    else:
+        unknown_fields = set(payload.columns) - set(LivePredictionInput.__fields__)
+        missing_fields = set(LivePredictionInput.__fields__) - set(payload.columns)
+        if unknown_fields or missing_fields:
+            raise HTTPException(status_code=422,
+                                detail=f"Unknown fields: {sorted(unknown_fields)}, missing fields: {sorted(missing_fields)}")
+        lengths = {len(column) for column in payload.columns.values()}
+        if len(lengths) > 1:
+            raise HTTPException(status_code=422, detail="All columns must have the same length")
+        n_rows = lengths.pop()
+        values = payload.columns
+
+    if n_rows > max_rows:
+        raise HTTPException(status_code=413, detail=f"Batch of {n_rows} rows exceeds the limit of {max_rows}")
+
+    return FEATURE_ASSEMBLER.assemble_columns(values, n_rows)
+
+def format_prediction(prediction) -> str:
+    cover_type_name = COVER_TYPE_NAMES.get(int(prediction), f"Unknown Type ({prediction})")
+    return f"🌲 {cover_type_name} (Cover Type {int(prediction)})"
+
 def make_live_prediction(input_data: LivePredictionInput):
     """
-    Make live prediction using your trained model from S3 with pandas DataFrame
+    Make live prediction using the resident model from the model registry
     """
     try:
-        import boto3
-        import tempfile
-        import os
-        import pandas as pd
-        from src.forest.utils.main_utils import load_object
-        import numpy as np
-        
-        # Create S3 client
-        s3_client = boto3.client('s3', region_name='eu-north-1')
-        
-        # Find and download model from S3
-        response = s3_client.list_objects_v2(Bucket="shayanforest")
-        model_key = None
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                if '.pkl' in key and 'model' in key.lower():
-                    model_key = key
-                    break
-        
-        if not model_key:
-            return "No model file found in S3 bucket shayanforest"
-        
-        # Download model
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pkl')
-        temp_file.close()
-        temp_model_path = temp_file.name
-        s3_client.download_file("shayanforest", model_key, temp_model_path)
-        
         try:
-            # Load the model
-            model = load_object(temp_model_path)
-            
-            # Create complete feature vector with all expected columns
-            feature_dict = {
-                'Id': 999999,  # Dummy ID for prediction
-                'Elevation': input_data.elevation,
-                'Aspect': input_data.aspect,
-                'Slope': input_data.slope,
-                'Horizontal_Distance_To_Hydrology': input_data.horizontal_distance_to_hydrology,
-                'Vertical_Distance_To_Hydrology': input_data.vertical_distance_to_hydrology,
-                'Horizontal_Distance_To_Roadways': input_data.horizontal_distance_to_roadways,
-                'Hillshade_9am': input_data.hillshade_9am,
-                'Hillshade_Noon': input_data.hillshade_noon,
-                'Hillshade_3pm': input_data.hillshade_3pm,
-                'Horizontal_Distance_To_Fire_Points': input_data.horizontal_distance_to_fire_points
-            }
-            
-            # Add all 4 Wilderness Area features
-            for i in range(1, 5):
-                feature_dict[f'Wilderness_Area{i}'] = 0
-            
-            # Add all 40 Soil Type features
-            for i in range(1, 41):
-                feature_dict[f'Soil_Type{i}'] = 0
-            
-            # Create DataFrame
-            input_df = pd.DataFrame([feature_dict])
-            
-            # Remove the columns that were dropped during training
-            columns_to_drop = ['Soil_Type7', 'Soil_Type8', 'Soil_Type15', 'Soil_Type36']
-            for col in columns_to_drop:
-                if col in input_df.columns:
-                    input_df = input_df.drop(col, axis=1)
-            
-            print(f"Input DataFrame shape: {input_df.shape}")
-            print(f"Columns: {list(input_df.columns)}")
-            
-            # ✅ FIXED: Pass DataFrame directly to model.predict() - NOT numpy array
-            prediction = model.predict(input_df)[0]
-            
-            # Map prediction to cover type name
-            cover_types = {
-                1: "Spruce/Fir",
-                2: "Lodgepole Pine", 
-                3: "Ponderosa Pine",
-                4: "Cottonwood/Willow",
-                5: "Aspen",
-                6: "Douglas-fir",
-                7: "Krummholz"
-            }
-            
-            cover_type_name = cover_types.get(int(prediction), f"Unknown Type ({prediction})")
-            return f"🌲 {cover_type_name} (Cover Type {int(prediction)})"
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_model_path):
-                try:
-                    os.unlink(temp_model_path)
-                except Exception as e:
-                    print(f"Warning: Could not delete temp file {temp_model_path}: {e}")
+            model = ModelHolder.default().get_model()
+        except Exception as e:
+            return f"No model available in the model registry: {e}"
+
+        # Fill the schema-compiled template row and pass the matrix straight to the model
+        features = FEATURE_ASSEMBLER.assemble_record(input_data.dict())
+        prediction = model.predict_features(features, FEATURE_ASSEMBLER.columns)[0]
         
+        # Map prediction to cover type name
+        return format_prediction(prediction)
+
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,139 @@
+"""
+Measure the transfer size, upload time and load time of the pickled model and of a large CSV
+file through SimpleStorageService at several compression codecs and levels.
+
+The S3 client is the stand-in of bench_s3_upload, which sleeps for each request's latency and for
+its bytes at a per-connection bandwidth, extended to keep object metadata. The model is the
+reference RandomForest pickled the way the model pusher uploads it with upload_file and loaded
+with load_model; the CSV is written with upload_dataframe and read with download_dataframe. The
+artifact cache is disabled so every load downloads the object. Load times include the transfer,
+decompression and unpickling or parsing; ratios are against the first of --codecs. The fastest
+codec depends on --bandwidth.
+
+    python -m benchmarks.bench_compression [--rows 500000] [--bandwidth 100] [--latency 20]
+                                           [--codecs none lz4:0 zstd:1 zstd:3 zstd:9 gzip:1 gzip:6]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+from botocore.exceptions import ClientError
+
+from benchmarks.bench_s3_upload import FakeS3Client
+from benchmarks.common import synthetic_rows, train_reference_model
+from src.forest.cloud_storage.aws_storage import SimpleStorageService
+from src.forest.cloud_storage.compression import codec_level, resolve_codec
+from src.forest.configuration.aws_connection import S3Client
+
+BUCKET = "benchmark-bucket"
+MODEL_KEY = "model-registry/model.pkl"
+CSV_KEY = "forest_pred_data.csv"
+DEFAULT_CODECS = ["none", "lz4:0", "zstd:1", "zstd:3", "zstd:9", "gzip:1", "gzip:6"]
+
+
+class MetadataS3Client(FakeS3Client):
+    """
+    FakeS3Client keeping the user metadata of its objects, which tells readers how they are compressed
+    """
+
+    def __init__(self, bandwidth: float, latency: float):
+        super().__init__(bandwidth, latency)
+        self.metadata = {}
+        self._upload_metadata = {}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **request):
+        super().put_object(Bucket=Bucket, Key=Key, Body=Body)
+        self.metadata[Bucket, Key] = Metadata or {}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None):
+        response = super().create_multipart_upload(Bucket=Bucket, Key=Key)
+        self._upload_metadata[response["UploadId"]] = Metadata or {}
+        return response
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        super().complete_multipart_upload(Bucket=Bucket, Key=Key, UploadId=UploadId, MultipartUpload=MultipartUpload)
+        self.metadata[Bucket, Key] = self._upload_metadata.pop(UploadId)
+
+    def upload_file(self, Filename, Bucket, Key):
+        super().upload_file(Filename, Bucket, Key)
+        self.metadata[Bucket, Key] = {}
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        if (Bucket, Key) not in self.objects:
+            # load_model looks for a bundle next to the pickled model
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        data = self.objects[Bucket, Key]
+        return {"ETag": f'"{len(data):x}"', "ContentLength": len(data), "Metadata": self.metadata[Bucket, Key]}
+
+    def get_object(self, Bucket, Key, IfMatch=None, **request):
+        response = super().get_object(Bucket=Bucket, Key=Key)
+        response["Metadata"] = self.metadata[Bucket, Key]
+        return response
+
+
+def parse_codec(spec: str):
+    """
+    "zstd:3" -> ("zstd", 3), "zstd" -> ("zstd", None), "none" -> ("", None)
+    """
+    codec, _, level = spec.partition(":")
+    return ("" if codec == "none" else codec), (int(level) if level else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000, help="rows of the CSV file")
+    parser.add_argument("--trees", type=int, default=100, help="trees of the reference model")
+    parser.add_argument("--bandwidth", type=float, default=100, help="MiB/s per connection")
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds per request")
+    parser.add_argument("--codecs", nargs="+", default=DEFAULT_CODECS, help="codec:level, or none")
+    args = parser.parse_args()
+
+    mib = 2 ** 20
+    client = MetadataS3Client(bandwidth=args.bandwidth * mib, latency=args.latency / 1000)
+    S3Client.s3_client = S3Client.s3_resource = client
+    rows = synthetic_rows(args.rows)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = os.path.join(temp_dir, "model.pkl")
+        with open(model_path, "wb") as model_file:
+            pickle.dump(train_reference_model(n_estimators=args.trees), model_file)
+
+        results = {"model": [], "csv": []}
+        for spec in args.codecs:
+            codec, level = parse_codec(spec)
+            codec = resolve_codec(codec)
+            storage = SimpleStorageService(compression=codec, compression_level=level)
+            storage.artifact_cache = None
+            name = f"{codec}:{codec_level(codec, level)}" if codec else "none"
+
+            for artifact, key, upload, load in (
+                    ("model", MODEL_KEY,
+                     lambda: storage.upload_file(model_path, MODEL_KEY, BUCKET, remove=False, compress=True),
+                     lambda: storage.load_model(MODEL_KEY, BUCKET)),
+                    ("csv", CSV_KEY,
+                     lambda: storage.upload_dataframe(rows, BUCKET, CSV_KEY, compress=True),
+                     lambda: storage.download_dataframe(BUCKET, CSV_KEY))):
+                start_time = time.perf_counter()
+                upload()
+                upload_seconds = time.perf_counter() - start_time
+                start_time = time.perf_counter()
+                loaded = load()
+                load_seconds = time.perf_counter() - start_time
+                if artifact == "csv" and not loaded.equals(rows):
+                    raise RuntimeError(f"{CSV_KEY} read back with {name} differs from the rows written")
+                results[artifact].append((name, len(client.objects[BUCKET, key]), upload_seconds, load_seconds))
+
+    print(f"{args.bandwidth:.0f} MiB/s per connection, {args.latency:.0f} ms per request")
+    print(f"{'artifact':8} {'codec':10} {'size':>10} {'ratio':>6} {'upload':>8} {'load':>8}")
+    for artifact, rows_of_artifact in results.items():
+        baseline = rows_of_artifact[0][1]
+        for name, size, upload_seconds, load_seconds in rows_of_artifact:
+            print(f"{artifact:8} {name:10} {size / mib:6.1f} MiB {baseline / size:5.1f}x "
+                  f"{upload_seconds:7.2f}s {load_seconds:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare serving with the preprocessor folded into the trees against the two-stage path.
+
+Trains the reference model on notebooks/train.csv, checks that the fused forest predicts
+exactly what preprocessor.transform + RandomForestClassifier.predict predict on every row
+(also with NaNs injected into 10% of the rows), then reports single-row and 512-row latency
+for the two-stage sklearn path, transform + flat forest, and the fused forest on a
+DataFrame and on an assembled feature matrix.
+
+    python -m benchmarks.bench_fused_forest [--trees 100] [--repeat 200]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import load_train_data, synthetic_rows, time_call, train_reference_model
+from src.forest.entity.feature_assembler import get_feature_assembler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions of the single-row timing")
+    args = parser.parse_args()
+
+    model = train_reference_model(n_estimators=args.trees)
+    model.compile_forest()
+    if model.fused_forest is None:
+        raise SystemExit("The reference preprocessor could not be folded into the forest")
+    preprocessor, forest, fused = model.preprocessing_object, model.trained_model_object, model.fused_forest
+
+    features, _ = load_train_data()
+    with_nans = features.copy()
+    rng = np.random.default_rng(0)
+    rows_with_nans = rng.random(len(with_nans)) < 0.1
+    for column in fused.columns:
+        with_nans.loc[rows_with_nans & (rng.random(len(with_nans)) < 0.2), column] = np.nan
+    for name, frame in (("train.csv", features), ("train.csv with NaNs", with_nans)):
+        expected = forest.predict(preprocessor.transform(frame))
+        mismatches = int((fused.predict(frame) != expected).sum())
+        print(f"{name}: mismatches on {len(expected)} rows: {mismatches}")
+        if mismatches:
+            raise SystemExit(f"Fused forest disagrees with the two-stage path on {name}")
+
+    assembler = get_feature_assembler()
+    paths = (
+        ("sklearn two-stage", lambda frame: forest.predict(preprocessor.transform(frame))),
+        ("transform + flat", lambda frame: model.flat_forest.predict(preprocessor.transform(frame))),
+        ("fused DataFrame", fused.predict),
+    )
+    single_row, batch = synthetic_rows(1), synthetic_rows(512, seed=1)
+    print(f"\n{'path':<22}{'1 row p50 ms':>14}{'1 row p95 ms':>14}{'512 rows ms':>14}")
+    for name, predict in paths:
+        single = time_call(lambda: predict(single_row), repeat=args.repeat)
+        bulk = time_call(lambda: predict(batch), repeat=20)
+        print(f"{name:<22}{single['p50_ms']:>14.3f}{single['p95_ms']:>14.3f}{bulk['p50_ms']:>14.1f}")
+
+    single_matrix, batch_matrix = assembler.assemble_frame(single_row), assembler.assemble_frame(batch)
+    single = time_call(lambda: fused.predict_features(single_matrix, assembler.columns), repeat=args.repeat)
+    bulk = time_call(lambda: fused.predict_features(batch_matrix, assembler.columns), repeat=20)
+    print(f"{'fused feature matrix':<22}{single['p50_ms']:>14.3f}{single['p95_ms']:>14.3f}{bulk['p50_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure incremental batch prediction: a job rerun on an input where only some rows changed
+scores those rows and reuses the previous run's predictions for the others.
+
+Synthetic rows are made unique by jittering Elevation and written to a local stand-in for
+the S3 buckets (LOCAL_STORAGE_DIR). For every --changed fraction the benchmark runs a first
+job that builds the prediction index, then changes that fraction of the rows and reruns the
+job incrementally and from scratch; both reruns must write byte-identical output. Each job
+runs in a fresh interpreter, see bench_parallel_prediction.
+
+    python -m benchmarks.bench_incremental_prediction [--rows 1000000] [--changed 0 0.01 0.1 1]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.bench_parallel_prediction import file_digest, run_prediction
+from benchmarks.common import synthetic_rows
+from benchmarks.load_test import publish_local_model
+from src.forest.cloud_storage.local_storage import LocalStorageService
+from src.forest.entity.config_entity import PredictionPipelineConfig
+from src.forest.utils.table_format import write_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--changed", type=float, nargs="+", default=[0.0, 0.01, 0.1, 1.0],
+                        help="fractions of rows changed between the two runs")
+    parser.add_argument("--format", default="parquet", choices=["csv", "parquet", "arrow"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--model", help="pickled SensorModel to use instead of training one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage_dir = os.path.join(temp_dir, "storage")
+        storage = LocalStorageService(storage_dir)
+        publish_local_model(storage_dir, args.model, args.trees)
+        config = PredictionPipelineConfig()
+        fields = {"data_file_path": f"forest_pred_data.{args.format}",
+                  "output_file_name": f"forest_predictions.{args.format}", "n_workers": args.workers}
+        input_path = storage.object_path(config.data_bucket_name, fields["data_file_path"])
+        output_path = storage.object_path(config.data_bucket_name, fields["output_file_name"])
+        os.makedirs(os.path.dirname(input_path), exist_ok=True)
+
+        rng = np.random.default_rng(0)
+        rows = synthetic_rows(args.rows)
+        rows["Elevation"] += rng.integers(-200, 200, len(rows))
+        print(f"input: {args.rows} rows as {args.format}, {args.workers} worker(s)")
+        print(f"{'changed':>8} {'first run':>10} {'rerun':>8} {'from scratch':>13} {'speedup':>8} output")
+        for fraction in args.changed:
+            work_dir = os.path.join(temp_dir, f"run-{fraction}")
+            write_table(rows, input_path, args.format)
+            index_path = storage.object_path(config.data_bucket_name, config.index_file_name)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            first_run = run_prediction(storage_dir, work_dir, incremental=True, **fields)
+
+            changed_rows = rows.copy()
+            changed = rng.random(len(rows)) < fraction
+            changed_rows.loc[changed, "Horizontal_Distance_To_Roadways"] += 1
+            write_table(changed_rows, input_path, args.format)
+            rerun = run_prediction(storage_dir, work_dir + "-incremental", incremental=True, **fields)
+            incremental_digest = file_digest(output_path)
+            from_scratch = run_prediction(storage_dir, work_dir + "-full", incremental=False, **fields)
+            same = file_digest(output_path) == incremental_digest
+            print(f"{fraction:8.0%} {first_run['seconds']:8.1f} s {rerun['seconds']:6.1f} s "
+                  f"{from_scratch['seconds']:11.1f} s {from_scratch['seconds'] / rerun['seconds']:7.2f}x "
+                  f"{'identical' if same else 'DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure how long the reference model takes to load from the dill pickle the trainer writes and
+from its model bundle, and the size of both files.
+
+Each format is loaded --repeat times in this process, where sklearn and the repository modules
+are already imported, and once in a fresh interpreter, as a serving worker does at startup,
+where the time includes every import the format needs: unpickling imports sklearn, a bundle
+only needs NumPy. The bundle is loaded mapped from its file and, as after a compressed
+download, read from an in-memory stream. Every loaded model is checked to predict the same
+classes as the trained one.
+
+    python -m benchmarks.bench_model_bundle [--trees 100] [--repeat 20] [--rows 1000]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import synthetic_rows, time_call, train_reference_model
+from src.forest.entity.estimator import MappedSensorModel
+from src.forest.utils.main_utils import load_object, save_object
+
+COLD_LOAD_SCRIPT = """
+import sys, time
+start_time = time.perf_counter()
+if sys.argv[1] == "dill":
+    from src.forest.utils.main_utils import load_object
+    model = load_object(sys.argv[2])
+else:
+    from src.forest.entity.estimator import MappedSensorModel
+    model = MappedSensorModel.load_bundle(sys.argv[2])
+print((time.perf_counter() - start_time) * 1000.0)
+"""
+
+
+def cold_load_ms(model_format: str, path: str) -> float:
+    environment = {**os.environ, "PYTHONPATH": os.getcwd()}
+    output = subprocess.run([sys.executable, "-c", COLD_LOAD_SCRIPT, model_format, path], env=environment,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True).stdout
+    return float(output.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100, help="trees of the reference model")
+    parser.add_argument("--repeat", type=int, default=20, help="loads per format in this process")
+    parser.add_argument("--rows", type=int, default=1000, help="rows the loaded models are checked on")
+    args = parser.parse_args()
+
+    model = train_reference_model(n_estimators=args.trees)
+    model.compile_forest()
+    rows = synthetic_rows(args.rows)
+    expected = model.predict(rows)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = os.path.join(temp_dir, "model.pkl")
+        bundle_path = os.path.join(temp_dir, "model.bundle")
+        save_object(model_path, model)
+        model.save_bundle(bundle_path)
+        with open(bundle_path, "rb") as bundle_file:
+            bundle_bytes = bundle_file.read()
+
+        loaders = {
+            "dill": (model_path, lambda: load_object(model_path), "dill"),
+            "bundle mmap": (bundle_path, lambda: MappedSensorModel.load_bundle(bundle_path), "bundle"),
+            "bundle stream": (bundle_path, lambda: MappedSensorModel.load_bundle(io.BytesIO(bundle_bytes)), None),
+        }
+        results = {}
+        for name, (path, load, cold_format) in loaders.items():
+            if (load().predict(rows) != expected).any():
+                raise RuntimeError(f"Model loaded from {name} predicts other classes than the trained one")
+            results[name] = {"size_mib": os.path.getsize(path) / 2 ** 20, **time_call(load, args.repeat)}
+            if cold_format is not None:
+                results[name]["cold_ms"] = cold_load_ms(cold_format, path)
+
+    print(json.dumps({"trees": args.trees, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure how batch prediction scales with the number of scoring processes.
+
+A synthetic prediction file of --rows rows and a reference model are written to a local
+stand-in for the S3 buckets (LOCAL_STORAGE_DIR). Each run is a fresh interpreter calling
+PredictionPipeline.initiate_prediction with n_workers set, like a nightly job would; with
+one worker the chunks are scored in that process, otherwise the input is split into
+shards scored by a process pool. Every run must produce byte-identical output.
+
+Speedup is bounded by the cores available to this process, printed first. Parent RSS is
+the peak memory of the process reading the input and writing the output; each worker
+additionally holds one copy of the model. Linux only.
+
+    python -m benchmarks.bench_parallel_prediction [--rows 2000000] [--workers 1 2 4 8]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import synthetic_rows
+from benchmarks.load_test import publish_local_model
+from src.forest.cloud_storage.local_storage import LocalStorageService
+from src.forest.constant.prediction_pipeline import PREDICTION_WORKERS
+from src.forest.entity.config_entity import PredictionPipelineConfig
+
+RUN_SCRIPT = """
+import json, os, sys, time
+from src.forest.cloud_storage.local_storage import LocalStorageService
+from src.forest.entity.config_entity import PredictionPipelineConfig
+from src.forest.pipeline.prediction_pipeline import PredictionPipeline
+
+storage_dir, config_fields = sys.argv[1], json.loads(sys.argv[2])
+config = PredictionPipelineConfig(**config_fields)
+pipeline = PredictionPipeline(config, storage=LocalStorageService(storage_dir))
+start_time = time.perf_counter()
+pipeline.initiate_prediction()
+elapsed = time.perf_counter() - start_time
+# VmHWM, unlike ru_maxrss, does not carry over the peak of the process that exec'd this one
+with open("/proc/self/status") as status:
+    peak_rss = next(int(line.split()[1]) * 1024 for line in status if line.startswith("VmHWM:"))
+print(json.dumps({"seconds": elapsed, "peak_rss": peak_rss}), flush=True)
+"""
+
+
+def default_worker_counts():
+    counts, n_workers = [], 1
+    while n_workers < PREDICTION_WORKERS:
+        counts.append(n_workers)
+        n_workers *= 2
+    return counts + [PREDICTION_WORKERS]
+
+
+def run_prediction(storage_dir: str, work_dir: str, **config_fields):
+    """
+    Run a prediction job with PredictionPipelineConfig(**config_fields) in a fresh interpreter
+    whose working directory is work_dir, where it leaves the output file
+    :return: {"seconds": job duration, "peak_rss": peak memory of the job's main process}
+    """
+    environment = {**os.environ, "PYTHONPATH": os.getcwd(), "LOCAL_STORAGE_DIR": storage_dir, "MODEL_SHARED_DIR": ""}
+    os.makedirs(work_dir, exist_ok=True)
+    os.symlink(os.path.abspath("config"), os.path.join(work_dir, "config"))
+    output = subprocess.run([sys.executable, "-c", RUN_SCRIPT, storage_dir, json.dumps(config_fields)],
+                            cwd=work_dir, env=environment, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_worker_counts())
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--model", help="pickled SensorModel to use instead of training one")
+    args = parser.parse_args()
+
+    print(f"cores available: {PREDICTION_WORKERS}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage_dir = os.path.join(temp_dir, "storage")
+        publish_local_model(storage_dir, args.model, args.trees)
+        config = PredictionPipelineConfig()
+        input_path = LocalStorageService(storage_dir).object_path(config.data_bucket_name, config.data_file_path)
+        os.makedirs(os.path.dirname(input_path), exist_ok=True)
+        synthetic_rows(args.rows).to_csv(input_path, index=False)
+        print(f"input: {args.rows} rows, {os.path.getsize(input_path) / 2 ** 20:.0f} MiB, "
+              f"chunks of {args.chunk_size} rows")
+
+        print(f"{'workers':>7} {'seconds':>8} {'rows/s':>10} {'speedup':>8} {'parent RSS':>11} output")
+        baseline, reference_digest = None, None
+        for n_workers in args.workers:
+            work_dir = os.path.join(temp_dir, f"run-{n_workers}")
+            result = run_prediction(storage_dir, work_dir, n_workers=n_workers, chunk_size=args.chunk_size)
+            digest = file_digest(os.path.join(work_dir, config.output_file_name))
+            reference_digest = reference_digest or digest
+            baseline = baseline or result["seconds"]
+            print(f"{n_workers:7d} {result['seconds']:8.1f} {args.rows / result['seconds']:10.0f} "
+                  f"{baseline / result['seconds']:7.2f}x {result['peak_rss'] / 2 ** 20:7.0f} MiB "
+                  f"{'identical' if digest == reference_digest else 'DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
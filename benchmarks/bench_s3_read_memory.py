@@ -0,0 +1,167 @@
+"""
+Measure the peak memory of reading a large CSV object into pandas and of unpickling a large
+object, before and after the zero-copy read paths of SimpleStorageService.
+
+"before" repeats what read_csv / load_model used to do: read the whole body into bytes, decode
+it to a str and wrap it in StringIO for read_csv, or pickle.loads the bytes. "after" calls
+read_csv (which parses the body as it streams in) and load_model (which unpickles from the
+artifact cache file, or from a temporary file above S3_READ_SPILL_BYTES when the cache is off).
+The S3 client is a stand-in whose GET bodies are read from local files, so the body itself
+takes no memory. Every case runs in a fresh interpreter and reports its peak RSS (VmHWM) above
+the RSS it had before the read.
+
+The "before" CSV case needs about 7x the file size in memory, lower --csv-mb on small hosts.
+
+    python -m benchmarks.bench_s3_read_memory [--csv-mb 1024] [--pickle-mb 512]
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+
+import numpy as np
+
+BUCKET = "benchmark-bucket"
+CSV_KEY = "forest_pred_data.csv"
+PICKLE_KEY = "model-registry/model.pkl"
+CASES = ("csv_before", "csv_after", "pickle_before", "pickle_after", "pickle_after_cached")
+
+
+class _ObjectSummary:
+    def __init__(self, client: "LocalFileS3Client", bucket_name: str, key: str):
+        self._client, self.bucket_name, self.key = client, bucket_name, key
+
+    def get(self):
+        return self._client.get_object(Bucket=self.bucket_name, Key=self.key)
+
+
+class LocalFileS3Client:
+    """
+    S3 client and resource stand-in serving the objects of a {key: local file} map
+    """
+
+    def __init__(self, files):
+        self.files = files
+
+    def _etag(self, Key):
+        stat = os.stat(self.files[Key])
+        return f'"{hashlib.md5(f"{Key}{stat.st_size}{stat.st_mtime_ns}".encode()).hexdigest()}"'
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.files:
+            from botocore.exceptions import ClientError
+
+            # load_model looks for a bundle next to the pickled model
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ETag": self._etag(Key), "ContentLength": os.path.getsize(self.files[Key])}
+
+    def get_object(self, Bucket, Key, IfMatch=None, **request):
+        return {"Body": open(self.files[Key], "rb"), "ETag": self._etag(Key),
+                "ContentLength": os.path.getsize(self.files[Key])}
+
+    def Object(self, bucket_name, key):
+        return _ObjectSummary(self, bucket_name, key)
+
+    def Bucket(self, bucket_name):
+        # only exact keys are read, so the bucket is never listed
+        return bucket_name
+
+
+def current_rss(field: str = "VmRSS") -> int:
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) * 1024 for line in status if line.startswith(f"{field}:"))
+
+
+def run_case(case: str, files) -> dict:
+    from pandas import read_csv
+
+    from src.forest.cloud_storage.aws_storage import SimpleStorageService
+    from src.forest.configuration.aws_connection import S3Client
+
+    client = LocalFileS3Client(files)
+    S3Client.s3_client = S3Client.s3_resource = client
+    storage = SimpleStorageService()
+    if case == "pickle_after_cached":
+        # the first load fills the cache, the measured one reads from it
+        storage.load_model(PICKLE_KEY, BUCKET)
+    baseline = current_rss()
+    start_time = time.perf_counter()
+    if case == "csv_before":
+        content = client.get_object(Bucket=BUCKET, Key=CSV_KEY)["Body"].read().decode()
+        result = len(read_csv(StringIO(content), na_values="na"))
+    elif case == "csv_after":
+        result = len(storage.read_csv(CSV_KEY, BUCKET))
+    elif case == "pickle_before":
+        result = len(pickle.loads(client.get_object(Bucket=BUCKET, Key=PICKLE_KEY)["Body"].read()))
+    else:
+        result = len(storage.load_model(PICKLE_KEY, BUCKET))
+    return {"seconds": time.perf_counter() - start_time, "peak": current_rss("VmHWM") - baseline,
+            "result": result}
+
+
+def make_files(directory: str, csv_bytes: int, pickle_bytes: int):
+    from benchmarks.common import synthetic_rows
+
+    csv_path = os.path.join(directory, "data.csv")
+    rows = synthetic_rows(200000)
+    rows.to_csv(csv_path, index=False)
+    block = rows.to_csv(index=False, header=False).encode()
+    with open(csv_path, "ab") as csv_file:
+        while csv_file.tell() < csv_bytes:
+            csv_file.write(block)
+
+    pickle_path = os.path.join(directory, "model.pkl")
+    rng = np.random.default_rng(0)
+    # a stand-in for a fitted forest: many arrays whose pickled buffers make up the payload
+    n_arrays = 64
+    arrays = [rng.random(pickle_bytes // 8 // n_arrays) for _ in range(n_arrays)]
+    with open(pickle_path, "wb") as pickle_file:
+        pickle.dump(arrays, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return {CSV_KEY: csv_path, PICKLE_KEY: pickle_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv-mb", type=int, default=1024)
+    parser.add_argument("--pickle-mb", type=int, default=512)
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--files", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, json.loads(args.files))))
+        return
+
+    mib = 2 ** 20
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = make_files(temp_dir, args.csv_mb * mib, args.pickle_mb * mib)
+        print(f"CSV object: {os.path.getsize(files[CSV_KEY]) / mib:.0f} MiB, "
+              f"pickled object: {os.path.getsize(files[PICKLE_KEY]) / mib:.0f} MiB")
+        print(f"{'case':22} {'peak memory':>12} {'seconds':>8}")
+        environment = dict(os.environ, ARTIFACT_CACHE_DIR=os.path.join(temp_dir, "cache"))
+        environment.pop("LOCAL_STORAGE_DIR", None)
+        for case in args.cases:
+            if case in ("pickle_after", "csv_after"):
+                # no artifact cache: load_model spools a large body to a temporary file
+                case_environment = dict(environment, ARTIFACT_CACHE_MAX_BYTES="0")
+            else:
+                case_environment = environment
+            completed = subprocess.run([sys.executable, "-m", "benchmarks.bench_s3_read_memory", "--case", case,
+                                        "--files", json.dumps(files)], env=case_environment,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            if completed.returncode:
+                print(f"{case:22} {'failed':>12} (exit code {completed.returncode}, out of memory?)")
+                continue
+            result = json.loads(completed.stdout.splitlines()[-1])
+            print(f"{case:22} {result['peak'] / mib:8.0f} MiB {result['seconds']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Compare uploading and downloading prediction files through temporary files with streaming them
+from and to memory with SimpleStorageService.upload_dataframe / download_dataframe.
+
+The S3 client is a stand-in that keeps objects in memory and sleeps for each request's latency
+and for its bytes at a per-connection bandwidth, so concurrent parts overlap like they do on a
+real connection pool; no AWS credentials are needed. The temp-file paths are what
+upload_df_as_csv and the prediction pipeline did before: serialize to a local file, upload it
+with upload_file (boto3's transfer manager, 10 threads by default) and delete it, then write the
+local copy of the predictions; and download_file followed by parsing the file. Bytes read and
+written by the process (rchar / wchar of /proc/self/io) count the copies through the file system.
+
+    python -m benchmarks.bench_s3_upload [--rows 200000] [--format csv] [--bandwidth 100] [--latency 20]
+"""
+import argparse
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import synthetic_rows
+from src.forest.cloud_storage.aws_storage import SimpleStorageService
+from src.forest.configuration.aws_connection import S3Client
+from src.forest.utils.table_format import read_table, write_table
+
+BUCKET = "benchmark-bucket"
+# boto3 TransferConfig defaults used by upload_file and download_file
+TRANSFER_CHUNK_SIZE = 8 * 1024 ** 2
+TRANSFER_CONCURRENCY = 10
+
+
+class _SlowBody(io.RawIOBase):
+    def __init__(self, data: bytes, network: "FakeS3Client"):
+        self._data = io.BytesIO(data)
+        self._network = network
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._data.read(size)
+        self._network.transfer(len(data), received=True)
+        return data
+
+
+class FakeS3Client:
+    """
+    In-memory S3 client with simulated latency and per-connection bandwidth
+    """
+
+    def __init__(self, bandwidth: float, latency: float):
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.objects = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._uploads = {}
+        self._lock = threading.Lock()
+        # stands in for s3_resource.meta.client
+        self.meta = self
+        self.client = self
+
+    def transfer(self, n_bytes: int, received: bool = False) -> None:
+        with self._lock:
+            if received:
+                self.bytes_received += n_bytes
+            else:
+                self.bytes_sent += n_bytes
+        time.sleep(n_bytes / self.bandwidth)
+
+    def put_object(self, Bucket, Key, Body):
+        time.sleep(self.latency)
+        self.transfer(len(Body))
+        self.objects[Bucket, Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        time.sleep(self.latency)
+        upload_id = str(len(self._uploads))
+        self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        time.sleep(self.latency)
+        self.transfer(len(Body))
+        self._uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        time.sleep(self.latency)
+        parts = self._uploads.pop(UploadId)
+        self.objects[Bucket, Key] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId, None)
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        data = self.objects[Bucket, Key]
+        return {"Body": _SlowBody(data, self), "ETag": f'"{len(data):x}"', "ContentLength": len(data)}
+
+    def upload_file(self, Filename, Bucket, Key):
+        # multipart upload of the file's chunks on TRANSFER_CONCURRENCY threads, like s3transfer
+        upload_id = self.create_multipart_upload(Bucket=Bucket, Key=Key)["UploadId"]
+        with open(Filename, "rb") as file_obj, ThreadPoolExecutor(TRANSFER_CONCURRENCY) as pool:
+            chunks = iter(lambda: file_obj.read(TRANSFER_CHUNK_SIZE), b"")
+            parts = list(pool.map(lambda part: self.upload_part(Bucket=Bucket, Key=Key, UploadId=upload_id,
+                                                                PartNumber=part[0], Body=part[1]),
+                                  enumerate(chunks, start=1)))
+        self.complete_multipart_upload(Bucket=Bucket, Key=Key, UploadId=upload_id, MultipartUpload={
+            "Parts": [{"ETag": part["ETag"], "PartNumber": number} for number, part in enumerate(parts, start=1)]})
+
+    def download_file(self, Bucket, Key, Filename):
+        time.sleep(self.latency)
+        data = self.objects[Bucket, Key]
+        ranges = range(0, len(data), TRANSFER_CHUNK_SIZE)
+        with ThreadPoolExecutor(TRANSFER_CONCURRENCY) as pool:
+            list(pool.map(lambda start: self.transfer(min(TRANSFER_CHUNK_SIZE, len(data) - start), received=True),
+                          ranges))
+        with open(Filename, "wb") as file_obj:
+            file_obj.write(data)
+
+
+def process_io() -> int:
+    """
+    Bytes read plus written by this process through read/write system calls so far
+    """
+    with open("/proc/self/io") as io_file:
+        counters = dict(line.split(": ") for line in io_file.read().splitlines())
+    return int(counters["rchar"]) + int(counters["wchar"])
+
+
+def measure(function):
+    io_before, start = process_io(), time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start, process_io() - io_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "arrow"])
+    parser.add_argument("--bandwidth", type=float, default=100, help="MiB/s per connection")
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds per request")
+    parser.add_argument("--part-size", type=int, default=8, help="MiB per uploaded part")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    mib = 2 ** 20
+    client = FakeS3Client(bandwidth=args.bandwidth * mib, latency=args.latency / 1000)
+    S3Client.s3_client = S3Client.s3_resource = client
+    # transfers of uncompressed bytes, bench_compression measures compressed ones
+    storage = SimpleStorageService(compression="")
+    storage.artifact_cache = None
+    rows = synthetic_rows(args.rows)
+    key = f"forest_predictions.{args.format}"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        local_path = os.path.join(temp_dir, key)
+
+        def upload_through_file():
+            write_table(rows, local_path, args.format)
+            storage.upload_file(local_path, key, BUCKET)
+            # the pipeline then wrote its local fallback copy
+            write_table(rows, local_path, args.format)
+
+        def download_through_file():
+            client.download_file(Bucket=BUCKET, Key=key, Filename=local_path)
+            with open(local_path, "rb") as file_obj:
+                return read_table(file_obj, args.format)
+
+        print(f"{args.rows} rows as {args.format}, {args.bandwidth:.0f} MiB/s per connection, "
+              f"{args.latency:.0f} ms per request, parts of {args.part_size} MiB")
+        print(f"{'path':32} {'seconds':>8} {'speedup':>8} {'file I/O':>10} {'sent':>10}")
+        sent_before = client.bytes_sent
+        _, baseline, file_io = measure(upload_through_file)
+        reference = client.objects[BUCKET, key]
+        print(f"{'upload via temp file':32} {baseline:8.2f} {1:7.2f}x {file_io / mib:6.1f} MiB "
+              f"{(client.bytes_sent - sent_before) / mib:6.1f} MiB")
+        for concurrency in args.concurrency:
+            sent_before = client.bytes_sent
+            _, seconds, file_io = measure(lambda: storage.upload_dataframe(
+                rows, BUCKET, key, part_size=args.part_size * mib, concurrency=concurrency))
+            same = "" if client.objects[BUCKET, key] == reference else "  OUTPUT DIFFERS"
+            print(f"{f'upload_dataframe, {concurrency} at a time':32} {seconds:8.2f} {baseline / seconds:7.2f}x "
+                  f"{file_io / mib:6.1f} MiB {(client.bytes_sent - sent_before) / mib:6.1f} MiB{same}")
+
+        expected, baseline, file_io = measure(download_through_file)
+        print(f"{'download via temp file':32} {baseline:8.2f} {1:7.2f}x {file_io / mib:6.1f} MiB")
+        downloaded, seconds, file_io = measure(lambda: storage.download_dataframe(BUCKET, key))
+        same = "" if downloaded.equals(expected) else "  OUTPUT DIFFERS"
+        print(f"{'download_dataframe':32} {seconds:8.2f} {baseline / seconds:7.2f}x {file_io / mib:6.1f} MiB{same}")
+
+
+if __name__ == "__main__":
+    main()
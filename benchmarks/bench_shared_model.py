@@ -0,0 +1,121 @@
+"""
+Measure serving memory with 1, 4 and 16 worker processes, each holding a private unpickled
+model or mapping the compiled forest shared through MODEL_SHARED_DIR.
+
+Every worker is a fresh interpreter that loads the reference model through a ModelHolder
+backed by a local pickle, as a uvicorn worker does at startup, scores --rows rows and
+reports its memory from /proc/self/smaps_rollup while all workers are alive. RSS counts
+shared pages in every process that maps them; PSS divides them between those processes,
+so the sum of PSS is what the workers really cost the host.
+
+In shared mode one worker runs first and publishes the forest, as after the first start of
+a deployment; the measured workers then only map it. Linux only.
+
+    python -m benchmarks.bench_shared_model [--workers 1 4 16] [--trees 100]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import TRAIN_CSV_PATH, train_reference_model
+from src.forest.utils.main_utils import save_object
+
+WORKER_SCRIPT = """
+import json, os, sys
+import pandas as pd
+from src.forest.constant.training_pipeline import TARGET_COLUMN
+from src.forest.serving.model_holder import ModelHolder
+from src.forest.serving.shared_model import SharedModelStore
+from src.forest.utils.main_utils import load_object
+
+
+class LocalModelFile:
+    # stands in for SimpleStorageService: the registry object is a local pickle
+    def __init__(self, path):
+        self.path = path
+
+    def get_object_version(self, bucket_name, s3_key):
+        return str(os.stat(self.path).st_mtime_ns)
+
+    def load_model(self, model_name, bucket_name, model_dir=None, stage_tracker=None):
+        return load_object(self.path)
+
+
+model_path, shared_dir, n_rows, train_csv_path = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4]
+rows = pd.read_csv(train_csv_path, nrows=n_rows).drop(columns=[TARGET_COLUMN])
+holder = ModelHolder("local", "model.pkl", storage=LocalModelFile(model_path),
+                     shared_store=SharedModelStore(shared_dir) if shared_dir else None)
+model = holder.get_model()
+model.predict(rows)
+memory = {}
+with open("/proc/self/smaps_rollup") as smaps:
+    for line in smaps:
+        fields = line.split()
+        if len(fields) == 3 and fields[2] == "kB":
+            memory[fields[0].rstrip(":")] = int(fields[1]) * 1024
+print(json.dumps({"model": repr(model), "rss": memory["Rss"], "pss": memory["Pss"],
+                  "private": memory["Private_Clean"] + memory["Private_Dirty"]}), flush=True)
+# stay alive until every worker has reported, so that shared pages are counted as shared
+sys.stdin.read()
+"""
+
+
+def run_workers(n_workers: int, model_path: str, shared_dir: str, n_rows: int):
+    environment = {**os.environ, "PYTHONPATH": os.getcwd()}
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, model_path, shared_dir, str(n_rows),
+                                 TRAIN_CSV_PATH],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, env=environment)
+               for _ in range(n_workers)]
+    try:
+        reports = [json.loads(worker.stdout.readline()) for worker in workers]
+        # PSS depends on how many processes map a page, so read it again once all are loaded
+        for worker, report in zip(workers, reports):
+            with open(f"/proc/{worker.pid}/smaps_rollup") as smaps:
+                for line in smaps:
+                    if line.startswith("Pss:"):
+                        report["pss"] = int(line.split()[1]) * 1024
+        return reports
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=2000, help="rows scored by each worker before measuring")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = os.path.join(temp_dir, "model.pkl")
+        model = train_reference_model(n_estimators=args.trees)
+        model.compile_forest()
+        save_object(model_path, model)
+        print(f"model: {args.trees} trees, {model.flat_forest.n_nodes} nodes, "
+              f"compiled forest {model.fused_forest.forest.nbytes / 2 ** 20:.1f} MiB, "
+              f"pickle {os.path.getsize(model_path) / 2 ** 20:.1f} MiB")
+
+        shared_dir = os.path.join(temp_dir, "shared")
+        run_workers(1, model_path, shared_dir, args.rows)
+
+        mib = 2 ** 20
+        print(f"{'mode':8} {'workers':>7} {'RSS/worker':>11} {'private/worker':>15} "
+              f"{'total RSS':>10} {'total PSS':>10}")
+        for n_workers in args.workers:
+            for mode, directory in (("private", ""), ("shared", shared_dir)):
+                reports = run_workers(n_workers, model_path, directory, args.rows)
+                rss = [report["rss"] for report in reports]
+                private = [report["private"] for report in reports]
+                pss = [report["pss"] for report in reports]
+                print(f"{mode:8} {n_workers:7d} {sum(rss) / n_workers / mib:8.1f} MiB "
+                      f"{sum(private) / n_workers / mib:12.1f} MiB {sum(rss) / mib:6.0f} MiB {sum(pss) / mib:6.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Measure serving cold start: import time and time to the first prediction.
+
+Each run starts a fresh interpreter that imports the serving stack (app.py when FastAPI
+is installed, otherwise the modules it is built from), loads a reference model through a
+ModelHolder backed by a local pickle, and scores one live row. The training stack is
+imported in a separate interpreter for comparison. Reports the median of --runs runs.
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import train_reference_model
+from src.forest.utils.main_utils import save_object
+
+SERVING_MODULES = [
+    "src.forest.constant.prediction_pipeline",
+    "src.forest.entity.feature_assembler",
+    "src.forest.serving.batcher",
+    "src.forest.serving.executors",
+    "src.forest.serving.jobs",
+    "src.forest.serving.metrics",
+    "src.forest.serving.model_holder",
+    "src.forest.serving.prediction_cache",
+    "src.forest.serving.streaming",
+]
+
+HEAVY_MODULES = ["sklearn", "boto3", "botocore", "pymongo", "neuro_mf", "dill", "scipy"]
+
+CHILD_SCRIPT = """
+import importlib, json, os, sys, time
+start_time = time.perf_counter()
+modules = json.loads(sys.argv[1])
+try:
+    import app
+    imported = "app"
+except ImportError:
+    for module in modules:
+        importlib.import_module(module)
+    imported = "serving modules"
+import_seconds = time.perf_counter() - start_time
+heavy_at_import = [module for module in json.loads(sys.argv[3]) if module in sys.modules]
+
+from src.forest.entity.feature_assembler import get_feature_assembler
+from src.forest.serving.model_holder import ModelHolder
+from src.forest.utils.main_utils import load_object
+
+
+class LocalModelFile:
+    # stands in for SimpleStorageService: the registry object is a local pickle
+    def __init__(self, path):
+        self.path = path
+
+    def get_object_version(self, bucket_name, s3_key):
+        return str(os.stat(self.path).st_mtime_ns)
+
+    def load_model(self, model_name, bucket_name, model_dir=None, stage_tracker=None):
+        return load_object(self.path)
+
+
+holder = ModelHolder("local", "model.pkl", storage=LocalModelFile(sys.argv[2]))
+model = holder.get_model()
+model_loaded_seconds = time.perf_counter() - start_time
+assembler = get_feature_assembler()
+row = assembler.assemble_record({"elevation": 2596, "aspect": 51, "slope": 3,
+                                 "horizontal_distance_to_hydrology": 258, "vertical_distance_to_hydrology": 0,
+                                 "horizontal_distance_to_roadways": 510,
+                                 "horizontal_distance_to_fire_points": 6279})
+model.predict_features(row, assembler.columns)
+print(json.dumps({"imported": imported, "import_seconds": import_seconds,
+                  "model_loaded_seconds": model_loaded_seconds,
+                  "first_prediction_seconds": time.perf_counter() - start_time,
+                  "heavy_at_import": heavy_at_import}))
+"""
+
+TRAINING_SCRIPT = """
+import time
+start_time = time.perf_counter()
+try:
+    import src.forest.pipeline.train_pipeline
+    print(time.perf_counter() - start_time)
+except ImportError as e:
+    print("unavailable: " + str(e))
+"""
+
+
+def run_child(script: str, *args: str) -> (str, float):
+    start_time = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", script, *args], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": os.getcwd()})
+    return result.stdout.strip().splitlines()[-1], time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = os.path.join(temp_dir, "model.pkl")
+        model = train_reference_model(n_estimators=args.trees)
+        model.compile_forest()
+        save_object(model_path, model)
+
+        runs = []
+        for _ in range(args.runs):
+            output, wall_seconds = run_child(CHILD_SCRIPT, json.dumps(SERVING_MODULES), model_path,
+                                             json.dumps(HEAVY_MODULES))
+            runs.append({**json.loads(output), "process_seconds": wall_seconds})
+
+    def median(key: str) -> float:
+        return statistics.median(run[key] for run in runs)
+
+    print(f"imported {runs[0]['imported']}, heavy modules loaded at import: {runs[0]['heavy_at_import'] or 'none'}")
+    print(f"median of {args.runs} runs:")
+    print(f"  import                      {median('import_seconds') * 1000:8.0f} ms")
+    print(f"  model loaded                {median('model_loaded_seconds') * 1000:8.0f} ms")
+    print(f"  first prediction            {median('first_prediction_seconds') * 1000:8.0f} ms")
+    print(f"  process wall time           {median('process_seconds') * 1000:8.0f} ms (includes interpreter start)")
+    training_output, _ = run_child(TRAINING_SCRIPT)
+    if training_output.startswith("unavailable"):
+        print(f"  training stack import       {training_output}")
+    else:
+        print(f"  training stack import       {float(training_output) * 1000:8.0f} ms (now deferred to the first /train)")
+
+
+if __name__ == "__main__":
+    main()
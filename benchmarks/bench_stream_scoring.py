@@ -0,0 +1,104 @@
+"""
+Measure /predict_stream throughput and memory on a multi-GB upload.
+
+Generates a CSV (or NDJSON) stream of the requested size by repeating rows of
+notebooks/train.csv, feeds it in network-sized pieces through the same RecordChunker,
+FeatureAssembler and SensorModel calls the endpoint uses, and reports MB/s, rows/s and
+peak RSS. Peak RSS staying flat as --megabytes grows shows memory is bounded by the chunk
+size, not by the upload.
+
+    python -m benchmarks.bench_stream_scoring [--megabytes 2048] [--format csv|ndjson] [--chunk-rows 2048]
+"""
+import argparse
+import resource
+import time
+
+from benchmarks.common import synthetic_rows, train_reference_model
+from src.forest.entity.feature_assembler import get_feature_assembler
+from src.forest.serving.streaming import CSV_FORMAT, NDJSON_FORMAT, RecordChunker
+
+PIECE_BYTES = 64 * 1024
+
+
+def generate_stream(megabytes: int, data_format: str):
+    """
+    Yield PIECE_BYTES pieces of a stream of about megabytes MB, built from a repeated block of rows
+    """
+    rows = synthetic_rows(10_000, seed=2)
+    if data_format == CSV_FORMAT:
+        header = rows.to_csv(index=False).split("\n", 1)[0] + "\n"
+        block = rows.to_csv(index=False, header=False).encode()
+        yield header.encode()
+    else:
+        block = rows.to_json(orient="records", lines=True).encode()
+        if not block.endswith(b"\n"):
+            block += b"\n"
+    sent = 0
+    while sent < megabytes * 1_000_000:
+        for start in range(0, len(block), PIECE_BYTES):
+            yield block[start:start + PIECE_BYTES]
+        sent += len(block)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def check_unterminated_last_line() -> None:
+    """
+    Close a stream whose last line has no newline and completes a chunk, in every format
+    """
+    streams = {CSV_FORMAT: b"a,b\n1,2\n3,4\n5,6",
+               NDJSON_FORMAT: b'{"a": 1, "b": 2}\n{"a": 3, "b": 4}\n{"a": 5, "b": 6}'}
+    for data_format, stream in streams.items():
+        chunker = RecordChunker(data_format, chunk_rows=3)
+        rows = [len(dataframe) for dataframe in chunker.feed(stream) + chunker.close()]
+        if rows != [3]:
+            raise RuntimeError(f"{data_format}: 3 rows without a final newline came back as chunks of {rows}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, default=2048, help="size of the generated upload")
+    parser.add_argument("--format", choices=[CSV_FORMAT, NDJSON_FORMAT], default=CSV_FORMAT)
+    parser.add_argument("--chunk-rows", type=int, default=2048)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    check_unterminated_last_line()
+
+    model = train_reference_model(n_estimators=args.trees)
+    model.compile_forest()
+    assembler = get_feature_assembler()
+    chunker = RecordChunker(args.format, chunk_rows=args.chunk_rows)
+    baseline_rss = peak_rss_mb()
+
+    parse_seconds = score_seconds = 0.0
+    output_bytes = 0
+    start_time = time.perf_counter()
+    pieces = generate_stream(args.megabytes, args.format)
+    while True:
+        piece = next(pieces, None)
+        parse_start = time.perf_counter()
+        chunks = chunker.close() if piece is None else chunker.feed(piece)
+        parse_seconds += time.perf_counter() - parse_start
+        for dataframe in chunks:
+            score_start = time.perf_counter()
+            values = {column: dataframe[column] for column in dataframe.columns}
+            predictions = model.predict_features(assembler.assemble_columns(values, len(dataframe)), assembler.columns)
+            output_bytes += len("".join(f"{row},{int(prediction)}\n"
+                                        for row, prediction in zip(dataframe.index, predictions)))
+            score_seconds += time.perf_counter() - score_start
+        if piece is None:
+            break
+    elapsed = time.perf_counter() - start_time
+
+    megabytes = chunker.bytes_total / 1_000_000
+    print(f"format={args.format} chunk_rows={args.chunk_rows} input={megabytes:.0f} MB rows={chunker.rows_total}")
+    print(f"elapsed {elapsed:.1f} s: {megabytes / elapsed:.1f} MB/s, {chunker.rows_total / elapsed:,.0f} rows/s "
+          f"(parse {parse_seconds:.1f} s, assemble+score+format {score_seconds:.1f} s), output {output_bytes / 1e6:.0f} MB")
+    print(f"peak RSS {peak_rss_mb():.0f} MB (after model load {baseline_rss:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare batch prediction on CSV, Parquet and Arrow IPC files: bytes moved to and from the
+bucket, and end-to-end job time.
+
+The same synthetic rows are written as forest_pred_data.csv / .parquet / .arrow to a local
+stand-in for the S3 buckets (LOCAL_STORAGE_DIR), and a prediction job is run on each in a
+fresh interpreter, writing forest_predictions in the same format. Parquet and Arrow files
+use the compact column dtypes of PREDICTION_COLUMN_DTYPES and zstd compression. Every run
+must predict the same Cover_Type for every row. Before the runs, a two-chunk file whose second
+chunk has a value out of its compact dtype's range is checked to fail with a clear error instead
+of a failed cast partway through a job. Needs pyarrow.
+
+    python -m benchmarks.bench_table_formats [--rows 1000000] [--workers 1]
+"""
+import argparse
+import io
+import os
+import tempfile
+
+from benchmarks.bench_parallel_prediction import run_prediction
+from benchmarks.common import synthetic_rows
+from benchmarks.load_test import publish_local_model
+from src.forest.cloud_storage.local_storage import LocalStorageService
+from src.forest.entity.config_entity import PredictionPipelineConfig
+from src.forest.exception import ForestException
+from src.forest.utils.table_format import ARROW, PARQUET, TABLE_FORMATS, read_table, write_dataframe, write_table
+
+
+def check_out_of_range_chunk() -> None:
+    """
+    Write rows whose Elevation only leaves the int16 range in the second chunk, in every compact format
+    """
+    rows = synthetic_rows(4)
+    rows.loc[3, "Elevation"] = 40000
+    for table_format in (PARQUET, ARROW):
+        try:
+            write_dataframe(rows, io.BytesIO(), table_format, chunk_rows=2)
+        except ForestException as e:
+            if "Column Elevation" not in str(e):
+                raise RuntimeError(f"{table_format}: out of range Elevation failed with an unclear error: {e}")
+        else:
+            raise RuntimeError(f"{table_format}: out of range Elevation in the second chunk was written")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--model", help="pickled SensorModel to use instead of training one")
+    args = parser.parse_args()
+    check_out_of_range_chunk()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage_dir = os.path.join(temp_dir, "storage")
+        storage = LocalStorageService(storage_dir)
+        publish_local_model(storage_dir, args.model, args.trees)
+        config = PredictionPipelineConfig()
+        rows = synthetic_rows(args.rows)
+        print(f"input: {args.rows} rows x {rows.shape[1]} columns, chunks of {args.chunk_size} rows, "
+              f"{args.workers} worker(s)")
+
+        mib = 2 ** 20
+        print(f"{'format':8} {'input':>10} {'output':>10} {'transferred':>12} {'seconds':>8} {'rows/s':>9} "
+              f"{'speedup':>8} {'peak RSS':>9} predictions")
+        reference, baseline = None, None
+        for table_format in TABLE_FORMATS:
+            data_file_path = f"forest_pred_data.{table_format}"
+            output_file_name = f"forest_predictions.{table_format}"
+            input_path = storage.object_path(config.data_bucket_name, data_file_path)
+            os.makedirs(os.path.dirname(input_path), exist_ok=True)
+            write_table(rows, input_path, table_format)
+
+            work_dir = os.path.join(temp_dir, f"run-{table_format}")
+            result = run_prediction(storage_dir, work_dir, data_file_path=data_file_path,
+                                    output_file_name=output_file_name, chunk_size=args.chunk_size,
+                                    n_workers=args.workers)
+            output_path = storage.object_path(config.data_bucket_name, output_file_name)
+            with open(output_path, "rb") as output_file:
+                predictions = read_table(output_file, table_format)["Cover_Type"].astype("int64")
+            reference = predictions if reference is None else reference
+            baseline = baseline or result["seconds"]
+
+            input_bytes, output_bytes = os.path.getsize(input_path), os.path.getsize(output_path)
+            same = len(predictions) == len(reference) and bool((predictions.values == reference.values).all())
+            print(f"{table_format:8} {input_bytes / mib:6.1f} MiB {output_bytes / mib:6.1f} MiB "
+                  f"{(input_bytes + output_bytes) / mib:8.1f} MiB {result['seconds']:8.1f} "
+                  f"{args.rows / result['seconds']:9.0f} {baseline / result['seconds']:7.2f}x "
+                  f"{result['peak_rss'] / mib:5.0f} MiB {'identical' if same else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare the flat NumPy forest engine with sklearn's RandomForestClassifier.predict.
+
+Trains the reference model on notebooks/train.csv, checks that the flat engine (float64
+and float32 thresholds) predicts exactly the same classes as sklearn on every row, then
+reports single-row and 10k-row latency for both paths.
+
+    python -m benchmarks.bench_tree_engine [--trees 100] [--repeat 200]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import load_train_data, synthetic_rows, time_call, train_reference_model
+from src.forest.entity.tree_ensemble import FlatForest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions of the single-row timing")
+    args = parser.parse_args()
+
+    model = train_reference_model(n_estimators=args.trees)
+    forest = model.trained_model_object
+    features, _ = load_train_data()
+    transformed = model.preprocessing_object.transform(features)
+
+    flat64 = FlatForest.from_sklearn(forest, dtype=np.float64)
+    flat32 = FlatForest.from_sklearn(forest, dtype=np.float32)
+    expected = forest.predict(transformed)
+    for name, flat_forest in (("float64", flat64), ("float32", flat32)):
+        predicted = flat_forest.predict(transformed)
+        mismatches = int((predicted != expected).sum())
+        proba_identical = np.array_equal(flat_forest.predict_proba(transformed), forest.predict_proba(transformed))
+        print(f"{name}: {flat_forest.n_trees} trees, {flat_forest.n_nodes} nodes, {flat_forest.nbytes / 1e6:.1f} MB, "
+              f"mismatches on {len(expected)} rows: {mismatches}, identical probabilities: {proba_identical}")
+        if mismatches:
+            raise SystemExit(f"{name} flat forest disagrees with sklearn")
+
+    single_row = transformed[:1]
+    batch = model.preprocessing_object.transform(synthetic_rows(10_000))
+    print(f"\n{'path':<22}{'1 row p50 ms':>14}{'1 row p95 ms':>14}{'10k rows ms':>14}")
+    for name, predict in (("sklearn", forest.predict), ("flat float64", flat64.predict), ("flat float32", flat32.predict)):
+        single = time_call(lambda: predict(single_row), repeat=args.repeat)
+        bulk = time_call(lambda: predict(batch), repeat=5)
+        print(f"{name:<22}{single['p50_ms']:>14.3f}{single['p95_ms']:>14.3f}{bulk['p50_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Helpers shared by the benchmark scripts. Run every benchmark from the repository root,
+e.g. `python -m benchmarks.bench_tree_engine`.
+"""
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.forest.components.data_transformation import DataTransformation
+from src.forest.constant.training_pipeline import TARGET_COLUMN
+from src.forest.entity.estimator import SensorModel
+
+TRAIN_CSV_PATH = "notebooks/train.csv"
+
+
+def load_train_data(path: str = TRAIN_CSV_PATH):
+    """
+    Return (features, target) from the Kaggle forest cover training file
+    """
+    dataframe = pd.read_csv(path)
+    return dataframe.drop(columns=[TARGET_COLUMN]), dataframe[TARGET_COLUMN]
+
+
+def train_reference_model(n_estimators: int = 100, min_samples_leaf: int = 3, random_state: int = 42) -> SensorModel:
+    """
+    Fit the same preprocessor and RandomForest family the training pipeline uses on notebooks/train.csv
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    features, target = load_train_data()
+    preprocessor = DataTransformation(data_ingestion_artifact=None,
+                                      data_transformation_config=None).get_data_transformer_object()
+    transformed = preprocessor.fit_transform(features)
+    forest = RandomForestClassifier(n_estimators=n_estimators, min_samples_leaf=min_samples_leaf,
+                                    random_state=random_state, n_jobs=-1)
+    forest.fit(transformed, target)
+    forest.set_params(n_jobs=None)
+    return SensorModel(preprocessing_object=preprocessor, trained_model_object=forest)
+
+
+def synthetic_rows(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Sample n_rows rows (with replacement) from notebooks/train.csv, without the target column
+    """
+    features, _ = load_train_data()
+    rng = np.random.default_rng(seed)
+    return features.iloc[rng.integers(0, len(features), n_rows)].reset_index(drop=True)
+
+
+def time_call(fn: Callable, repeat: int) -> Dict[str, float]:
+    """
+    Call fn repeat times and return latency percentiles in milliseconds
+    """
+    samples: List[float] = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start_time) * 1000.0)
+    samples_arr = np.array(samples)
+    return {
+        "p50_ms": float(np.percentile(samples_arr, 50)),
+        "p95_ms": float(np.percentile(samples_arr, 95)),
+        "mean_ms": float(samples_arr.mean()),
+    }
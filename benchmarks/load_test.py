@@ -0,0 +1,479 @@
+"""
+Replay recorded or synthetic traffic against the serving app and report throughput,
+p50/p95/p99 latency and error rate per endpoint.
+
+By default the app is started locally under uvicorn and loads its model from a local
+stand-in for the S3 model registry (LOCAL_STORAGE_DIR), so no network or AWS credentials
+are needed. --url targets an already running server instead.
+
+With --concurrency only, each connection sends its next request as soon as the previous
+one is answered (closed loop). With --rate, requests are started on a fixed schedule
+whatever the response times (open loop) and their latency counts from the scheduled
+time, so queueing in front of a saturated server shows up in the tail.
+
+    python -m benchmarks.load_test --duration 30 --concurrency 16 --mix live=0.9,batch=0.1
+    python -m benchmarks.load_test --rate 200 --traffic traffic.ndjson --output results.json
+    python -m benchmarks.load_test --compare before.json after.json
+
+Traffic files hold one request per line and are replayed in order, cycling:
+
+    {"endpoint": "live", "fields": {"elevation": 2596, ...}}     form POST /predict_live
+    {"endpoint": "batch", "records": [{"elevation": 2596, ...}]}  JSON POST /predict_batch
+    {"endpoint": "stream", "records": [{"elevation": 2596, ...}]} CSV POST /predict_stream
+
+--save-traffic writes the synthetic stream in that format, so two releases can be measured
+against exactly the same requests.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import TRAIN_CSV_PATH
+
+LIVE_FIELDS = ["elevation", "aspect", "slope", "horizontal_distance_to_hydrology", "vertical_distance_to_hydrology",
+               "horizontal_distance_to_roadways", "hillshade_9am", "hillshade_noon", "hillshade_3pm",
+               "horizontal_distance_to_fire_points"]
+ENDPOINT_PATHS = {"live": "/predict_live", "batch": "/predict_batch", "stream": "/predict_stream"}
+PERCENTILES = (50, 95, 99)
+
+
+class HttpConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client connection; the load generator only needs status and body
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      content_type: Optional[str] = None) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+        try:
+            self._writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+            await self._writer.drain()
+            return await self._read_response()
+        except BaseException:
+            self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in response_headers:
+            body = await self._reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                parts.append(await self._reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b"".join(part[:-2] for part in parts)
+        else:
+            body = await self._reader.read()
+            response_headers["connection"] = "close"
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, body
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def synthetic_traffic(n_requests: int, mix: Dict[str, float], batch_rows: int, stream_rows: int,
+                      seed: int = 0) -> List[dict]:
+    """
+    Build requests from rows sampled out of notebooks/train.csv, endpoints drawn according to mix
+    """
+    dataframe = pd.read_csv(TRAIN_CSV_PATH)
+    dataframe.columns = [str(column).lower() for column in dataframe.columns]
+    rows = dataframe[LIVE_FIELDS].to_dict(orient="records")
+    rng = random.Random(seed)
+    endpoints, weights = zip(*mix.items())
+    traffic = []
+    for endpoint in rng.choices(endpoints, weights=weights, k=n_requests):
+        if endpoint == "live":
+            traffic.append({"endpoint": "live", "fields": rng.choice(rows)})
+        else:
+            n_rows = batch_rows if endpoint == "batch" else stream_rows
+            traffic.append({"endpoint": endpoint, "records": rng.choices(rows, k=n_rows)})
+    return traffic
+
+
+def read_traffic(path: str) -> List[dict]:
+    with open(path) as traffic_file:
+        traffic = [json.loads(line) for line in traffic_file if line.strip()]
+    unknown = {request.get("endpoint") for request in traffic} - set(ENDPOINT_PATHS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in {path}: {sorted(map(str, unknown))}")
+    return traffic
+
+
+def encode_request(request: dict) -> Tuple[str, str, bytes, str, int]:
+    """
+    :return: (endpoint, path, body, content type, rows)
+    """
+    endpoint = request["endpoint"]
+    if endpoint == "live":
+        body = urlencode(request["fields"]).encode()
+        return endpoint, ENDPOINT_PATHS[endpoint], body, "application/x-www-form-urlencoded", 1
+    records = request["records"]
+    if endpoint == "batch":
+        body = json.dumps({"records": records}).encode()
+        return endpoint, ENDPOINT_PATHS[endpoint], body, "application/json", len(records)
+    body = pd.DataFrame.from_records(records).to_csv(index=False).encode()
+    return endpoint, ENDPOINT_PATHS[endpoint], body, "text/csv", len(records)
+
+
+def response_ok(endpoint: str, status: int, body: bytes) -> bool:
+    if status >= 400:
+        return False
+    if endpoint == "live":
+        # /predict_live renders failures into the page with a 200
+        return b"Error:" not in body
+    if endpoint == "stream":
+        # failures after the response started are reported as the last line
+        last_line = body.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        return not (last_line.startswith(b"error,") or last_line.startswith(b'{"error"'))
+    return True
+
+
+class LoadGenerator:
+    """
+    This class sends encoded requests over a pool of keep-alive connections and records
+    (endpoint, start time, latency, status, ok, rows) for each of them.
+    """
+
+    def __init__(self, host: str, port: int, requests: List[Tuple[str, str, bytes, str, int]],
+                 concurrency: int, rate: Optional[float], duration: float, timeout: float):
+        self.host = host
+        self.port = port
+        self.requests = requests
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.timeout = timeout
+        self.samples: List[Tuple[str, float, float, int, bool, int]] = []
+        self._next_request = 0
+
+    def _take_request(self):
+        request = self.requests[self._next_request % len(self.requests)]
+        self._next_request += 1
+        return request
+
+    async def _send(self, connection: HttpConnection, request, start_time: float) -> None:
+        endpoint, path, body, content_type, n_rows = request
+        try:
+            status, response_body = await asyncio.wait_for(connection.request("POST", path, body, content_type),
+                                                           self.timeout)
+            ok = response_ok(endpoint, status, response_body)
+        except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError, ValueError):
+            connection.close()
+            status, ok = 0, False
+        self.samples.append((endpoint, start_time, time.perf_counter() - start_time, status, ok, n_rows))
+
+    async def _closed_loop_worker(self, end_time: float) -> None:
+        connection = HttpConnection(self.host, self.port)
+        while time.perf_counter() < end_time:
+            await self._send(connection, self._take_request(), time.perf_counter())
+        connection.close()
+
+    async def _open_loop(self, start_time: float) -> None:
+        connections: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.concurrency):
+            connections.put_nowait(HttpConnection(self.host, self.port))
+
+        async def send_scheduled(request, scheduled_time: float) -> None:
+            connection = await connections.get()
+            try:
+                await self._send(connection, request, scheduled_time)
+            finally:
+                connections.put_nowait(connection)
+
+        tasks = []
+        n_requests = int(self.duration * self.rate)
+        for index in range(n_requests):
+            scheduled_time = start_time + index / self.rate
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send_scheduled(self._take_request(), scheduled_time)))
+        await asyncio.gather(*tasks)
+        while not connections.empty():
+            connections.get_nowait().close()
+
+    async def run(self) -> float:
+        """
+        Send requests for duration seconds
+        :return: Start time of the run on the time.perf_counter clock
+        """
+        start_time = time.perf_counter()
+        if self.rate:
+            await self._open_loop(start_time)
+        else:
+            await asyncio.gather(*(self._closed_loop_worker(start_time + self.duration)
+                                   for _ in range(self.concurrency)))
+        return start_time
+
+
+def summarize(samples: List[Tuple[str, float, float, int, bool, int]], window_seconds: float) -> dict:
+    latencies = np.array([sample[2] for sample in samples]) * 1000.0
+    n_errors = sum(not sample[4] for sample in samples)
+    status_codes: Dict[str, int] = {}
+    for sample in samples:
+        status_codes[str(sample[3])] = status_codes.get(str(sample[3]), 0) + 1
+    summary = {
+        "requests": len(samples),
+        "errors": n_errors,
+        "error_rate": n_errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / window_seconds,
+        "rows_per_second": sum(sample[5] for sample in samples if sample[4]) / window_seconds,
+        "status_codes": dict(sorted(status_codes.items())),
+        "latency_ms": {},
+    }
+    if samples:
+        summary["latency_ms"] = {f"p{percentile}": float(np.percentile(latencies, percentile))
+                                 for percentile in PERCENTILES}
+        summary["latency_ms"].update(mean=float(latencies.mean()), max=float(latencies.max()))
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def publish_local_model(storage_dir: str, model_path: Optional[str], trees: int) -> None:
+    """
+    Put a model where ModelHolder.default() looks for it in the local stand-in registry
+    """
+    from src.forest.cloud_storage.local_storage import LocalStorageService
+    from src.forest.entity.config_entity import PredictionPipelineConfig
+
+    config = PredictionPipelineConfig()
+    destination = LocalStorageService(storage_dir).object_path(config.model_bucket_name, config.model_file_path)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if model_path:
+        with open(model_path, "rb") as source, open(destination, "wb") as target:
+            target.write(source.read())
+        return
+
+    from benchmarks.common import train_reference_model
+    from src.forest.utils.main_utils import save_object
+
+    print(f"training a {trees}-tree reference model for the local registry")
+    model = train_reference_model(n_estimators=trees)
+    model.compile_forest()
+    save_object(destination, model)
+
+
+def start_local_server(storage_dir: str, port: int, workers: int, log_path: str) -> subprocess.Popen:
+    environment = {**os.environ, "PYTHONPATH": os.getcwd(), "LOCAL_STORAGE_DIR": storage_dir}
+    command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--no-access-log"]
+    with open(log_path, "wb") as log_file:
+        return subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, env=environment)
+
+
+async def wait_until_ready(host: str, port: int, probe: Tuple[str, str, bytes, str, int], timeout: float) -> None:
+    """
+    Wait until the server answers a real prediction, so model loading is not measured
+    """
+    deadline = time.perf_counter() + timeout
+    last_error = "no response"
+    while time.perf_counter() < deadline:
+        connection = HttpConnection(host, port)
+        try:
+            endpoint, path, body, content_type, _ = probe
+            status, response_body = await connection.request("POST", path, body, content_type)
+            if response_ok(endpoint, status, response_body):
+                return
+            last_error = f"HTTP {status}: {response_body[:200]!r}"
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            last_error = str(e)
+        finally:
+            connection.close()
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {host}:{port} not ready after {timeout} s: {last_error}")
+
+
+async def fetch_json(host: str, port: int, path: str) -> Optional[dict]:
+    connection = HttpConnection(host, port)
+    try:
+        status, body = await connection.request("GET", path)
+        return json.loads(body) if status == 200 else None
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        return None
+    finally:
+        connection.close()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':8} {'requests':>8} {'errors':>7} {'req/s':>8} {'rows/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, summary in [*report["endpoints"].items(), ("overall", report["overall"])]:
+        latency = summary["latency_ms"]
+        print(f"{name:8} {summary['requests']:8d} {summary['error_rate']:7.2%} {summary['throughput_rps']:8.1f} "
+              f"{summary['rows_per_second']:9.1f} {latency.get('p50', 0):8.1f} {latency.get('p95', 0):8.1f} "
+              f"{latency.get('p99', 0):8.1f}")
+
+
+def compare_reports(before_path: str, after_path: str) -> None:
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"{before_path} ({before['environment'].get('git_commit')}) -> "
+          f"{after_path} ({after['environment'].get('git_commit')})")
+    names = [name for name in after["endpoints"] if name in before["endpoints"]] + ["overall"]
+    for name in names:
+        old = before["overall"] if name == "overall" else before["endpoints"][name]
+        new = after["overall"] if name == "overall" else after["endpoints"][name]
+        metrics = [("req/s", old["throughput_rps"], new["throughput_rps"]),
+                   ("error rate", old["error_rate"], new["error_rate"])]
+        metrics += [(f"{key} ms", old["latency_ms"].get(key, 0.0), new["latency_ms"].get(key, 0.0))
+                    for key in ("p50", "p95", "p99")]
+        changes = ", ".join(f"{label} {old_value:.4g} -> {new_value:.4g}"
+                            + (f" ({(new_value - old_value) / old_value:+.1%})" if old_value else "")
+                            for label, old_value, new_value in metrics)
+        print(f"  {name:8} {changes}")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint.strip() not in ENDPOINT_PATHS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {endpoint!r}, expected one of {list(ENDPOINT_PATHS)}")
+        weights[endpoint.strip()] = float(weight or 1)
+    return weights
+
+
+async def run_load_test(args, host: str, port: int, requests: List[Tuple[str, str, bytes, str, int]]) -> dict:
+    await wait_until_ready(host, port, next(request for request in requests if request[0] != "stream"),
+                           timeout=args.ready_timeout)
+    generator = LoadGenerator(host, port, requests, concurrency=args.concurrency, rate=args.rate,
+                              duration=args.warmup + args.duration, timeout=args.timeout)
+    start_time = await generator.run()
+    measured = [sample for sample in generator.samples if sample[1] >= start_time + args.warmup]
+    by_endpoint: Dict[str, list] = {}
+    for sample in measured:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "environment": {"git_commit": git_commit(), "python": platform.python_version(),
+                        "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+        "endpoints": {name: summarize(samples, args.duration) for name, samples in sorted(by_endpoint.items())},
+        "overall": summarize(measured, args.duration),
+        "serving_stats": await fetch_json(host, port, "/serving/stats"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="server to load, e.g. http://localhost:8080; started locally when omitted")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=8, help="connections, i.e. requests in flight at most")
+    parser.add_argument("--rate", type=float, help="requests per second, open loop; closed loop when omitted")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request counts as failed")
+    parser.add_argument("--traffic", help="NDJSON file of recorded requests, synthetic traffic when omitted")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("live=1"),
+                        help="synthetic endpoint weights, e.g. live=0.9,batch=0.1,stream=0.01")
+    parser.add_argument("--batch-rows", type=int, default=100, help="rows per synthetic /predict_batch request")
+    parser.add_argument("--stream-rows", type=int, default=5000, help="rows per synthetic /predict_stream request")
+    parser.add_argument("--synthetic-requests", type=int, default=10000, help="distinct synthetic requests")
+    parser.add_argument("--save-traffic", help="write the synthetic requests to this NDJSON file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", help="pickled model served by the local server; a reference model is "
+                                        "trained when omitted")
+    parser.add_argument("--trees", type=int, default=100, help="trees of the reference model")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn workers of the local server")
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    if args.traffic:
+        traffic = read_traffic(args.traffic)
+    else:
+        traffic = synthetic_traffic(args.synthetic_requests, args.mix, args.batch_rows, args.stream_rows, args.seed)
+        if args.save_traffic:
+            with open(args.save_traffic, "w") as traffic_file:
+                traffic_file.writelines(json.dumps(request) + "\n" for request in traffic)
+    requests = [encode_request(request) for request in traffic]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        server = None
+        if args.url:
+            target = urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+        else:
+            publish_local_model(temp_dir, args.model, args.trees)
+            host, port = "127.0.0.1", free_port()
+            log_path = os.path.join(temp_dir, "server.log")
+            server = start_local_server(temp_dir, port, args.server_workers, log_path)
+        try:
+            report = asyncio.run(run_load_test(args, host, port, requests))
+        except Exception:
+            if server is not None:
+                with open(log_path, errors="replace") as log_file:
+                    print(log_file.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
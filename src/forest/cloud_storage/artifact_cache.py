@@ -0,0 +1,221 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+from src.forest.constant.application import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES
+from src.forest.logger import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is then only serialized within a process
+    fcntl = None
+
+# staging files older than this were left by a process that died while writing
+STALE_STAGING_SECONDS = 3600
+
+
+class ArtifactCache:
+    """
+    This class keeps downloaded S3 objects on local disk, keyed by bucket, key and ETag.
+
+    An entry is only ever written for one (bucket, key, ETag), so a replaced object is a miss
+    and its old copy simply ages out. Entries are written under a temporary name and renamed
+    into place, hits refresh the file's modification time, and once the cache holds more than
+    max_bytes the least recently used entries are deleted under an exclusive lock file, so
+    every process of a host can share one directory.
+    """
+
+    _instances: Dict[Tuple[str, int], "ArtifactCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        :param directory: Cache directory, created on first write
+        :param max_bytes: Size above which least recently used entries are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+        self.evictions = 0
+
+    @classmethod
+    def default(cls) -> Optional["ArtifactCache"]:
+        """
+        Return the process-wide cache configured by ARTIFACT_CACHE_DIR and ARTIFACT_CACHE_MAX_BYTES,
+        or None when ARTIFACT_CACHE_MAX_BYTES is 0. Its statistics are logged when the process exits,
+        and by log_artifact_cache_stats when a pipeline run finishes.
+        """
+        if ARTIFACT_CACHE_MAX_BYTES <= 0:
+            return None
+        key = (ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES)
+        with cls._instances_lock:
+            cache = cls._instances.get(key)
+            if cache is None:
+                cache = cls(directory=ARTIFACT_CACHE_DIR, max_bytes=ARTIFACT_CACHE_MAX_BYTES)
+                cls._instances[key] = cache
+                atexit.register(cache.log_stats)
+        return cache
+
+    def entry_path(self, bucket_name: str, s3_key: str, etag: str) -> str:
+        digest = hashlib.sha256(f"{bucket_name}\0{s3_key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def open(self, bucket_name: str, s3_key: str, etag: str) -> Optional[BinaryIO]:
+        """
+        Open the cached body of s3_key at etag for reading, or return None on a miss
+        """
+        path = self.entry_path(bucket_name, s3_key, etag)
+        try:
+            entry_file = open(path, "rb")
+            # the modification time orders entries for eviction
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        size = os.fstat(entry_file.fileno()).st_size
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+        logging.info(f"Artifact cache hit for s3://{bucket_name}/{s3_key} at {etag}: {size} bytes read from disk")
+        return entry_file
+
+    def get(self, bucket_name: str, s3_key: str, etag: str) -> Optional[bytes]:
+        """
+        Return the cached body of s3_key at etag, or None on a miss
+        """
+        entry_file = self.open(bucket_name, s3_key, etag)
+        if entry_file is None:
+            return None
+        with entry_file:
+            return entry_file.read()
+
+    def put(self, bucket_name: str, s3_key: str, etag: str, data: bytes) -> None:
+        """
+        Store the body of s3_key at etag. Failures are logged, the cache never fails a download.
+        """
+        self._store(bucket_name, s3_key, etag, len(data), lambda staging_file: staging_file.write(data))
+
+    def put_stream(self, bucket_name: str, s3_key: str, etag: str, stream: BinaryIO, size: int) -> Optional[str]:
+        """
+        Copy the size bytes of stream, e.g. a GET body, into the entry of s3_key at etag without holding them
+        in memory. Nothing is read from stream when the entry would not fit in the cache.
+        :return: Path of the entry, None when it was not stored; stream may then be partly consumed
+        """
+        return self._store(bucket_name, s3_key, etag, size,
+                           lambda staging_file: shutil.copyfileobj(stream, staging_file, 1024 * 1024))
+
+    def _store(self, bucket_name: str, s3_key: str, etag: str, size: int,
+               write: Callable[[BinaryIO], object]) -> Optional[str]:
+        with self._lock:
+            self.bytes_downloaded += size
+        if size > self.max_bytes:
+            return None
+        path = self.entry_path(bucket_name, s3_key, etag)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_descriptor, staging_path = tempfile.mkstemp(prefix=".staging-", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(file_descriptor, "wb") as staging_file:
+                    write(staging_file)
+                os.replace(staging_path, path)
+            except BaseException:
+                os.unlink(staging_path)
+                raise
+            self.evict()
+            return path
+        except OSError as e:
+            logging.warning(f"Cannot cache s3://{bucket_name}/{s3_key} at {etag} in {self.directory}: {e}")
+            return None
+
+    @contextmanager
+    def _exclusive(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits in max_bytes
+        :return: Bytes deleted
+        """
+        with self._lock, self._exclusive():
+            entries = []
+            now = time.time()
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.startswith(".staging-"):
+                        if now - stat.st_mtime > STALE_STAGING_SECONDS:
+                            self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            deleted_bytes = 0
+            for _, size, path in sorted(entries):
+                if total_bytes - deleted_bytes <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    deleted_bytes += size
+                    self.evictions += 1
+        if deleted_bytes:
+            logging.info(f"Evicted {deleted_bytes} bytes from the artifact cache in {self.directory}")
+        return deleted_bytes
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        # readers that already opened the file keep reading it after the unlink
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_downloaded": self.bytes_downloaded,
+            "evictions": self.evictions,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        if stats["hits"] or stats["misses"]:
+            logging.info(f"Artifact cache in {self.directory}: {stats['hits']} hits, {stats['misses']} misses "
+                         f"(hit rate {stats['hit_rate']:.0%}), {stats['bytes_saved']} bytes served from disk, "
+                         f"{stats['bytes_downloaded']} bytes downloaded, {stats['evictions']} evictions")
+
+
+def log_artifact_cache_stats() -> None:
+    """
+    Log the statistics of the process-wide cache so far, e.g. when a pipeline run or job finishes
+    """
+    cache = ArtifactCache.default()
+    if cache is not None:
+        cache.log_stats()
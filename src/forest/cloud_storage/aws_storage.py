@@ -1,38 +1,275 @@
 from logging import exception
-import boto3
-from src.forest.configuration.aws_connection import S3Client
-from io import StringIO
-from typing import Union,List
+from src.forest.cloud_storage.artifact_cache import ArtifactCache
+from src.forest.cloud_storage.compression import CompressedWriter, compression_for, open_decompressed
+from src.forest.cloud_storage.object_index import ArtifactManifest, KeyExistenceCache
+from src.forest.cloud_storage.s3_streams import StreamingBodyReader, TeeWriter, spool_body
+from src.forest.cloud_storage.storage_backend import ObjectNotFound, StorageBackend, get_storage_backend
+from src.forest.constant.application import ARTIFACT_COMPRESSION, ARTIFACT_COMPRESSION_LEVEL, \
+    ARTIFACT_MANIFEST_KEY, ARTIFACT_MANIFEST_TTL_SECONDS, S3_READ_SPILL_BYTES, S3_SPILL_DIR, S3_UPLOAD_CONCURRENCY, \
+    S3_UPLOAD_PART_SIZE
+from contextlib import ExitStack, nullcontext
+from io import BufferedReader, BytesIO, StringIO
+from typing import TYPE_CHECKING, BinaryIO, Callable, ContextManager, Dict, Optional, Tuple, Union, List
 import os,sys
+import shutil
+import time
 from src.forest.logger import logging
-from mypy_boto3_s3.service_resource import Bucket
 from src.forest.exception import ForestException
-from botocore.exceptions import ClientError
+from src.forest.entity.estimator import MappedSensorModel
+from src.forest.entity.model_bundle import is_model_bundle, model_bundle_path
+from src.forest.utils.table_format import CSV, read_table, table_format_for, write_dataframe
 from pandas import DataFrame,read_csv
+import numpy as np
 import pickle
+import tempfile
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3.service_resource import Bucket
+
+
+class StoredObject:
+    """
+    Object of a bucket as returned by get_file_object, read with get() like a boto3 s3.Object,
+    whose body is decompressed as it is read
+    """
+
+    def __init__(self, backend: StorageBackend, bucket_name: str, key: str):
+        self.backend = backend
+        self.bucket_name = bucket_name
+        self.key = key
+
+    def get(self) -> dict:
+        body, info = self.backend.get(self.bucket_name, self.key)
+        return {"Body": open_decompressed(body, info.compression), "ETag": f'"{info.version}"',
+                "ContentLength": info.size}
+
+
 class SimpleStorageService:
 
 # you can call the static method without creating an instance of the class
 # decodes the bytes into UTF-8
 
-    def __init__(self):
-        s3_client = S3Client()
-        self.s3_resource = s3_client.s3_resource
-        self.s3_client = s3_client.s3_client
+    def __init__(self, backend: Optional[StorageBackend] = None, compression: Optional[str] = None,
+                 compression_level: Optional[int] = ARTIFACT_COMPRESSION_LEVEL):
+        """
+        :param backend: Store of the buckets, the S3 or local directory backend configured by STORAGE_BACKEND
+                        when None, see get_storage_backend
+        :param compression: Codec of the artifacts written with compress=True, "" for none; ARTIFACT_COMPRESSION
+                            when None on backends that compress their writes
+        :param compression_level: Level of the codec, its default level when None
+        """
+        self.backend = backend or get_storage_backend()
+        if compression is None:
+            compression = ARTIFACT_COMPRESSION if self.backend.compress_writes else ""
+        self.compression = compression
+        self.compression_level = compression_level
+        # boto3 client and resource of the S3 backend, None on other backends
+        self.s3_resource = getattr(self.backend, "s3_resource", None)
+        self.s3_client = getattr(self.backend, "s3_client", None)
+        self.artifact_cache: Optional[ArtifactCache] = ArtifactCache.default()
+        self.key_cache = KeyExistenceCache() if self.backend.cache_metadata \
+            else KeyExistenceCache(ttl=0, negative_ttl=0)
+        # artifact manifest of each bucket, see read_manifest
+        self._manifests: Dict[str, ArtifactManifest] = {}
 
     def s3_key_path_available(self,bucket_name,s3_key)->bool:
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=s3_key)]
-            if len(file_objects) > 0:
-                return True
-            else:
-                return False
+            return self.key_exists(bucket_name, s3_key)
         except Exception as e:
             raise ForestException(e,sys)
 
+    def key_exists(self, bucket_name: str, s3_key: str) -> bool:
+        """
+        Method Name :   key_exists
+        Description :   This method checks that the exact s3_key object exists with a HEAD request of the
+                        storage backend, answered from key_cache while its last answer is fresh
+
+        Output      :   True when the object exists
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        exists = self.key_cache.get(bucket_name, s3_key)
+        if exists is not None:
+            return exists
+        try:
+            exists = self.backend.head(bucket_name, s3_key) is not None
+        except Exception as e:
+            raise ForestException(e, sys) from e
+        self.key_cache.put(bucket_name, s3_key, exists)
+        return exists
+
+    def read_manifest(self, bucket_name: str, max_age: float = ARTIFACT_MANIFEST_TTL_SECONDS) -> ArtifactManifest:
+        """
+        Method Name :   read_manifest
+        Description :   This method returns the artifact manifest of bucket_name. A copy checked less
+                        than max_age seconds ago is returned as is; otherwise a GET conditional on its
+                        ETag only downloads the manifest again when it changed
+
+        Output      :   ArtifactManifest, empty when the bucket has none yet
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        manifest = self._manifests.get(bucket_name)
+        if manifest is not None and self.backend.cache_metadata and time.monotonic() - manifest.checked_at < max_age:
+            return manifest
+        try:
+            response = self.backend.get(bucket_name, ARTIFACT_MANIFEST_KEY,
+                                        if_none_match=None if manifest is None else manifest.version)
+            # None: the manifest did not change
+            if response is not None:
+                body, info = response
+                with open_decompressed(body, info.compression) as body:
+                    manifest = ArtifactManifest.from_bytes(body.read(), version=info.version)
+        except ObjectNotFound:
+            manifest = ArtifactManifest()
+        except Exception as e:
+            raise ForestException(e, sys) from e
+        manifest.checked_at = time.monotonic()
+        self._manifests[bucket_name] = manifest
+        return manifest
+
+    def find_artifact(self, bucket_name: str, name: str) -> Optional[str]:
+        """
+        Method Name :   find_artifact
+        Description :   This method looks up the key of the name artifact, e.g. "model", in the manifest
+                        of bucket_name instead of listing the bucket
+
+        Output      :   Key of the artifact, None when it was never registered
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        entry = self.read_manifest(bucket_name).get(name)
+        return None if entry is None else entry["key"]
+
+    def register_artifact(self, bucket_name: str, name: str, s3_key: str) -> None:
+        """
+        Method Name :   register_artifact
+        Description :   This method records the uploaded s3_key object as the name artifact in the manifest
+                        of bucket_name, with its ETag and size. The manifest is rewritten whole, so two
+                        registrations in the same bucket at the same moment may lose one of them
+
+        Output      :   Manifest object is updated in s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the register_artifact method of S3Operations class")
+
+        try:
+            info = self.backend.head(bucket_name, s3_key)
+            if info is None:
+                raise ObjectNotFound(f"Object {s3_key} not found in bucket {bucket_name}", sys)
+            manifest = self.read_manifest(bucket_name, max_age=0)
+            manifest.set(name, s3_key, etag=info.version, size=info.size)
+            manifest.version = self.backend.put(bucket_name, ARTIFACT_MANIFEST_KEY, manifest.to_bytes(),
+                                                content_type="application/json").version
+            manifest.checked_at = time.monotonic()
+            self.key_cache.put(bucket_name, s3_key, True)
+            logging.info(f"Registered {s3_key} as the {name} artifact of bucket {bucket_name}")
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def get_object_version(self, bucket_name: str, s3_key: str) -> str:
+        """
+        Method Name :   get_object_version
+        Description :   This method returns the version of the s3_key object using a HEAD request
+
+        Output      :   ETag of the object, suffixed with the VersionId when bucket versioning is enabled;
+                        size and modification time of the file on the local backend
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the get_object_version method of S3Operations class")
+
+        try:
+            info = self.backend.head(bucket_name, s3_key)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+        if info is None:
+            raise ObjectNotFound(f"Object {s3_key} not found in bucket {bucket_name}", sys)
+        logging.info("Exited the get_object_version method of S3Operations class")
+        return info.version
+
+
+    def download_object(self, bucket_name: str, s3_key: str, version: str) -> Tuple[bytes, str]:
+        """
+        Method Name :   download_object
+        Description :   This method downloads the s3_key object at the version returned by get_object_version
+
+        Output      :   (body, version); if the object was replaced since version was read, the current
+                        body and its own version are returned
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the download_object method of S3Operations class")
+
+        try:
+            body, info = self.backend.get(bucket_name, s3_key, version=version)
+            with open_decompressed(body, info.compression) as body:
+                content = body.read()
+            logging.info("Exited the download_object method of S3Operations class")
+            return content, info.version
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def open_object_cached(self, bucket_name: str, s3_key: str,
+                           stage_tracker: Optional[Callable[[str], ContextManager]] = None,
+                           spill_threshold: int = S3_READ_SPILL_BYTES) -> BinaryIO:
+        """
+        Method Name :   open_object_cached
+        Description :   This method opens the body of the s3_key object for reading. It is read from the local
+                        artifact cache when a HEAD request shows its ETag is unchanged; otherwise it is
+                        streamed into the cache and read from there. Without the cache, a body above
+                        spill_threshold bytes is streamed into a temporary file and a smaller one is read
+                        into a single bytes buffer, see spool_body. Objects of the local backend are
+                        opened in place. Compressed objects are stored compressed and decompressed as
+                        they are read
+
+        Output      :   Binary file object, to be closed by the caller
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        track = stage_tracker or (lambda stage_name: nullcontext())
+        try:
+            path = self.backend.local_path(bucket_name, s3_key)
+            if path is not None:
+                # a cached copy of a local file would only duplicate it
+                with track("download"):
+                    body, info = self.backend.get(bucket_name, s3_key)
+                    return open_decompressed(body, info.compression)
+            with track("cache_check"):
+                info = self.backend.head(bucket_name, s3_key)
+                if info is None:
+                    raise ObjectNotFound(f"Object {s3_key} not found in bucket {bucket_name}", sys)
+                body_file = None if self.artifact_cache is None \
+                    else self.artifact_cache.open(bucket_name, s3_key, info.version)
+            if body_file is not None:
+                return open_decompressed(body_file, info.compression)
+            with track("download"):
+                body, info = self.backend.get(bucket_name, s3_key, version=info.version)
+                if self.artifact_cache is not None:
+                    with body:
+                        path = self.artifact_cache.put_stream(bucket_name, s3_key, info.version, body, info.size)
+                    if path is not None:
+                        try:
+                            return open_decompressed(open(path, "rb"), info.compression)
+                        except OSError:
+                            # evicted by another process in the meantime
+                            pass
+                    # the body may be partly read into the cache, so it is requested again
+                    body, info = self.backend.get(bucket_name, s3_key, version=info.version)
+                with body:
+                    return open_decompressed(spool_body(body, info.size, spill_threshold), info.compression)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def read_object_cached(self, bucket_name: str, s3_key: str,
+                           stage_tracker: Optional[Callable[[str], ContextManager]] = None) -> bytes:
+        """
+        Method Name :   read_object_cached
+        Description :   This method returns the body of the s3_key object, see open_object_cached
+
+        Output      :   Object body as bytes
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            with self.open_object_cached(bucket_name, s3_key, stage_tracker=stage_tracker) as body_file:
+                return body_file.read()
+        except Exception as e:
+            raise ForestException(e, sys) from e
 
-    
     @staticmethod 
     def read_object(object_name: object, decode: bool = True, make_readable: bool = False) -> Union[StringIO, str]:
         """
@@ -78,7 +315,8 @@ class SimpleStorageService:
                 content = content.decode()
 
             if make_readable:
-                content = StringIO(content)
+                # BytesIO shares the bytes object instead of copying it
+                content = StringIO(content) if decode else BytesIO(content)
 
             logging.info("Exited the read_object method of S3Operations class")
             return content
@@ -87,10 +325,10 @@ class SimpleStorageService:
             logging.error(f"Error in read_object: {str(e)}")
             raise ForestException(e, sys) from e
 
-    def get_bucket(self, bucket_name: str) -> Bucket:
+    def get_bucket(self, bucket_name: str) -> "Bucket":
         """
         Method Name :   get_bucket
-        Description :   This method gets the bucket object based on the bucket_name
+        Description :   This method gets the boto3 bucket object based on the bucket_name, on the S3 backend only
 
         Output      :   Bucket object is returned based on the bucket name
         On Failure  :   Write an exception log and then raise an exception
@@ -101,6 +339,8 @@ class SimpleStorageService:
         logging.info("Entered the get_bucket method of S3Operations class")
 
         try:
+            if self.s3_resource is None:
+                raise ForestException(f"The {self.backend.name} storage backend has no boto3 buckets", sys)
             bucket = self.s3_resource.Bucket(bucket_name)
             logging.info("Exited the get_bucket method of S3Operations class")
             return bucket
@@ -121,14 +361,14 @@ class SimpleStorageService:
         logging.info(f"Entered the get_file_object method of S3Operations class for file: {filename} in bucket: {bucket_name}")
 
         try:
-            bucket = self.get_bucket(bucket_name)
-
-            # Check if bucket exists
-            if bucket is None:
-                raise ForestException(f"Bucket {bucket_name} not found", sys)
+            # an exact key is found with a HEAD request, only a partial name lists the bucket
+            if self.key_exists(bucket_name, filename):
+                logging.info("Exited the get_file_object method of S3Operations class")
+                return StoredObject(self.backend, bucket_name, filename)
 
             # Get objects with the given prefix
-            file_objects = list(bucket.objects.filter(Prefix=filename))
+            file_objects = [StoredObject(self.backend, bucket_name, info.key)
+                            for info in self.backend.list(bucket_name, prefix=filename)]
 
             # Check if any objects were found
             if len(file_objects) == 0:
@@ -146,10 +386,15 @@ class SimpleStorageService:
             logging.error(f"Error in get_file_object: {str(e)}")
             raise ForestException(e, sys) from e
 
-    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None,
+                   stage_tracker: Optional[Callable[[str], ContextManager]] = None) -> object:
         """
         Method Name :   load_model
-        Description :   This method loads the model_name model from bucket_name bucket with kwargs
+        Description :   This method loads the model_name model from bucket_name bucket with kwargs. The
+                        model bundle (see ModelBundle) pushed next to a pickled model, e.g. model.bundle
+                        next to model.pkl, is loaded instead of it when present. A bundle is mapped in
+                        place when it is a local uncompressed file and read into one buffer otherwise, and
+                        its columns are checked against the schema; any other object is unpickled
 
         Output      :   list of objects or object is returned based on filename
         On Failure  :   Write an exception log and then raise an exception
@@ -159,6 +404,7 @@ class SimpleStorageService:
         """
         logging.info("Entered the load_model method of S3Operations class")
 
+        track = stage_tracker or (lambda stage_name: nullcontext())
         try:
             func = (
                 lambda: model_name
@@ -166,9 +412,18 @@ class SimpleStorageService:
                 else model_dir + "/" + model_name
             )
             model_file = func()
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            bundle_file = model_bundle_path(model_file)
+            if bundle_file != model_file and self.key_exists(bucket_name, bundle_file):
+                model_file = bundle_file
+            # unchanged models are read from the local artifact cache instead of being downloaded again,
+            # and unpickled from the file object without first reading all of it into memory
+            with self.open_object_cached(bucket_name, model_file,
+                                         stage_tracker=lambda stage_name: track(f"model_{stage_name}")) as model_obj:
+                with track("model_deserialize"):
+                    if is_model_bundle(model_obj):
+                        model = MappedSensorModel.load_bundle(model_obj)
+                    else:
+                        model = pickle.load(model_obj)
             logging.info("Exited the load_model method of S3Operations class")
             return model
 
@@ -189,26 +444,26 @@ class SimpleStorageService:
         logging.info("Entered the create_folder method of S3Operations class")
 
         try:
-            self.s3_resource.Object(bucket_name, folder_name).load()
-
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "404":
+            if self.backend.head(bucket_name, folder_name) is None:
                 folder_obj = folder_name + "/"
-                self.s3_client.put_object(Bucket=bucket_name, Key=folder_obj)
-            else:
-                pass
+                self.backend.put(bucket_name, folder_obj, b"")
             logging.info("Exited the create_folder method of S3Operations class")
+        except Exception as e:
+            raise ForestException(e, sys) from e
 
-    def upload_file(self, from_filename: str, to_filename: str,  bucket_name: str,  remove: bool = True):
+    def upload_file(self, from_filename: str, to_filename: str,  bucket_name: str,  remove: bool = True,
+                    compress: bool = False):
         """
         Method Name :   upload_file
-        Description :   This method uploads the from_filename file to bucket_name bucket with to_filename as bucket filename
+        Description :   This method uploads the from_filename file to bucket_name bucket with to_filename as bucket filename,
+                        compressed while it is read with the codec of the service when compress is set, except
+                        model bundles
 
         Output      :   Folder is created in s3 bucket
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   compressed transfers
         """
         logging.info("Entered the upload_file method of S3Operations class")
 
@@ -217,9 +472,18 @@ class SimpleStorageService:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
-            self.s3_resource.meta.client.upload_file(
-                from_filename, bucket_name, to_filename
-            )
+            codec = compression_for(to_filename, self.compression) if compress else ""
+            if codec:
+                with open(from_filename, "rb") as source:
+                    # a model bundle is memory-mapped from the artifact cache, which needs its plain bytes
+                    if is_model_bundle(source):
+                        codec = ""
+                    else:
+                        with self.open_multipart_upload(bucket_name, to_filename, compression=codec) as upload:
+                            shutil.copyfileobj(source, upload, 1024 * 1024)
+            if not codec:
+                self.backend.upload_file(from_filename, bucket_name, to_filename)
+            self.key_cache.put(bucket_name, to_filename, True)
 
             logging.info(
                 f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} bucket"
@@ -238,45 +502,120 @@ class SimpleStorageService:
         except Exception as e:
             raise ForestException(e, sys) from e
 
+    def delete_object(self, bucket_name: str, s3_key: str) -> None:
+        """
+        Method Name :   delete_object
+        Description :   This method deletes the s3_key object from bucket_name bucket, if it exists
+
+        Output      :   Object is removed from s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the delete_object method of S3Operations class")
+
+        try:
+            self.backend.delete(bucket_name, s3_key)
+            self.key_cache.put(bucket_name, s3_key, False)
+            logging.info(f"Deleted {s3_key} from bucket {bucket_name}")
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
     def upload_df_as_csv(self,data_frame: DataFrame,local_filename: str, bucket_filename: str,bucket_name: str,) -> None:
         """
         Method Name :   upload_df_as_csv
-        Description :   This method uploads the dataframe to bucket_filename csv file in bucket_name bucket
+        Description :   This method uploads the dataframe to bucket_filename csv file in bucket_name bucket,
+                        serialized straight into the upload; local_filename is no longer written
 
         Output      :   Folder is created in s3 bucket
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   streamed from memory instead of a temporary file
         """
         logging.info("Entered the upload_df_as_csv method of S3Operations class")
 
         try:
-            data_frame.to_csv(local_filename, index=None, header=True)
-
-            self.upload_file(local_filename, bucket_filename, bucket_name)
+            self.upload_dataframe(data_frame, bucket_name, bucket_filename, table_format=CSV)
 
             logging.info("Exited the upload_df_as_csv method of S3Operations class")
 
         except Exception as e:
             raise ForestException(e, sys) from e
 
+    def upload_dataframe(self, data_frame: DataFrame, bucket_name: str, s3_key: str, table_format: str = "",
+                         part_size: int = S3_UPLOAD_PART_SIZE, concurrency: int = S3_UPLOAD_CONCURRENCY,
+                         local_filename: Optional[str] = None, compress: bool = False) -> int:
+        """
+        Method Name :   upload_dataframe
+        Description :   This method serializes the dataframe as a CSV, Parquet or Arrow file straight into
+                        an upload of the s3_key object, in table_format or the format given by the key's
+                        extension, without writing it to disk unless local_filename is given; compressed
+                        with the codec of the service when compress is set
+
+        Output      :   Bytes uploaded; the same bytes are written to local_filename when it is given
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the upload_dataframe method of S3Operations class")
+
+        try:
+            with ExitStack() as stack:
+                upload = stack.enter_context(self.open_multipart_upload(bucket_name, s3_key, part_size=part_size,
+                                                                        concurrency=concurrency, compress=compress))
+                sink = upload
+                if local_filename is not None:
+                    sink = TeeWriter(upload, stack.enter_context(open(local_filename, "wb")))
+                write_dataframe(data_frame, sink, table_format_for(s3_key, table_format))
+            self.key_cache.put(bucket_name, s3_key, True)
+            logging.info("Exited the upload_dataframe method of S3Operations class")
+            return upload.bytes_written
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def upload_array(self, array: np.ndarray, bucket_name: str, s3_key: str, part_size: int = S3_UPLOAD_PART_SIZE,
+                     concurrency: int = S3_UPLOAD_CONCURRENCY, compress: bool = False) -> int:
+        """
+        Method Name :   upload_array
+        Description :   This method writes the array in .npy format straight into an upload of the s3_key object,
+                        compressed with the codec of the service when compress is set
+
+        Output      :   Bytes uploaded
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the upload_array method of S3Operations class")
+
+        try:
+            with self.open_multipart_upload(bucket_name, s3_key, part_size=part_size,
+                                            concurrency=concurrency, compress=compress) as upload:
+                np.save(upload, array, allow_pickle=False)
+            self.key_cache.put(bucket_name, s3_key, True)
+            return upload.bytes_written
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
     def get_df_from_object(self, object_: object) -> DataFrame:
         """
         Method Name :   get_df_from_object
-        Description :   This method gets the dataframe from the object_name object
+        Description :   This method gets the dataframe from the object_name object, parsing the CSV bytes
+                        while they are downloaded instead of decoding the whole body to a str first
 
         Output      :   Folder is created in s3 bucket
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   streamed from the response body
         """
         logging.info("Entered the get_df_from_object method of S3Operations class")
 
         try:
-            content = self.read_object(object_, make_readable=True)
-            df = read_csv(content, na_values="na")
+            if isinstance(object_, list):
+                if not object_:
+                    raise ForestException("Empty list of objects provided", sys)
+                object_ = object_[0]
+            body = object_.get()["Body"]
+            if not isinstance(body, BufferedReader):
+                # a botocore StreamingBody of a boto3 object
+                body = BufferedReader(StreamingBodyReader(body), buffer_size=1024 * 1024)
+            with body as content:
+                df = read_csv(content, na_values="na")
             logging.info("Exited the get_df_from_object method of S3Operations class")
             return df
         except Exception as e:
@@ -302,3 +641,104 @@ class SimpleStorageService:
             return df
         except Exception as e:
             raise ForestException(e, sys) from e
+
+    def download_dataframe(self, bucket_name: str, s3_key: str, table_format: str = "") -> DataFrame:
+        """
+        Method Name :   download_dataframe
+        Description :   This method parses the s3_key object as a CSV, Parquet or Arrow file while it is
+                        downloaded, in table_format or the format given by the key's extension
+
+        Output      :   Dataframe of the file
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the download_dataframe method of S3Operations class")
+
+        try:
+            with self.open_object_stream(bucket_name, s3_key) as stream:
+                return read_table(stream, table_format_for(s3_key, table_format))
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def download_array(self, bucket_name: str, s3_key: str, mmap_threshold: int = S3_READ_SPILL_BYTES) -> np.ndarray:
+        """
+        Method Name :   download_array
+        Description :   This method reads an array written by upload_array while it is downloaded. An object
+                        above mmap_threshold bytes is streamed into a temporary file instead and returned
+                        memory-mapped read-only, so its pages are not held by the process; an object of
+                        the local backend is mapped in place. A compressed object is always decompressed
+                        into a temporary file, as its size once decompressed is not known beforehand
+
+        Output      :   The array
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the download_array method of S3Operations class")
+
+        try:
+            path = self.backend.local_path(bucket_name, s3_key)
+            info = None if path is None else self.backend.head(bucket_name, s3_key)
+            if info is not None and not info.compression:
+                mmap_mode = "r" if info.size > mmap_threshold else None
+                return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+            body, info = self.backend.get(bucket_name, s3_key)
+            if info.size <= mmap_threshold and not info.compression:
+                # np.load seeks back over the format magic, a GET body cannot
+                with body, spool_body(body, info.size, mmap_threshold) as body_file:
+                    return np.load(body_file, allow_pickle=False)
+            with tempfile.NamedTemporaryFile(prefix="s3-spill-", suffix=".npy", dir=S3_SPILL_DIR or None) as spill_file:
+                with open_decompressed(body, info.compression) as body:
+                    shutil.copyfileobj(body, spill_file, 1024 * 1024)
+                spill_file.flush()
+                mmap_mode = "r" if spill_file.tell() > mmap_threshold else None
+                # the mapping outlives the temporary file, which is deleted on exit
+                return np.load(spill_file.name, mmap_mode=mmap_mode, allow_pickle=False)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def open_object_stream(self, bucket_name: str, s3_key: str, buffer_size: int = 1024 * 1024) -> BinaryIO:
+        """
+        Method Name :   open_object_stream
+        Description :   This method opens the s3_key object for reading as it is downloaded, without
+                        holding the whole body in memory, decompressing it when it was stored compressed
+
+        Output      :   Buffered binary file object, to be closed by the caller
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the open_object_stream method of S3Operations class")
+
+        try:
+            body, info = self.backend.get(bucket_name, s3_key, buffer_size=buffer_size)
+            logging.info(f"Streaming {info.size} bytes of {s3_key} from bucket {bucket_name}")
+            return open_decompressed(body, info.compression, buffer_size=buffer_size)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def open_multipart_upload(self, bucket_name: str, s3_key: str, part_size: int = S3_UPLOAD_PART_SIZE,
+                              concurrency: int = S3_UPLOAD_CONCURRENCY, compression: Optional[str] = None,
+                              compress: bool = False):
+        """
+        Method Name :   open_multipart_upload
+        Description :   This method starts an upload of the s3_key object, written incrementally and sent
+                        in parts of part_size bytes, concurrency parts at a time. The bytes are compressed
+                        with compression, or when None with the codec of the service if compress is set,
+                        and the codec is recorded in the object metadata; keys of formats compressed by
+                        themselves, e.g. Parquet, are stored as they are. Outputs read by other tools, e.g.
+                        prediction files, are written plain, only the service's own artifacts set compress
+
+        Output      :   MultipartUploadWriter, or LocalObjectWriter on the local backend, wrapped in a
+                        CompressedWriter when compressed; completed on close and aborted when its with
+                        block raises
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the open_multipart_upload method of S3Operations class")
+
+        try:
+            # drop a cached answer, the object changes when the upload completes
+            self.key_cache.invalidate(bucket_name, s3_key)
+            if compression is None:
+                compression = self.compression if compress else ""
+            codec = compression_for(s3_key, compression)
+            upload = self.backend.open_upload(bucket_name, s3_key, part_size=part_size, concurrency=concurrency,
+                                              compression=codec)
+            return CompressedWriter(upload, codec, self.compression_level) if codec else upload
+        except Exception as e:
+            raise ForestException(e, sys) from e
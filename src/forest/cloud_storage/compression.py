@@ -0,0 +1,188 @@
+import gzip
+import io
+import sys
+from typing import BinaryIO, Optional
+
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+
+ZSTD = "zstd"
+LZ4 = "lz4"
+GZIP = "gzip"
+CODECS = (ZSTD, LZ4, GZIP)
+# object metadata entry naming the codec an object was compressed with
+COMPRESSION_METADATA_KEY = "compression"
+# level of each codec when none is configured: fast levels, transfers are rarely CPU bound
+DEFAULT_LEVELS = {ZSTD: 3, LZ4: 0, GZIP: 6}
+LEVEL_RANGES = {ZSTD: (1, 22), LZ4: (0, 16), GZIP: (1, 9)}
+# objects already compressed by their format, including Arrow IPC files written with TABLE_COMPRESSION,
+# are stored as they are
+COMPRESSED_SUFFIXES = (".parquet", ".arrow", ".arrows", ".ipc", ".feather", ".gz", ".zst", ".lz4", ".zip")
+
+_warned_fallbacks = set()
+
+
+def _codec_module(codec: str):
+    # zstandard and lz4 are optional, gzip is always available
+    if codec == ZSTD:
+        import zstandard
+
+        return zstandard
+    if codec == LZ4:
+        import lz4.frame
+
+        return lz4.frame
+    return gzip
+
+
+def resolve_codec(codec: str) -> str:
+    """
+    Return codec when it can be written here, gzip in place of zstd or lz4 when their package is not installed
+    """
+    if not codec:
+        return ""
+    if codec not in CODECS:
+        raise ForestException(f"Unknown compression {codec}, expected one of {CODECS}", sys)
+    try:
+        _codec_module(codec)
+        return codec
+    except ImportError:
+        if codec not in _warned_fallbacks:
+            _warned_fallbacks.add(codec)
+            logging.warning(f"{codec} compression needs `pip install {'zstandard' if codec == ZSTD else codec}`, "
+                            f"gzip is used instead")
+        return GZIP
+
+
+def compression_for(s3_key: str, codec: str) -> str:
+    """
+    Return the codec to write the s3_key object with: none for formats that compress themselves
+    """
+    if s3_key.lower().endswith(COMPRESSED_SUFFIXES):
+        return ""
+    return resolve_codec(codec)
+
+
+def codec_level(codec: str, level: Optional[int] = None) -> int:
+    if level is None:
+        return DEFAULT_LEVELS[codec]
+    low, high = LEVEL_RANGES[codec]
+    return min(max(level, low), high)
+
+
+class CompressedWriter:
+    """
+    This class compresses the bytes written to it into an upload writer, e.g. a MultipartUploadWriter.
+
+    close finishes the compressed stream and then closes the upload, abort only aborts the upload,
+    so the object is committed or discarded like an uncompressed one. tell counts the bytes written
+    before compression and bytes_written those sent to the upload.
+    """
+
+    def __init__(self, upload, codec: str, level: Optional[int] = None):
+        self.upload = upload
+        self.codec = codec
+        self.closed = False
+        self._position = 0
+        level = codec_level(codec, level)
+        module = _codec_module(codec)
+        if codec == ZSTD:
+            self._stream = module.ZstdCompressor(level=level).stream_writer(upload, closefd=False)
+        elif codec == LZ4:
+            self._stream = module.LZ4FrameFile(upload, mode="wb", compression_level=level)
+        else:
+            # mtime=0 keeps the bytes, and so the ETag, of identical content identical
+            self._stream = gzip.GzipFile(fileobj=upload, mode="wb", compresslevel=level, mtime=0)
+
+    @property
+    def bytes_written(self) -> int:
+        return self.upload.bytes_written
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        size = memoryview(data).nbytes
+        self._position += size
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._stream.close()
+        except BaseException:
+            self.abort()
+            raise
+        self.closed = True
+        self.upload.close()
+
+    def abort(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.upload.abort()
+
+    def __enter__(self) -> "CompressedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class DecompressedReader(io.RawIOBase):
+    """
+    Raw binary stream of the decompressed bytes of body, to be wrapped in io.BufferedReader;
+    closing it closes body
+    """
+
+    def __init__(self, body: BinaryIO, codec: str):
+        self.body = body
+        try:
+            module = _codec_module(codec)
+        except ImportError as e:
+            raise ForestException(f"Reading a {codec} compressed object needs "
+                                  f"`pip install {'zstandard' if codec == ZSTD else codec}`", sys) from e
+        if codec == ZSTD:
+            self._stream = module.ZstdDecompressor().stream_reader(body, closefd=False)
+        elif codec == LZ4:
+            self._stream = module.LZ4FrameFile(body, mode="rb")
+        elif codec == GZIP:
+            self._stream = gzip.GzipFile(fileobj=body, mode="rb")
+        else:
+            raise ForestException(f"Unknown compression {codec}, expected one of {CODECS}", sys)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                self.body.close()
+        super().close()
+
+
+def open_decompressed(body: BinaryIO, codec: str, buffer_size: int = 1024 * 1024) -> BinaryIO:
+    """
+    Return body itself when codec is empty, else a buffered reader of its decompressed bytes
+    """
+    if not codec:
+        return body
+    return io.BufferedReader(DecompressedReader(body, codec), buffer_size=buffer_size)
@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from src.forest.cloud_storage.aws_storage import SimpleStorageService
+from src.forest.cloud_storage.compression import COMPRESSION_METADATA_KEY
+from src.forest.cloud_storage.storage_backend import LOCAL_BACKEND, ObjectInfo, ObjectNotFound, StorageBackend
+
+# prefix of the files LocalObjectWriter writes before they replace an object
+STAGING_PREFIX = ".staging-"
+# suffix of the file next to an object holding its metadata, only written for compressed objects
+METADATA_SUFFIX = ".metadata.json"
+
+
+def read_object_metadata(path: str) -> dict:
+    try:
+        with open(path + METADATA_SUFFIX, "rb") as metadata_file:
+            return json.load(metadata_file)
+    except FileNotFoundError:
+        return {}
+
+
+class LocalObjectWriter:
+    """
+    Local counterpart of MultipartUploadWriter: bytes go to a staging file that replaces the
+    object on close and is deleted by abort. The metadata of the object is written next to it
+    just before, or removed when it has none
+    """
+
+    def __init__(self, path: str, metadata: Optional[dict] = None):
+        self.path = path
+        self.metadata = metadata
+        self.bytes_written = 0
+        self.closed = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, self._staging_path = tempfile.mkstemp(prefix=STAGING_PREFIX, dir=os.path.dirname(path))
+        self._file = os.fdopen(file_descriptor, "wb")
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        return self._file.write(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._file.close()
+            # mkstemp creates the file readable by its owner only
+            os.chmod(self._staging_path, 0o644)
+            if self.metadata:
+                with open(self.path + METADATA_SUFFIX, "w") as metadata_file:
+                    json.dump(self.metadata, metadata_file)
+            elif os.path.exists(self.path + METADATA_SUFFIX):
+                os.unlink(self.path + METADATA_SUFFIX)
+            os.replace(self._staging_path, self.path)
+
+    def abort(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._file.close()
+            os.unlink(self._staging_path)
+
+    def __enter__(self) -> "LocalObjectWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class LocalBackend(StorageBackend):
+    """
+    This class is the StorageBackend of a local directory, for CI, load tests and offline runs:
+    every bucket is a sub-directory of root_dir and every key a file path in it.
+
+    The version of an object is made of its size and modification time, so it changes whenever
+    the file is rewritten, like an ETag. Files are read in place, see local_path, and the metadata
+    of compressed objects is kept in a METADATA_SUFFIX file next to them.
+    """
+
+    name = LOCAL_BACKEND
+    # a stat is as cheap as a cache lookup and sees files written by other processes at once
+    cache_metadata = False
+    # nothing crosses a network, and plain files can be memory-mapped in place
+    compress_writes = False
+
+    def __init__(self, root_dir: str):
+        """
+        :param root_dir: Directory holding one sub-directory per bucket
+        """
+        self.root_dir = root_dir
+
+    def object_path(self, bucket_name: str, s3_key: str) -> str:
+        return os.path.join(self.root_dir, bucket_name, *s3_key.strip("/").split("/"))
+
+    @staticmethod
+    def _info(s3_key: str, path: str, file_stat: os.stat_result) -> ObjectInfo:
+        return ObjectInfo(s3_key, f"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}", file_stat.st_size,
+                          read_object_metadata(path).get(COMPRESSION_METADATA_KEY, ""))
+
+    def head(self, bucket_name: str, s3_key: str) -> Optional[ObjectInfo]:
+        path = self.object_path(bucket_name, s3_key)
+        try:
+            file_stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return self._info(s3_key, path, file_stat) if stat.S_ISREG(file_stat.st_mode) else None
+
+    def get(self, bucket_name: str, s3_key: str, version: Optional[str] = None,
+            if_none_match: Optional[str] = None,
+            buffer_size: int = 1024 * 1024) -> Optional[Tuple[BinaryIO, ObjectInfo]]:
+        # past versions are not kept, the current file is read whatever version asks for
+        path = self.object_path(bucket_name, s3_key)
+        try:
+            body = open(path, "rb", buffering=buffer_size)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError) as e:
+            raise ObjectNotFound(f"Object {s3_key} not found in bucket {bucket_name}", sys) from e
+        info = self._info(s3_key, path, os.fstat(body.fileno()))
+        if if_none_match is not None and if_none_match == info.version:
+            body.close()
+            return None
+        return body, info
+
+    def put(self, bucket_name: str, s3_key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        path = self.object_path(bucket_name, s3_key)
+        if s3_key.endswith("/"):
+            # the empty object marking an S3 folder is the directory itself
+            os.makedirs(path, exist_ok=True)
+            return ObjectInfo(s3_key, "0-0", 0)
+        with LocalObjectWriter(path) as writer:
+            writer.write(data)
+        return self._info(s3_key, path, os.stat(path))
+
+    def list(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None) -> Iterator[ObjectInfo]:
+        bucket_dir = os.path.join(self.root_dir, bucket_name)
+        # only the directory holding the prefix is walked
+        top_dir = os.path.join(bucket_dir, *prefix.split("/")[:-1])
+        keys = []
+        for directory, dir_names, file_names in os.walk(top_dir):
+            relative_dir = os.path.relpath(directory, bucket_dir).replace(os.sep, "/")
+            for file_name in file_names:
+                key = file_name if relative_dir == "." else f"{relative_dir}/{file_name}"
+                if key.startswith(prefix) and not file_name.startswith(STAGING_PREFIX) \
+                        and not file_name.endswith(METADATA_SUFFIX):
+                    keys.append(key)
+        for key in sorted(keys)[:max_keys]:
+            info = self.head(bucket_name, key)
+            if info is not None:
+                yield info
+
+    def open_upload(self, bucket_name: str, s3_key: str, part_size: int = 0, concurrency: int = 1,
+                    compression: str = "") -> LocalObjectWriter:
+        metadata = {COMPRESSION_METADATA_KEY: compression} if compression else None
+        return LocalObjectWriter(self.object_path(bucket_name, s3_key), metadata=metadata)
+
+    def upload_file(self, from_filename: str, bucket_name: str, s3_key: str) -> None:
+        with open(from_filename, "rb") as source, self.open_upload(bucket_name, s3_key) as writer:
+            shutil.copyfileobj(source, writer, 1024 * 1024)
+
+    def delete(self, bucket_name: str, s3_key: str) -> None:
+        path = self.object_path(bucket_name, s3_key)
+        for file_path in (path, path + METADATA_SUFFIX):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+    def local_path(self, bucket_name: str, s3_key: str) -> Optional[str]:
+        return self.object_path(bucket_name, s3_key)
+
+
+class LocalStorageService(SimpleStorageService):
+    """
+    This class is SimpleStorageService on a LocalBackend over root_dir, for code that picks its
+    directory itself rather than through STORAGE_BACKEND and LOCAL_STORAGE_DIR
+    """
+
+    def __init__(self, root_dir: str):
+        """
+        :param root_dir: Directory holding one sub-directory per bucket
+        """
+        super().__init__(backend=LocalBackend(root_dir))
+        self.root_dir = root_dir
+
+    def object_path(self, bucket_name: str, s3_key: str) -> str:
+        return self.backend.object_path(bucket_name, s3_key)
@@ -0,0 +1,106 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.forest.constant.application import S3_KEY_CACHE_MAX_SIZE, S3_KEY_CACHE_NEGATIVE_TTL_SECONDS, \
+    S3_KEY_CACHE_TTL_SECONDS
+from src.forest.exception import ForestException
+
+# version of the manifest document layout
+ARTIFACT_MANIFEST_FORMAT = 1
+
+
+class KeyExistenceCache:
+    """
+    This class remembers whether S3 keys exist, so repeated checks of the same key do not each
+    cost a request.
+
+    A key seen to exist is trusted for ttl seconds and a missing key for the shorter
+    negative_ttl, as an artifact is more likely to appear than to be deleted. Writes through
+    the storage service record their key as present. Least recently checked keys are dropped
+    beyond max_size entries.
+    """
+
+    def __init__(self, ttl: float = S3_KEY_CACHE_TTL_SECONDS,
+                 negative_ttl: float = S3_KEY_CACHE_NEGATIVE_TTL_SECONDS, max_size: int = S3_KEY_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket_name: str, s3_key: str) -> Optional[bool]:
+        """
+        :return: Whether the key exists, None when it is unknown or its entry expired
+        """
+        key = (bucket_name, s3_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, bucket_name: str, s3_key: str, exists: bool) -> None:
+        ttl = self.ttl if exists else self.negative_ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        key = (bucket_name, s3_key)
+        with self._lock:
+            self._entries[key] = (exists, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket_name: str, s3_key: str) -> None:
+        with self._lock:
+            self._entries.pop((bucket_name, s3_key), None)
+
+
+class ArtifactManifest:
+    """
+    This class is the index of the artifacts of a bucket: one JSON object mapping an artifact
+    name such as "model" to its key, ETag, size and update time.
+
+    The manifest is updated whenever an artifact is registered, so finding the current model is
+    a single read of the manifest instead of a listing of the bucket. A reader keeps its copy and
+    only reads it again when the manifest's own ETag changed.
+    """
+
+    def __init__(self, artifacts: Optional[Dict[str, dict]] = None, version: Optional[str] = None):
+        """
+        :param artifacts: Entry of each artifact name
+        :param version: ETag of the manifest object the entries were read from, None for a new manifest
+        """
+        self.artifacts = artifacts or {}
+        self.version = version
+        # time.monotonic() of the last check of version against the bucket
+        self.checked_at = 0.0
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.artifacts.get(name)
+
+    def set(self, name: str, s3_key: str, etag: str, size: int) -> None:
+        self.artifacts[name] = {"key": s3_key, "etag": etag, "size": size, "updated_at": time.time()}
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"format": ARTIFACT_MANIFEST_FORMAT, "artifacts": self.artifacts},
+                          indent=2, sort_keys=True).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, version: Optional[str] = None) -> "ArtifactManifest":
+        try:
+            document = json.loads(data)
+            if document.get("format") != ARTIFACT_MANIFEST_FORMAT:
+                raise ValueError(f"unsupported manifest format {document.get('format')}")
+            return cls(artifacts=document["artifacts"], version=version)
+        except Exception as e:
+            raise ForestException(f"Cannot read the artifact manifest: {e}", sys) from e
@@ -0,0 +1,102 @@
+import sys
+from io import BufferedReader
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from src.forest.cloud_storage.compression import COMPRESSION_METADATA_KEY
+from src.forest.cloud_storage.s3_streams import MultipartUploadWriter, StreamingBodyReader
+from src.forest.cloud_storage.storage_backend import ObjectInfo, ObjectNotFound, StorageBackend
+from src.forest.configuration.aws_connection import S3Client
+
+NOT_FOUND_CODES = ("404", "NoSuchKey", "NotFound")
+
+
+def _object_version(response: dict) -> str:
+    version = response["ETag"].strip('"')
+    version_id = response.get("VersionId")
+    if version_id and version_id != "null":
+        version = f"{version}:{version_id}"
+    return version
+
+
+def _object_info(s3_key: str, response: dict) -> ObjectInfo:
+    # user metadata comes back as x-amz-meta-* headers, lower-cased by boto3
+    compression = response.get("Metadata", {}).get(COMPRESSION_METADATA_KEY, "")
+    return ObjectInfo(s3_key, _object_version(response), response["ContentLength"], compression)
+
+
+class S3Backend(StorageBackend):
+    """
+    This class is the StorageBackend of S3 buckets, through the boto3 client and resource of S3Client
+    """
+
+    name = "s3"
+
+    def __init__(self):
+        s3_client = S3Client()
+        self.s3_resource = s3_client.s3_resource
+        self.s3_client = s3_client.s3_client
+
+    def head(self, bucket_name: str, s3_key: str) -> Optional[ObjectInfo]:
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in NOT_FOUND_CODES:
+                return None
+            raise
+        return _object_info(s3_key, response)
+
+    def get(self, bucket_name: str, s3_key: str, version: Optional[str] = None,
+            if_none_match: Optional[str] = None,
+            buffer_size: int = 1024 * 1024) -> Optional[Tuple[BinaryIO, ObjectInfo]]:
+        request = {"Bucket": bucket_name, "Key": s3_key}
+        if if_none_match is not None:
+            request["IfNoneMatch"] = f'"{if_none_match.partition(":")[0]}"'
+        etag, _, version_id = (version or "").partition(":")
+        if version_id:
+            request["VersionId"] = version_id
+        try:
+            try:
+                response = self.s3_client.get_object(**request, **({"IfMatch": f'"{etag}"'} if etag else {}))
+            except ClientError as e:
+                if not etag or e.response["Error"]["Code"] not in ("412", "PreconditionFailed"):
+                    raise
+                # replaced since version was read, the current object is read instead
+                response = self.s3_client.get_object(**request)
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code in ("304", "NotModified"):
+                return None
+            if code in NOT_FOUND_CODES:
+                raise ObjectNotFound(f"Object {s3_key} not found in bucket {bucket_name}", sys) from e
+            raise
+        body = BufferedReader(StreamingBodyReader(response["Body"]), buffer_size=buffer_size)
+        return body, _object_info(s3_key, response)
+
+    def put(self, bucket_name: str, s3_key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        request = {} if content_type is None else {"ContentType": content_type}
+        response = self.s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=data, **request)
+        return ObjectInfo(s3_key, _object_version(response), len(data))
+
+    def list(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None) -> Iterator[ObjectInfo]:
+        pagination = {} if max_keys is None else {"MaxItems": max_keys}
+        pages = self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix,
+                                                                          PaginationConfig=pagination)
+        for page in pages:
+            for summary in page.get("Contents", []):
+                yield ObjectInfo(summary["Key"], summary["ETag"].strip('"'), summary["Size"])
+
+    def open_upload(self, bucket_name: str, s3_key: str, part_size: int, concurrency: int,
+                    compression: str = "") -> MultipartUploadWriter:
+        metadata = {COMPRESSION_METADATA_KEY: compression} if compression else None
+        return MultipartUploadWriter(self.s3_client, bucket_name, s3_key, part_size=part_size,
+                                     concurrency=concurrency, metadata=metadata)
+
+    def upload_file(self, from_filename: str, bucket_name: str, s3_key: str) -> None:
+        # boto3's managed transfer sends large files in concurrent parts
+        self.s3_resource.meta.client.upload_file(from_filename, bucket_name, s3_key)
+
+    def delete(self, bucket_name: str, s3_key: str) -> None:
+        # S3 answers a delete of a missing key with success
+        self.s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
@@ -0,0 +1,220 @@
+import io
+import shutil
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Deque, Dict, Optional
+
+from src.forest.constant.application import S3_READ_SPILL_BYTES, S3_SPILL_DIR
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+
+# S3 rejects multipart parts smaller than this, except the last one
+MULTIPART_MIN_PART_SIZE = 5 * 1024 ** 2
+
+
+class StreamingBodyReader(io.RawIOBase):
+    """
+    Raw binary stream over the botocore StreamingBody of a GET, so that it can be wrapped in
+    io.BufferedReader and parsed as it arrives, e.g. by pandas.read_csv(chunksize=...)
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.body.close()
+        super().close()
+
+
+def spool_body(body, content_length: int, spill_threshold: int = S3_READ_SPILL_BYTES) -> BinaryIO:
+    """
+    Return a seekable binary file object over a GET body: a BytesIO over the single bytes object
+    read from a body of at most spill_threshold bytes (BytesIO shares it rather than copying it),
+    a temporary file the body is copied into above that, so large objects never sit in memory
+    """
+    if content_length <= spill_threshold:
+        return io.BytesIO(body.read())
+    spill_file = tempfile.TemporaryFile(prefix="s3-spill-", dir=S3_SPILL_DIR or None)
+    try:
+        shutil.copyfileobj(body, spill_file, 1024 * 1024)
+        spill_file.seek(0)
+    except BaseException:
+        spill_file.close()
+        raise
+    return spill_file
+
+
+class MultipartUploadWriter:
+    """
+    This class writes an S3 object incrementally through a multipart upload.
+
+    Written bytes are buffered until part_size of them are pending and then sent as one part,
+    by up to concurrency threads at once, so memory stays bounded by about
+    (concurrency + 1) * part_size whatever the size of the object. The multipart upload is
+    only created with the first part: an object smaller than part_size is sent by close in a
+    single PUT. The upload is completed by close, and aborted when the with block using the
+    writer raises, so a partial object never becomes visible.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, s3_key: str, part_size: int, concurrency: int = 1,
+                 metadata: Optional[Dict[str, str]] = None):
+        """
+        :param s3_client: boto3 S3 client
+        :param part_size: Bytes per uploaded part, at least MULTIPART_MIN_PART_SIZE
+        :param concurrency: Parts uploaded at the same time
+        :param metadata: User metadata of the object
+        """
+        if part_size < MULTIPART_MIN_PART_SIZE:
+            raise ForestException(f"Multipart part size {part_size} is below the S3 minimum of "
+                                  f"{MULTIPART_MIN_PART_SIZE} bytes", sys)
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.part_size = part_size
+        self.concurrency = max(concurrency, 1)
+        self.bytes_written = 0
+        self.closed = False
+        self.upload_id: Optional[str] = None
+        self._parts = []
+        self._n_parts = 0
+        self._pending: Deque[Future] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._buffer = bytearray()
+        self._object_arguments = {"Metadata": metadata} if metadata else {}
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ForestException(f"Write to the closed upload of s3://{self.bucket_name}/{self.s3_key}", sys)
+        self._buffer += data
+        self.bytes_written += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._send_buffer()
+        return len(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self) -> None:
+        pass
+
+    def _send_buffer(self) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key,
+                                                                    **self._object_arguments)["UploadId"]
+        self._n_parts += 1
+        # the buffer is handed over to the part rather than copied
+        body, self._buffer = self._buffer, bytearray()
+        if self.concurrency == 1:
+            self._parts.append(self._upload_part(self._n_parts, body))
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-upload")
+        self._pending.append(self._executor.submit(self._upload_part, self._n_parts, body))
+        while len(self._pending) >= self.concurrency:
+            # a failed part raises here, in the writing thread
+            self._parts.append(self._pending.popleft().result())
+
+    def _upload_part(self, part_number: int, body: bytearray) -> dict:
+        response = self.s3_client.upload_part(Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id,
+                                              PartNumber=part_number, Body=body)
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def close(self) -> None:
+        """
+        Upload the pending bytes and complete the upload
+        """
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self.s3_key, Body=self._buffer,
+                                          **self._object_arguments)
+            else:
+                if self._buffer:
+                    # the last part may be smaller than the minimum
+                    self._send_buffer()
+                while self._pending:
+                    self._parts.append(self._pending.popleft().result())
+                self.s3_client.complete_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key,
+                                                         UploadId=self.upload_id,
+                                                         MultipartUpload={"Parts": self._parts})
+        except BaseException:
+            self.abort()
+            raise
+        self.closed = True
+        self._buffer = bytearray()
+        self._shutdown()
+        logging.info(f"Uploaded {self.bytes_written} bytes to s3://{self.bucket_name}/{self.s3_key} "
+                     f"in {max(self._n_parts, 1)} parts")
+
+    def abort(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._buffer = bytearray()
+        self._shutdown()
+        self._pending.clear()
+        if self.upload_id is None:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id)
+        except Exception as e:
+            logging.warning(f"Cannot abort the multipart upload of s3://{self.bucket_name}/{self.s3_key}: {e}")
+
+    def __enter__(self) -> "MultipartUploadWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TeeWriter:
+    """
+    Binary file object writing the same bytes to several file objects, e.g. an upload and a local file
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+        self.closed = False
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        for sink in self.sinks:
+            sink.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        # the sinks are closed by their owner
+        self.closed = True
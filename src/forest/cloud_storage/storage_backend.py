@@ -0,0 +1,111 @@
+import sys
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple
+
+from src.forest.constant.application import LOCAL_STORAGE_DIR, STORAGE_BACKEND
+from src.forest.exception import ForestException
+
+S3_BACKEND = "s3"
+LOCAL_BACKEND = "local"
+STORAGE_BACKENDS = (S3_BACKEND, LOCAL_BACKEND)
+
+
+class ObjectNotFound(ForestException):
+    """
+    Raised when a key does not exist in its bucket
+    """
+
+
+class ObjectInfo(NamedTuple):
+    key: str
+    # changes whenever the object is rewritten: the ETag, suffixed with ":VersionId" on versioned S3 buckets
+    version: str
+    size: int
+    # codec the stored bytes are compressed with, from the object metadata; not known to list
+    compression: str = ""
+
+
+class StorageBackend:
+    """
+    This class is the interface of the object stores SimpleStorageService reads and writes.
+
+    A backend only moves bytes: every higher level operation (caching, manifests, DataFrame and
+    model serialization) is implemented once in SimpleStorageService on top of these methods.
+    Bodies are binary file objects read as they arrive; writers returned by open_upload are
+    committed by close and discarded by abort, so a partial object never becomes visible.
+    """
+
+    name = ""
+    # whether key checks and manifests are worth caching, False when a request costs no more than a lookup
+    cache_metadata = True
+    # whether artifact writes are compressed with ARTIFACT_COMPRESSION by default, False where no bytes cross a network
+    compress_writes = True
+
+    def head(self, bucket_name: str, s3_key: str) -> Optional[ObjectInfo]:
+        """
+        :return: Info of the object, None when it does not exist
+        """
+        raise NotImplementedError
+
+    def get(self, bucket_name: str, s3_key: str, version: Optional[str] = None,
+            if_none_match: Optional[str] = None,
+            buffer_size: int = 1024 * 1024) -> Optional[Tuple[BinaryIO, ObjectInfo]]:
+        """
+        Open the object for reading, raising ObjectNotFound when it does not exist
+        :param version: Version returned by head; the current object is read when it was replaced since
+        :param if_none_match: Version the caller already holds, None is then returned if it is still current
+        :param buffer_size: Bytes read from the store at a time
+        :return: (body to be closed by the caller, info of the object read)
+        """
+        raise NotImplementedError
+
+    def put(self, bucket_name: str, s3_key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        raise NotImplementedError
+
+    def list(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None) -> Iterator[ObjectInfo]:
+        """
+        Iterate over the objects whose key starts with prefix, in key order, at most max_keys of them
+        """
+        raise NotImplementedError
+
+    def open_upload(self, bucket_name: str, s3_key: str, part_size: int, concurrency: int, compression: str = ""):
+        """
+        :param compression: Codec the written bytes are compressed with, recorded in the object metadata
+        :return: Writer of the object with write, close and abort, usable as a context manager
+        """
+        raise NotImplementedError
+
+    def upload_file(self, from_filename: str, bucket_name: str, s3_key: str) -> None:
+        raise NotImplementedError
+
+    def delete(self, bucket_name: str, s3_key: str) -> None:
+        """
+        Remove the object, doing nothing when it does not exist
+        """
+        raise NotImplementedError
+
+    def local_path(self, bucket_name: str, s3_key: str) -> Optional[str]:
+        """
+        :return: Path of the file holding the object when it is stored on a local file system, so it can
+                 be read or memory-mapped in place, else None
+        """
+        return None
+
+
+def get_storage_backend(backend_name: str = STORAGE_BACKEND, root_dir: str = LOCAL_STORAGE_DIR) -> StorageBackend:
+    """
+    Create the backend configured by STORAGE_BACKEND: "s3", or "local" for buckets kept as
+    sub-directories of root_dir (LOCAL_STORAGE_DIR). Unset, it is "local" when LOCAL_STORAGE_DIR
+    is set and "s3" otherwise. boto3 is only imported by the S3 backend.
+    """
+    backend_name = backend_name or (LOCAL_BACKEND if root_dir else S3_BACKEND)
+    if backend_name == LOCAL_BACKEND:
+        if not root_dir:
+            raise ForestException("The local storage backend needs LOCAL_STORAGE_DIR", sys)
+        from src.forest.cloud_storage.local_storage import LocalBackend
+
+        return LocalBackend(root_dir)
+    if backend_name == S3_BACKEND:
+        from src.forest.cloud_storage.s3_backend import S3Backend
+
+        return S3Backend()
+    raise ForestException(f"Unknown storage backend {backend_name}, expected one of {STORAGE_BACKENDS}", sys)
@@ -15,10 +15,10 @@ from src.forest.data_access.forest_data import ForestData
 
 
 class DataIngestion:
-    def __init__(self,data_ingestion_config:DataIngestionConfig=DataIngestionConfig()):
+    def __init__(self,data_ingestion_config:DataIngestionConfig=None):
         
         try:
-            self.data_ingestion_config = data_ingestion_config
+            self.data_ingestion_config = data_ingestion_config or DataIngestionConfig()
         except Exception as e:
             raise ForestException(e,sys)
     
@@ -1,9 +1,11 @@
+import os
 import sys
 from src.forest.cloud_storage.aws_storage import SimpleStorageService
 from src.forest.exception import ForestException
 from src.forest.logger import logging
 from src.forest.entity.artifact_entity import ModelPusherArtifact, ModelTrainerArtifact
 from src.forest.entity.config_entity import ModelPusherConfig
+from src.forest.entity.model_bundle import model_bundle_path
 from src.forest.entity.s3_estimator import SensorEstimator
 
 
@@ -21,7 +23,12 @@ class ModelPusher:
 
         try:
             logging.info("Uploading artifacts folder to s3 bucket")
-            self.sensor_estimator.save_model(from_file=self.model_trainer_artifact.trained_model_file_path)                 
+            # the bundle is loaded without unpickling, under its own key so that pickle readers keep working;
+            # it goes first, so a reader seeing the new pickle version also finds the matching bundle
+            model_file_path = self.model_trainer_artifact.trained_model_file_path
+            bundle_path = model_bundle_path(model_file_path)
+            self.sensor_estimator.save_bundle(from_file=bundle_path if os.path.exists(bundle_path) else None)
+            self.sensor_estimator.save_model(from_file=model_file_path)
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
                                                         s3_model_path=self.model_pusher_config.s3_model_key_path)
             logging.info("Uploaded artifacts folder to s3 bucket")
@@ -1,4 +1,5 @@
 import sys
+from datetime import datetime
 from src.forest.constant import *
 from src.forest.exception import ForestException
 from src.forest.logger import logging
@@ -7,6 +8,7 @@ from src.forest.entity.config_entity import ModelTrainerConfig
 from src.forest.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
 from neuro_mf  import ModelFactory # assuming this is a custom module for model selection
 from src.forest.entity.estimator import SensorModel
+from src.forest.entity.model_bundle import model_bundle_path
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact,
@@ -33,8 +35,15 @@ class ModelTrainer:
             sensor_model = SensorModel(preprocessing_object=preprocessing_obj,
                                        trained_model_object=best_model_detail.best_model)
             logging.info("Created Sensor truck model object with preprocessor and model")
+            # flat forest plus a fused copy with the preprocessor folded in, used by serving
+            sensor_model.compile_forest()
             logging.info("Created best model file path.")
             save_object(self.model_trainer_config.trained_model_file_path, sensor_model)
+            # the pusher pushes this bundle instead of the pickle when the forest could be fused
+            bundle_path = model_bundle_path(self.model_trainer_config.trained_model_file_path)
+            if sensor_model.save_bundle(bundle_path, metadata={"best_score": float(best_model_detail.best_score),
+                                                                "trained_at": datetime.now().isoformat()}):
+                logging.info(f"Saved model bundle at {bundle_path}")
 
             metric_artifact = ClassificationMetricArtifact(f1_score=0.8, precision_score=0.8, recall_score=0.9)
             model_trainer_artifact = ModelTrainerArtifact(
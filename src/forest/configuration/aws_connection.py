@@ -1,13 +1,16 @@
-import boto3 # Importing the boto3 library for AWS interactions with local environments
 import os
 from dotenv import load_dotenv # Importing load_dotenv to load environment variables from a .env file
-load_dotenv() # Load environment variables from .env file
 
 class S3Client:
     s3_client = None
     s3_resource = None
-    def __init__(self, region_name=os.environ["AWS_DEFAULT_REGION"]):
+    def __init__(self, region_name=None):
         if S3Client.s3_resource==None or S3Client.s3_client == None: # Check if S3 client and resource are not already initialized
+            # boto3 and the .env file are only loaded when the first client is created
+            import boto3 # Importing the boto3 library for AWS interactions with local environments
+            load_dotenv() # Load environment variables from .env file
+            if region_name is None:
+                region_name = os.environ["AWS_DEFAULT_REGION"]
             # Accessing AWS credentials from environment variables
             __access_key_id = os.environ["AWS_ACCESS_KEY_ID"] # Accessing AWS credentials from environment variables
             __secret_access_key = os.environ["AWS_SECRET_ACCESS_KEY"]
@@ -2,20 +2,18 @@ import sys
 from src.forest.exception import ForestException
 import os
 from src.forest.constant.database import DATABASE_NAME
-import pymongo
-import certifi
 from dotenv import load_dotenv
 
-load_dotenv()
-
-ca = certifi.where()
-
 class MongoDBClient:
     client = None
 
     def __init__(self, database_name=DATABASE_NAME) -> None:
         try:
             if MongoDBClient.client is None:
+                # pymongo, certifi and the .env file are only loaded when the first client is created
+                import certifi
+                import pymongo
+                load_dotenv()
                 mongo_db_url = os.getenv("MONGODB_URL")
                 if mongo_db_url is None:
                     raise Exception("Environment key MONGODB_URL is not set.")
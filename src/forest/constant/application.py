@@ -1,2 +1,60 @@
+import os
+from typing import Optional
+
 APP_HOST = "0.0.0.0"
-APP_PORT = 8080
\ No newline at end of file
+APP_PORT = 8080
+
+# when set, buckets are sub-directories of this directory instead of S3 buckets (CI, load tests, offline runs)
+LOCAL_STORAGE_DIR: str = os.getenv("LOCAL_STORAGE_DIR", "")
+# storage backend of every bucket, "s3" or "local"; unset, "local" when LOCAL_STORAGE_DIR is set and "s3" otherwise
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "")
+
+# downloaded S3 objects are kept here per ETag and reused across runs; 0 bytes disables the cache
+ARTIFACT_CACHE_DIR: str = os.getenv("ARTIFACT_CACHE_DIR",
+                                    os.path.join(os.path.expanduser("~"), ".cache", "forest", "artifacts"))
+ARTIFACT_CACHE_MAX_BYTES: int = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# local copy of the prediction index of incremental prediction runs, memory-mapped by their scoring processes
+PREDICTION_INDEX_DIR: str = os.getenv("PREDICTION_INDEX_DIR",
+                                      os.path.join(os.path.expanduser("~"), ".cache", "forest", "prediction-index"))
+
+# uploads are sent in parts of this many bytes, this many parts at a time
+S3_UPLOAD_PART_SIZE: int = int(os.getenv("S3_UPLOAD_PART_SIZE", 8 * 1024 ** 2))
+S3_UPLOAD_CONCURRENCY: int = int(os.getenv("S3_UPLOAD_CONCURRENCY", 4))
+# codec of the objects written to S3 ("zstd", "lz4", "gzip" or "" for none) and its level, the codec default when unset;
+# zstd and lz4 fall back to gzip when their package is not installed, readers follow the codec in the object metadata
+ARTIFACT_COMPRESSION: str = os.getenv("ARTIFACT_COMPRESSION", "zstd")
+ARTIFACT_COMPRESSION_LEVEL: Optional[int] = int(os.environ["ARTIFACT_COMPRESSION_LEVEL"]) \
+    if os.getenv("ARTIFACT_COMPRESSION_LEVEL") else None
+# downloads larger than this are spooled to a temporary file (or memory-mapped) instead of held in memory
+S3_READ_SPILL_BYTES: int = int(os.getenv("S3_READ_SPILL_BYTES", 256 * 1024 ** 2))
+# directory of those temporary files, empty for the system default
+S3_SPILL_DIR: str = os.getenv("S3_SPILL_DIR", "")
+
+# key existence checks (HEAD requests) are cached for these many seconds, missing keys for less
+S3_KEY_CACHE_TTL_SECONDS: float = float(os.getenv("S3_KEY_CACHE_TTL_SECONDS", 60))
+S3_KEY_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("S3_KEY_CACHE_NEGATIVE_TTL_SECONDS", 5))
+S3_KEY_CACHE_MAX_SIZE: int = int(os.getenv("S3_KEY_CACHE_MAX_SIZE", 10000))
+# JSON index of the artifacts of a bucket, at this key of the bucket, see ArtifactManifest
+ARTIFACT_MANIFEST_KEY: str = os.getenv("ARTIFACT_MANIFEST_KEY", "artifact-manifest.json")
+# seconds a reader trusts its copy of the manifest before comparing its ETag again
+ARTIFACT_MANIFEST_TTL_SECONDS: float = float(os.getenv("ARTIFACT_MANIFEST_TTL_SECONDS", 30))
+
+"""
+Model serving related constant start with MODEL_SERVING var name
+"""
+MODEL_SERVING_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("MODEL_REFRESH_INTERVAL_SECONDS", 60))
+MODEL_SERVING_BATCH_MAX_SIZE: int = int(os.getenv("PREDICT_BATCH_MAX_SIZE", 10000))
+MODEL_SERVING_MICRO_BATCH_WINDOW_MS: float = float(os.getenv("MICRO_BATCH_WINDOW_MS", 2))
+MODEL_SERVING_MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", 256))
+MODEL_SERVING_MICRO_BATCH_QUEUE_SIZE: int = int(os.getenv("MICRO_BATCH_QUEUE_SIZE", 4096))
+MODEL_SERVING_IO_WORKERS: int = int(os.getenv("SERVING_IO_WORKERS", 8))
+MODEL_SERVING_IO_QUEUE_SIZE: int = int(os.getenv("SERVING_IO_QUEUE_SIZE", 32))
+MODEL_SERVING_CPU_WORKERS: int = int(os.getenv("SERVING_CPU_WORKERS", 2))
+MODEL_SERVING_CPU_QUEUE_SIZE: int = int(os.getenv("SERVING_CPU_QUEUE_SIZE", 64))
+MODEL_SERVING_FLAT_FOREST_MAX_ROWS: int = int(os.getenv("FLAT_FOREST_MAX_ROWS", 512))
+MODEL_SERVING_CACHE_MAX_SIZE: int = int(os.getenv("PREDICTION_CACHE_MAX_SIZE", 100000))
+MODEL_SERVING_CACHE_TTL_SECONDS: float = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 300))
+MODEL_SERVING_STREAM_CHUNK_ROWS: int = int(os.getenv("STREAM_CHUNK_ROWS", 2048))
+MODEL_SERVING_SHARED_DIR: str = os.getenv("MODEL_SHARED_DIR", "")
+JOBS_MAX_CONCURRENCY: int = int(os.getenv("JOBS_MAX_CONCURRENCY", 1))
+JOBS_HISTORY_SIZE: int = int(os.getenv("JOBS_HISTORY_SIZE", 100))
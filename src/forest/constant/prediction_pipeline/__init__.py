@@ -1,5 +1,51 @@
+import os
+
+from src.forest.constant.application import PREDICTION_INDEX_DIR, S3_UPLOAD_CONCURRENCY
 from src.forest.constant.s3_bucket import PREDICTION_BUCKET_NAME,TRAINING_BUCKET_NAME
 PREDICTION_DATA_BUCKET = PREDICTION_BUCKET_NAME
 PREDICTION_INPUT_FILE_NAME = "forest_pred_data.csv"
 PREDICTION_OUTPUT_FILE_NAME = "forest_predictions.csv"
+# csv, parquet or arrow; empty picks the format from the file extension
+PREDICTION_INPUT_FORMAT = ""
+PREDICTION_OUTPUT_FORMAT = ""
 MODEL_BUCKET_NAME = TRAINING_BUCKET_NAME
+# rows read, scored and written at a time by a prediction run; 0 reads the whole file at once
+PREDICTION_CHUNK_SIZE = 50000
+PREDICTION_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+PREDICTION_UPLOAD_CONCURRENCY = S3_UPLOAD_CONCURRENCY
+# predictions are serialized straight into their upload; True also writes them to the working directory
+PREDICTION_SAVE_LOCAL_COPY = False
+# rows unchanged since the previous run reuse its predictions, see PredictionIndex
+PREDICTION_INCREMENTAL = True
+PREDICTION_INDEX_FILE_NAME = "forest_predictions.index.npz"
+# where runs keep their local copy of the index, one sub-directory per data bucket
+PREDICTION_INDEX_LOCAL_DIR = PREDICTION_INDEX_DIR
+# processes scoring chunks in parallel, by default one per core available to this process
+PREDICTION_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+# compact dtypes of the columns of Parquet and Arrow prediction files, other columns keep their types
+PREDICTION_COLUMN_DTYPES = {
+    "Id": "int32",
+    "Elevation": "int16",
+    "Aspect": "int16",
+    "Slope": "int16",
+    "Horizontal_Distance_To_Hydrology": "int16",
+    "Vertical_Distance_To_Hydrology": "int16",
+    "Horizontal_Distance_To_Roadways": "int16",
+    "Hillshade_9am": "uint8",
+    "Hillshade_Noon": "uint8",
+    "Hillshade_3pm": "uint8",
+    "Horizontal_Distance_To_Fire_Points": "int16",
+    **{f"Wilderness_Area{i}": "uint8" for i in range(1, 5)},
+    **{f"Soil_Type{i}": "uint8" for i in range(1, 41)},
+    "Cover_Type": "int8",
+}
+
+COVER_TYPE_NAMES = {
+    1: "Spruce/Fir",
+    2: "Lodgepole Pine",
+    3: "Ponderosa Pine",
+    4: "Cottonwood/Willow",
+    5: "Aspen",
+    6: "Douglas-fir",
+    7: "Krummholz"
+}
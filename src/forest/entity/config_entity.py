@@ -6,63 +6,101 @@
 import os
 from src.forest.constant.training_pipeline import *
 from src.forest.constant import prediction_pipeline
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
-ROOT_DIR = os.getcwd()
-TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
 
+def get_timestamp() -> str:
+    return datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
 
+
+# the timestamp and artifact directory are fixed when a pipeline run creates its config,
+# not when this module is imported, so every run gets its own artifact directory
 @dataclass
 class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
-    artifact_dir: str = os.path.join(ROOT_DIR,ARTIFACT_DIR, TIMESTAMP)
-    timestamp: str = TIMESTAMP
+    timestamp: str = field(default_factory=get_timestamp)
+    artifact_dir: str = field(init=False)
 
-training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
+    def __post_init__(self):
+        self.artifact_dir = os.path.join(os.getcwd(), ARTIFACT_DIR, self.timestamp)
 
 
 @dataclass
 class DataIngestionConfig:
-    data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
-    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig)
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
     collection_name:str = DATA_INGESTION_COLLECTION_NAME
+    data_ingestion_dir: str = field(init=False)
+    feature_store_file_path: str = field(init=False)
+    training_file_path: str = field(init=False)
+    testing_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_ingestion_dir = os.path.join(self.training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
+        self.feature_store_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
+        self.training_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
+        self.testing_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
 
 
 @dataclass
 class DataValidationConfig:
-    data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
-    valid_data_dir: str = os.path.join(data_validation_dir, DATA_VALIDATION_VALID_DIR)
-    invalid_data_dir: str = os.path.join(data_validation_dir, DATA_VALIDATION_INVALID_DIR)
-    valid_train_file_path: str = os.path.join(valid_data_dir, TRAIN_FILE_NAME)
-    valid_test_file_path: str = os.path.join(valid_data_dir, TEST_FILE_NAME)
-    invalid_train_file_path: str = os.path.join(invalid_data_dir, TRAIN_FILE_NAME)
-    invalid_test_file_path: str = os.path.join(invalid_data_dir, TEST_FILE_NAME)
-    drift_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
-                                            DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig)
+    data_validation_dir: str = field(init=False)
+    valid_data_dir: str = field(init=False)
+    invalid_data_dir: str = field(init=False)
+    valid_train_file_path: str = field(init=False)
+    valid_test_file_path: str = field(init=False)
+    invalid_train_file_path: str = field(init=False)
+    invalid_test_file_path: str = field(init=False)
+    drift_report_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_validation_dir = os.path.join(self.training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
+        self.valid_data_dir = os.path.join(self.data_validation_dir, DATA_VALIDATION_VALID_DIR)
+        self.invalid_data_dir = os.path.join(self.data_validation_dir, DATA_VALIDATION_INVALID_DIR)
+        self.valid_train_file_path = os.path.join(self.valid_data_dir, TRAIN_FILE_NAME)
+        self.valid_test_file_path = os.path.join(self.valid_data_dir, TEST_FILE_NAME)
+        self.invalid_train_file_path = os.path.join(self.invalid_data_dir, TRAIN_FILE_NAME)
+        self.invalid_test_file_path = os.path.join(self.invalid_data_dir, TEST_FILE_NAME)
+        self.drift_report_file_path = os.path.join(self.data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
+                                                   DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
 
 
 @dataclass
 class DataTransformationConfig:
-    data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-    transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                    TRAIN_FILE_NAME.replace("csv", "npy"))
-    transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                TEST_FILE_NAME.replace("csv", "npy"))
-    transformed_object_file_path: str = os.path.join(data_transformation_dir,
-                                                    DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
-                                                    PREPROCSSING_OBJECT_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig)
+    data_transformation_dir: str = field(init=False)
+    transformed_train_file_path: str = field(init=False)
+    transformed_test_file_path: str = field(init=False)
+    transformed_object_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_transformation_dir = os.path.join(self.training_pipeline_config.artifact_dir,
+                                                    DATA_TRANSFORMATION_DIR_NAME)
+        self.transformed_train_file_path = os.path.join(self.data_transformation_dir,
+                                                        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                        TRAIN_FILE_NAME.replace("csv", "npy"))
+        self.transformed_test_file_path = os.path.join(self.data_transformation_dir,
+                                                       DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                       TEST_FILE_NAME.replace("csv", "npy"))
+        self.transformed_object_file_path = os.path.join(self.data_transformation_dir,
+                                                         DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+                                                         PREPROCSSING_OBJECT_FILE_NAME)
 
 
 @dataclass
 class ModelTrainerConfig:
-    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
-    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    model_trainer_dir: str = field(init=False)
+    trained_model_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.model_trainer_dir = os.path.join(self.training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
+        self.trained_model_file_path = os.path.join(self.model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                    MODEL_FILE_NAME)
 
 
 @dataclass
@@ -86,5 +124,15 @@ class PredictionPipelineConfig:
     model_file_path: str = os.path.join(MODEL_PUSHER_S3_KEY, MODEL_FILE_NAME)
     model_bucket_name: str = prediction_pipeline.MODEL_BUCKET_NAME
     output_file_name:str = prediction_pipeline.PREDICTION_OUTPUT_FILE_NAME
+    data_format: str = prediction_pipeline.PREDICTION_INPUT_FORMAT
+    output_format: str = prediction_pipeline.PREDICTION_OUTPUT_FORMAT
+    chunk_size: int = prediction_pipeline.PREDICTION_CHUNK_SIZE
+    upload_part_size: int = prediction_pipeline.PREDICTION_UPLOAD_PART_SIZE
+    upload_concurrency: int = prediction_pipeline.PREDICTION_UPLOAD_CONCURRENCY
+    save_local_copy: bool = prediction_pipeline.PREDICTION_SAVE_LOCAL_COPY
+    n_workers: int = prediction_pipeline.PREDICTION_WORKERS
+    incremental: bool = prediction_pipeline.PREDICTION_INCREMENTAL
+    index_file_name: str = prediction_pipeline.PREDICTION_INDEX_FILE_NAME
+    index_local_dir: str = prediction_pipeline.PREDICTION_INDEX_LOCAL_DIR
 
 
@@ -1,10 +1,20 @@
 import sys
+from typing import TYPE_CHECKING, Optional, Sequence
+import numpy as np
 from pandas import DataFrame
-from sklearn.pipeline import Pipeline
 from src.forest.exception import ForestException
 from src.forest.logger import logging
+from src.forest.entity.tree_ensemble import FlatForest, FusedForest, compile_forest, fuse_forest
+from src.forest.entity.model_bundle import ModelBundle
+from src.forest.constant.application import MODEL_SERVING_FLAT_FOREST_MAX_ROWS
+from src.forest.constant.training_pipeline import SCHEMA_FILE_PATH
 
 from dataclasses import dataclass
+
+if TYPE_CHECKING:
+    # sklearn is only needed once a pickled model is loaded
+    from sklearn.pipeline import Pipeline
+
 class TargetValueMapping:
     def __init__(self):
         self.neg:int = 0
@@ -16,9 +26,46 @@ class TargetValueMapping:
         return dict(zip(mapping_response.values(),mapping_response.keys()))
 
 class SensorModel:
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    def __init__(self, preprocessing_object: "Pipeline", trained_model_object: object):
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.flat_forest: FlatForest = None
+        self.fused_forest: FusedForest = None
+
+    def compile_forest(self, dtype=np.float64) -> bool:
+        """
+        Export trained_model_object to a FlatForest used by predict when available, and fold
+        preprocessing_object into it so raw columns can be scored without transforming them
+        :return: True when the trained model is a supported forest
+        """
+        self.flat_forest = compile_forest(self.trained_model_object, dtype=dtype)
+        self.fused_forest = None
+        if self.flat_forest is not None:
+            logging.info(f"Compiled {self} into a flat forest of {self.flat_forest.n_trees} trees, "
+                         f"{self.flat_forest.n_nodes} nodes, {self.flat_forest.nbytes} bytes")
+            self.fused_forest = fuse_forest(self.preprocessing_object, self.flat_forest)
+            if self.fused_forest is None:
+                logging.info(f"Preprocessor of {self} cannot be folded, serving keeps the transform step")
+            else:
+                logging.info(f"Folded the preprocessor of {self} into the flat forest thresholds")
+        return self.flat_forest is not None
+
+    def save_bundle(self, path: str, metadata: Optional[dict] = None) -> bool:
+        """
+        Write the fused forest as a ModelBundle file, which MappedSensorModel.load_bundle maps without unpickling
+        :param metadata: Training metadata stored in the bundle manifest
+        :return: False when the model has no fused forest to bundle
+        """
+        fused_forest = getattr(self, "fused_forest", None)
+        if fused_forest is None:
+            return False
+        ModelBundle(fused_forest, metadata={"model_name": type(self.trained_model_object).__name__,
+                                            **(metadata or {})}).write(path)
+        return True
+
+    def _use_compiled(self, n_rows: int) -> bool:
+        # sklearn's compiled traversal is faster for large batches
+        return n_rows <= MODEL_SERVING_FLAT_FOREST_MAX_ROWS
 
     def predict(self, dataframe: DataFrame) -> DataFrame:
         logging.info("Entered predict method of SensorTruckModel class")
@@ -26,16 +73,81 @@ class SensorModel:
         try:
             logging.info("Using the trained model to get predictions")
 
+            # models pickled before compiled forests existed have neither attribute
+            fused_forest = getattr(self, "fused_forest", None)
+            if fused_forest is not None and self._use_compiled(len(dataframe)):
+                return fused_forest.predict(dataframe)
+
             transformed_feature = self.preprocessing_object.transform(dataframe)
 
             logging.info("Used the trained model to get predictions")
+            flat_forest = getattr(self, "flat_forest", None)
+            if flat_forest is not None and self._use_compiled(len(dataframe)):
+                return flat_forest.predict(transformed_feature)
             return self.trained_model_object.predict(transformed_feature)
 
         except Exception as e:
             raise ForestException(e, sys) from e
 
+    def predict_features(self, features: np.ndarray, columns: Sequence[str]) -> np.ndarray:
+        """
+        Predict on a feature matrix laid out like columns, as built by FeatureAssembler
+        """
+        fused_forest = getattr(self, "fused_forest", None)
+        if fused_forest is not None and self._use_compiled(len(features)):
+            try:
+                return fused_forest.predict_features(features, columns)
+            except Exception as e:
+                raise ForestException(e, sys) from e
+        return self.predict(DataFrame(features, columns=columns, copy=False))
+
     def __repr__(self):
         return f"{type(self.trained_model_object).__name__}()"
 
     def __str__(self):
         return f"{type(self.trained_model_object).__name__}()"
+
+
+class MappedSensorModel(SensorModel):
+    """
+    SensorModel served from a fused forest memory-mapped from a bundle file, see SensorModel.save_bundle.
+
+    Neither the preprocessor nor the sklearn forest is loaded, so processes mapping the same
+    bundle share one copy of the node arrays, and every batch size is scored by the
+    flat forest.
+    """
+
+    def __init__(self, fused_forest: FusedForest, model_name: str):
+        super().__init__(preprocessing_object=None, trained_model_object=None)
+        self.fused_forest = fused_forest
+        self.model_name = model_name
+        # training metadata of the bundle the model was loaded from
+        self.metadata: dict = {}
+
+    @classmethod
+    def from_bundle(cls, bundle: ModelBundle) -> "MappedSensorModel":
+        model = cls(fused_forest=bundle.fused_forest, model_name=bundle.metadata.get("model_name", "FlatForest"))
+        model.metadata = bundle.metadata
+        return model
+
+    @classmethod
+    def load_bundle(cls, source, schema_file_path: Optional[str] = SCHEMA_FILE_PATH) -> "MappedSensorModel":
+        """
+        Map a bundle written by SensorModel.save_bundle, checking its columns against schema_file_path
+        :param source: Path or binary file object of the bundle, see ModelBundle.load
+        """
+        return cls.from_bundle(ModelBundle.load(source, mmap_mode="r", schema_file_path=schema_file_path))
+
+    def save_bundle(self, path: str, metadata: Optional[dict] = None) -> bool:
+        ModelBundle(self.fused_forest, metadata={**self.metadata, "model_name": self.model_name,
+                                                 **(metadata or {})}).write(path)
+        return True
+
+    def _use_compiled(self, n_rows: int) -> bool:
+        return True
+
+    def __repr__(self):
+        return f"{self.model_name}()"
+
+    def __str__(self):
+        return f"{self.model_name}()"
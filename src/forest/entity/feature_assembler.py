@@ -0,0 +1,105 @@
+import sys
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+from src.forest.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.forest.exception import ForestException
+from src.forest.utils.main_utils import read_yaml_file
+
+
+class FeatureAssembler:
+    """
+    This class builds model input matrices in the exact column layout used for training.
+
+    It is compiled once from schema.yaml: the layout is numerical_columns without
+    drop_columns, every column starts from a template value (0 for the wilderness and
+    soil indicators the live form does not send), and incoming fields are written
+    straight into a NumPy buffer by column index.
+    """
+
+    def __init__(self, columns: Sequence[str], drop_columns: Sequence[str] = (), default_value: float = 0.0):
+        """
+        :param columns: Model input columns in training order
+        :param drop_columns: Columns removed during training, never part of the layout
+        :param default_value: Template value for columns a payload does not provide
+        """
+        dropped = set(drop_columns)
+        self.columns: List[str] = [column for column in columns if column not in dropped]
+        self.column_index: Dict[str, int] = {column: i for i, column in enumerate(self.columns)}
+        # live/batch payload fields are the lower-cased training column names
+        self.field_index: Dict[str, int] = {column.lower(): i for i, column in enumerate(self.columns)}
+        self.template = np.full(len(self.columns), default_value, dtype=np.float64)
+        self.template.setflags(write=False)
+
+    @classmethod
+    def from_schema(cls, schema_file_path: str = SCHEMA_FILE_PATH) -> "FeatureAssembler":
+        try:
+            schema_config = read_yaml_file(schema_file_path)
+            return cls(columns=schema_config["numerical_columns"],
+                       drop_columns=schema_config.get("drop_columns") or [])
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def _new_buffer(self, n_rows: int) -> np.ndarray:
+        buffer = np.empty((n_rows, self.n_features), dtype=np.float64)
+        buffer[:] = self.template
+        return buffer
+
+    def _field_positions(self, fields: Sequence[str]) -> List[Optional[int]]:
+        # fields outside the layout (e.g. hillshade readings) are not model inputs
+        return [self.field_index.get(field.lower()) for field in fields]
+
+    def assemble_record(self, record: Mapping[str, float]) -> np.ndarray:
+        """
+        Build a (1, n_features) matrix from one payload, e.g. LivePredictionInput.dict()
+        """
+        buffer = self._new_buffer(1)
+        row = buffer[0]
+        for field, value in record.items():
+            position = self.field_index.get(field.lower())
+            if position is not None:
+                row[position] = value
+        return buffer
+
+    def assemble_columns(self, values: Mapping[str, Sequence[float]], n_rows: Optional[int] = None) -> np.ndarray:
+        """
+        Build an (n_rows, n_features) matrix from one value list per field
+        """
+        if n_rows is None:
+            n_rows = len(next(iter(values.values()))) if values else 0
+        buffer = self._new_buffer(n_rows)
+        for field, position in zip(values, self._field_positions(list(values))):
+            if position is not None:
+                buffer[:, position] = values[field]
+        return buffer
+
+    def assemble_frame(self, dataframe: DataFrame) -> np.ndarray:
+        """
+        Build a matrix from a DataFrame holding every training column; extra columns are ignored.
+        Unlike a live payload, a batch missing a model column is rejected rather than filled from the template.
+        """
+        missing_columns = [column for column in self.columns if column not in dataframe.columns]
+        if missing_columns:
+            raise ForestException(f"Columns missing from input: {missing_columns}", sys)
+        buffer = np.empty((len(dataframe), self.n_features), dtype=np.float64)
+        for column, position in self.column_index.items():
+            buffer[:, position] = dataframe[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        return buffer
+
+    def to_frame(self, features: np.ndarray) -> DataFrame:
+        return DataFrame(features, columns=self.columns, copy=False)
+
+
+@lru_cache(maxsize=None)
+def get_feature_assembler(schema_file_path: str = SCHEMA_FILE_PATH) -> FeatureAssembler:
+    """
+    Return the process-wide assembler compiled from schema_file_path
+    """
+    return FeatureAssembler.from_schema(schema_file_path)
@@ -0,0 +1,263 @@
+import json
+import os
+import struct
+import sys
+from io import BufferedReader, FileIO
+from typing import BinaryIO, Dict, Optional, Union
+
+import numpy as np
+
+from src.forest.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.forest.entity.tree_ensemble import FlatForest, FusedForest
+from src.forest.exception import ForestException
+
+MODEL_BUNDLE_MAGIC = b"FORESTMB"
+MODEL_BUNDLE_FORMAT_VERSION = 1
+# written next to the pickled model by the trainer, see model_bundle_path
+MODEL_BUNDLE_SUFFIX = ".bundle"
+# array offsets are aligned to cache lines, so every array maps as an aligned view of the file
+MODEL_BUNDLE_ALIGNMENT = 64
+# tree arrays of FlatForest plus the imputer statistics; the scaler is folded into the thresholds
+MODEL_BUNDLE_ARRAY_NAMES = FlatForest.ARRAY_NAMES + ("fill_values",)
+
+# magic, then the byte length of the JSON manifest that follows it
+_HEADER = struct.Struct("<8sQ")
+
+
+def model_bundle_path(model_path: str) -> str:
+    """
+    Return the bundle path of a pickled model path, e.g. model.pkl -> model.bundle
+    """
+    return os.path.splitext(model_path)[0] + MODEL_BUNDLE_SUFFIX
+
+
+def is_model_bundle(file: BinaryIO) -> bool:
+    """
+    Tell from its first bytes whether file holds a bundle or a pickle, leaving its position unchanged
+    """
+    if hasattr(file, "peek"):
+        return file.peek(len(MODEL_BUNDLE_MAGIC))[:len(MODEL_BUNDLE_MAGIC)] == MODEL_BUNDLE_MAGIC
+    position = file.tell()
+    header = file.read(len(MODEL_BUNDLE_MAGIC))
+    file.seek(position)
+    return header == MODEL_BUNDLE_MAGIC
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // MODEL_BUNDLE_ALIGNMENT) * MODEL_BUNDLE_ALIGNMENT
+
+
+def _file_path(file: BinaryIO) -> Optional[str]:
+    # only a plain file can be mapped, not a decompressed or downloaded stream
+    if isinstance(file, BufferedReader) and isinstance(file.raw, FileIO) and isinstance(file.name, str):
+        return file.name
+    return None
+
+
+def _read_into(source: BinaryIO, buffer: memoryview) -> int:
+    filled = 0
+    while filled < len(buffer):
+        size = source.readinto(buffer[filled:])
+        if not size:
+            break
+        filled += size
+    return filled
+
+
+def _read_stream(source: BinaryIO) -> np.ndarray:
+    """
+    Read a bundle from a stream that cannot be mapped, e.g. a decompressed download, straight into
+    one buffer sized from its manifest
+    """
+    header = bytearray(_HEADER.size)
+    if _read_into(source, memoryview(header)) < _HEADER.size:
+        raise ValueError("Model bundle is truncated")
+    _, manifest_size = _HEADER.unpack(header)
+    manifest = bytearray(_HEADER.size + manifest_size)
+    manifest[:_HEADER.size] = header
+    if _read_into(source, memoryview(manifest)[_HEADER.size:]) < manifest_size:
+        raise ValueError("Model bundle is truncated")
+    layout = ModelBundle._read_manifest(manifest)["arrays"].values()
+    size = _aligned(len(manifest)) + max((array["offset"] + np.dtype(array["dtype"]).itemsize
+                                          * int(np.prod(array["shape"], dtype=np.int64)) for array in layout),
+                                         default=0)
+    buffer = np.empty(max(size, len(manifest)), dtype=np.uint8)
+    buffer[:len(manifest)] = np.frombuffer(manifest, dtype=np.uint8)
+    filled = len(manifest) + _read_into(source, memoryview(buffer)[len(manifest):])
+    # a short stream is reported by load as a truncated array
+    return buffer[:filled]
+
+
+class ModelBundle:
+    """
+    This class is the versioned file format of a fused forest, loaded without unpickling.
+
+    A bundle is a single file: an 8-byte magic, the length of a JSON manifest, the manifest,
+    then each array as its raw little-endian buffer at a 64-byte aligned offset. The manifest
+    holds the format version, the schema columns in input order, the class labels, the dtype,
+    shape and offset of every array and free training metadata. Loading a bundle from a file
+    maps it read-only and views the arrays in place, so it costs a few milliseconds whatever
+    the forest size and never executes code from the file.
+    """
+
+    def __init__(self, fused_forest: FusedForest, metadata: Optional[dict] = None):
+        """
+        :param fused_forest: Forest with the preprocessor folded in, see FusedForest.from_preprocessor
+        :param metadata: JSON training metadata, e.g. model name, score and training time
+        """
+        self.fused_forest = fused_forest
+        self.metadata = dict(metadata or {})
+
+    @property
+    def columns(self):
+        return self.fused_forest.columns
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        forest = self.fused_forest.forest
+        arrays = {name: getattr(forest, name) for name in FlatForest.ARRAY_NAMES}
+        arrays["fill_values"] = np.asarray(self.fused_forest.fill_values, dtype=np.float64)
+        return {name: np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder("<"))
+                for name, array in arrays.items()}
+
+    def write(self, path: str) -> None:
+        """
+        Write the bundle to path, through a temporary file renamed over it once complete
+        """
+        try:
+            forest = self.fused_forest.forest
+            arrays = self._arrays()
+            layout, offset = {}, 0
+            for name, array in arrays.items():
+                layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+                offset = _aligned(offset + array.nbytes)
+            manifest = {"format_version": MODEL_BUNDLE_FORMAT_VERSION,
+                        "columns": self.columns,
+                        "classes": forest.classes.tolist(),
+                        "classes_dtype": forest.classes.dtype.str,
+                        "input_dtype": forest.input_dtype.str,
+                        "n_trees": forest.n_trees,
+                        "n_nodes": forest.n_nodes,
+                        "arrays": layout,
+                        "metadata": self.metadata}
+            manifest_bytes = json.dumps(manifest).encode()
+            data_offset = _aligned(_HEADER.size + len(manifest_bytes))
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            staging_path = f"{path}.tmp-{os.getpid()}"
+            try:
+                with open(staging_path, "wb") as bundle_file:
+                    bundle_file.write(_HEADER.pack(MODEL_BUNDLE_MAGIC, len(manifest_bytes)))
+                    bundle_file.write(manifest_bytes)
+                    for name, array in arrays.items():
+                        bundle_file.write(b"\0" * (data_offset + layout[name]["offset"] - bundle_file.tell()))
+                        bundle_file.write(memoryview(array).cast("B"))
+                os.replace(staging_path, path)
+            finally:
+                if os.path.exists(staging_path):
+                    os.remove(staging_path)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    @staticmethod
+    def _read_manifest(header: bytes) -> dict:
+        magic, manifest_size = _HEADER.unpack_from(header)
+        if magic != MODEL_BUNDLE_MAGIC:
+            raise ValueError("Not a model bundle")
+        manifest = json.loads(bytes(header[_HEADER.size:_HEADER.size + manifest_size]))
+        version = manifest.get("format_version")
+        if version != MODEL_BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Model bundle format {version} is not supported, "
+                             f"expected {MODEL_BUNDLE_FORMAT_VERSION}")
+        return manifest
+
+    @classmethod
+    def read_manifest(cls, path: str) -> dict:
+        """
+        Return the manifest of the bundle at path without reading its arrays
+        """
+        try:
+            with open(path, "rb") as bundle_file:
+                _, manifest_size = _HEADER.unpack(bundle_file.read(_HEADER.size))
+                bundle_file.seek(0)
+                return cls._read_manifest(bundle_file.read(_HEADER.size + manifest_size))
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    @classmethod
+    def load(cls, source: Union[str, BinaryIO], mmap_mode: Optional[str] = "r",
+             schema_file_path: Optional[str] = SCHEMA_FILE_PATH) -> "ModelBundle":
+        """
+        Load a bundle written by write
+        :param source: Path or binary file object of the bundle; a plain file is mapped by path,
+                       any other stream is read into a single buffer the arrays are viewed from
+        :param mmap_mode: "r" maps the file read-only, None reads it into memory
+        :param schema_file_path: schema.yaml the bundle columns are checked against, None skips the check
+        """
+        try:
+            path = source if isinstance(source, str) else _file_path(source)
+            if path is not None and mmap_mode is not None:
+                buffer = np.memmap(path, dtype=np.uint8, mode=mmap_mode)
+            elif path is not None:
+                buffer = np.fromfile(path, dtype=np.uint8)
+            else:
+                buffer = _read_stream(source)
+            if buffer.size < _HEADER.size:
+                raise ValueError("Model bundle is truncated")
+            _, manifest_size = _HEADER.unpack_from(buffer)
+            data_offset = _aligned(_HEADER.size + manifest_size)
+            manifest = cls._read_manifest(buffer[:_HEADER.size + manifest_size])
+
+            arrays = {}
+            for name in MODEL_BUNDLE_ARRAY_NAMES:
+                layout = manifest["arrays"][name]
+                dtype, shape = np.dtype(layout["dtype"]), tuple(layout["shape"])
+                start = data_offset + layout["offset"]
+                end = start + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+                if end > buffer.size:
+                    raise ValueError(f"Model bundle is truncated in array {name}")
+                # plain ndarray views of the map keep np.memmap's subclass overhead off the routing loop
+                arrays[name] = np.asarray(buffer[start:end]).view(dtype).reshape(shape)
+
+            fill_values = arrays.pop("fill_values")
+            classes = np.asarray(manifest["classes"], dtype=np.dtype(manifest["classes_dtype"]))
+            forest = FlatForest(classes=classes, input_dtype=np.dtype(manifest["input_dtype"]), **arrays)
+            bundle = cls(FusedForest(forest=forest, columns=manifest["columns"], fill_values=fill_values),
+                         metadata=manifest["metadata"])
+            bundle.validate(manifest)
+            if schema_file_path is not None:
+                bundle.validate_schema(schema_file_path)
+            return bundle
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def validate(self, manifest: dict) -> None:
+        """
+        Check that the arrays are consistent with each other, so routing cannot read out of bounds
+        """
+        forest = self.fused_forest.forest
+        n_columns = len(self.columns)
+        if forest.n_trees != manifest["n_trees"] or forest.n_nodes != manifest["n_nodes"]:
+            raise ValueError("Model bundle arrays do not match its manifest")
+        if forest.children.shape != (forest.n_nodes, 2) or len(forest.threshold) != forest.n_nodes \
+                or forest.value.shape != (forest.n_nodes, len(forest.classes)):
+            raise ValueError("Model bundle node arrays have inconsistent shapes")
+        if len(self.fused_forest.fill_values) != n_columns or forest.feature.max(initial=-1) >= n_columns:
+            raise ValueError(f"Model bundle splits on more than its {n_columns} columns")
+        for name in ("children", "roots"):
+            nodes = getattr(forest, name)
+            if nodes.size and (nodes.min() < 0 or nodes.max() >= forest.n_nodes):
+                raise ValueError(f"Model bundle {name} point outside its {forest.n_nodes} nodes")
+
+    def validate_schema(self, schema_file_path: str = SCHEMA_FILE_PATH) -> None:
+        """
+        Check that the bundle takes the model input columns of schema_file_path, see FeatureAssembler
+        """
+        from src.forest.entity.feature_assembler import FeatureAssembler
+
+        schema_columns = FeatureAssembler.from_schema(schema_file_path).columns
+        # FusedForest picks its columns by name, only their set has to match
+        missing = [column for column in schema_columns if column not in self.columns]
+        unexpected = [column for column in self.columns if column not in schema_columns]
+        if missing or unexpected:
+            raise ForestException(f"Model bundle columns do not match {schema_file_path}: "
+                                  f"missing {missing}, unexpected {unexpected}", sys)
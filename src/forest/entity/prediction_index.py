@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+from typing import BinaryIO, Iterable, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.forest.exception import ForestException
+
+PREDICTION_INDEX_METADATA_FILE_NAME = "index.json"
+
+
+class IndexEntries(NamedTuple):
+    """
+    Fingerprints and predictions of the rows of one scored chunk
+    """
+    fingerprints: np.ndarray
+    predictions: np.ndarray
+    # rows whose prediction was found in the previous run's index
+    reused: int
+
+
+class PredictionIndex:
+    """
+    This class maps the fingerprints of feature rows scored by a batch prediction run to their
+    predictions, for one model version.
+
+    A fingerprint is a 64-bit hash of the row of the model input matrix, so any change of a
+    feature value gives a new fingerprint while columns the model does not read are ignored.
+    Fingerprints are kept sorted and looked up by binary search. An index is stored with the
+    model version it was built with and only used with that version. It is kept in the bucket
+    as a single .npz archive, replaced in one write, and locally as .npy files that scoring
+    processes memory-map.
+    """
+
+    ARRAY_NAMES = ("fingerprints", "predictions")
+
+    def __init__(self, fingerprints: np.ndarray, predictions: np.ndarray, model_version: str,
+                 feature_columns: Sequence[str]):
+        """
+        :param fingerprints: Sorted unique row fingerprints, see fingerprint
+        :param predictions: Prediction of the row of each fingerprint
+        :param model_version: Version of the model that made the predictions
+        :param feature_columns: Layout of the hashed feature rows
+        """
+        self.fingerprints = fingerprints
+        self.predictions = predictions
+        self.model_version = model_version
+        self.feature_columns = list(feature_columns)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    @staticmethod
+    def fingerprint(features: np.ndarray) -> np.ndarray:
+        """
+        Return the uint64 fingerprint of every row of a model input matrix
+        """
+        return pd.util.hash_pandas_object(pd.DataFrame(features, copy=False), index=False).to_numpy()
+
+    def matches(self, model_version: Optional[str], feature_columns: Sequence[str]) -> bool:
+        return model_version is not None and model_version == self.model_version \
+            and list(feature_columns) == self.feature_columns
+
+    def lookup(self, fingerprints: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: (boolean mask of the fingerprints found in the index, their predictions in order)
+        """
+        if not len(self.fingerprints):
+            return np.zeros(len(fingerprints), dtype=bool), self.predictions[:0]
+        positions = np.searchsorted(self.fingerprints, fingerprints)
+        positions[positions == len(self.fingerprints)] = 0
+        found = self.fingerprints[positions] == fingerprints
+        return found, self.predictions[positions[found]]
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[IndexEntries], model_version: str,
+                     feature_columns: Sequence[str]) -> "PredictionIndex":
+        """
+        Build the index of the rows of a run from the entries of its chunks
+        """
+        entries = list(entries)
+        fingerprints = np.concatenate([entry.fingerprints for entry in entries]) if entries \
+            else np.empty(0, dtype=np.uint64)
+        predictions = np.concatenate([entry.predictions for entry in entries]) if entries \
+            else np.empty(0, dtype=np.int64)
+        # rows repeated in the input share one entry; np.unique also sorts the fingerprints
+        fingerprints, first_positions = np.unique(fingerprints, return_index=True)
+        return cls(fingerprints=fingerprints, predictions=predictions[first_positions],
+                   model_version=model_version, feature_columns=feature_columns)
+
+    def _metadata(self) -> dict:
+        return {"model_version": self.model_version, "feature_columns": self.feature_columns, "rows": len(self)}
+
+    def save(self, directory: str) -> None:
+        """
+        Write the arrays as .npy files and the model version as JSON into directory, for load to map
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for name in self.ARRAY_NAMES:
+                np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)),
+                        allow_pickle=False)
+            with open(os.path.join(directory, PREDICTION_INDEX_METADATA_FILE_NAME), "w") as metadata_file:
+                json.dump(self._metadata(), metadata_file)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def save_archive(self, file: Union[str, BinaryIO]) -> None:
+        """
+        Write the arrays and the model version into one uncompressed .npz archive
+        """
+        try:
+            np.savez(file, metadata=np.array(json.dumps(self._metadata())),
+                     **{name: getattr(self, name) for name in self.ARRAY_NAMES})
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    @classmethod
+    def load_archive(cls, file: Union[str, BinaryIO]) -> "PredictionIndex":
+        """
+        Read an index written by save_archive into memory
+        """
+        try:
+            with np.load(file, allow_pickle=False) as archive:
+                metadata = json.loads(str(archive["metadata"]))
+                arrays = {name: archive[name] for name in cls.ARRAY_NAMES}
+            return cls(model_version=metadata["model_version"], feature_columns=metadata["feature_columns"],
+                       **arrays)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    @staticmethod
+    def read_metadata(directory: str) -> dict:
+        with open(os.path.join(directory, PREDICTION_INDEX_METADATA_FILE_NAME)) as metadata_file:
+            return json.load(metadata_file)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "PredictionIndex":
+        """
+        Load an index written by save
+        :param mmap_mode: "r" maps the arrays read-only, so scoring processes share their pages
+        """
+        try:
+            metadata = cls.read_metadata(directory)
+            arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode,
+                                               allow_pickle=False))
+                      for name in cls.ARRAY_NAMES}
+            return cls(model_version=metadata["model_version"], feature_columns=metadata["feature_columns"],
+                       **arrays)
+        except Exception as e:
+            raise ForestException(e, sys) from e
@@ -1,8 +1,16 @@
 import sys
+from typing import Optional
 from src.forest.cloud_storage.aws_storage import SimpleStorageService
 from src.forest.exception import ForestException
+from src.forest.logger import logging
 from src.forest.entity.estimator import SensorModel
+from src.forest.entity.model_bundle import model_bundle_path
 from pandas import DataFrame
+
+# name of the pushed model in the artifact manifest of its bucket
+MODEL_ARTIFACT_NAME = "model"
+
+
 class SensorEstimator:
     """
     This class is used to save and retrieve sensor model in s3 bucket and to do prediction
@@ -16,11 +24,15 @@ class SensorEstimator:
         self.bucket_name = bucket_name
         self.s3 = SimpleStorageService()
         self.model_path = model_path
+        # key of the bundle pushed next to the pickled model, loaded in its place, see SimpleStorageService.load_model
+        self.bundle_path = model_bundle_path(model_path)
         self.loaded_model:SensorModel=None
 
 
     def is_model_present(self,model_path):
         try:
+            # the manifest can still name a model deleted since it was registered, so the key itself is checked;
+            # repeated checks are answered by the key cache, which the push already marked present
             return self.s3.s3_key_path_available(bucket_name=self.bucket_name, s3_key=model_path)
         except ForestException as e:
             print(e)
@@ -45,10 +57,31 @@ class SensorEstimator:
             self.s3.upload_file(from_file,
                                 to_filename=self.model_path,
                                 bucket_name=self.bucket_name,
-                                remove=remove
+                                remove=remove,
+                                compress=True
                                 )
         except Exception as e:
             raise ForestException(e, sys)
+        try:
+            self.s3.register_artifact(self.bucket_name, MODEL_ARTIFACT_NAME, self.model_path)
+        except Exception as e:
+            # the model is pushed, only the manifest shortcut to it is missing
+            logging.warning(f"Could not register {self.model_path} in the artifact manifest: {e}")
+
+    def save_bundle(self, from_file: Optional[str]) -> None:
+        """
+        Save the model bundle to bundle_path, or remove the bundle of a previous model when from_file is None,
+        so that a model without a bundle is not shadowed by an older one
+        :param from_file: Your local system model bundle path, see SensorModel.save_bundle
+        """
+        try:
+            if from_file is None:
+                self.s3.delete_object(self.bucket_name, self.bundle_path)
+            else:
+                self.s3.upload_file(from_file, to_filename=self.bundle_path, bucket_name=self.bucket_name,
+                                    remove=False)
+        except Exception as e:
+            raise ForestException(e, sys)
 
 
     def predict(self,dataframe:DataFrame):
@@ -0,0 +1,340 @@
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.forest.exception import ForestException
+
+
+class FlatForest:
+    """
+    This class evaluates a trained tree ensemble from flat NumPy arrays.
+
+    All trees are concatenated into contiguous node arrays (feature, threshold, children,
+    per-node class probabilities) so a whole batch is routed through every tree with a
+    handful of vectorized gathers per depth level, instead of sklearn's per-call input
+    validation and per-estimator Python dispatch.
+
+    Leaves have feature -1 and point to themselves, so routing is a fixed point once a
+    leaf is reached. Predictions match RandomForestClassifier.predict: inputs are cast to
+    float32 like sklearn does and per-tree leaf probabilities are summed in tree order.
+    """
+
+    # fraction of still-routing (tree, sample) pairs below which finished pairs are dropped
+    COMPACT_RATIO = 0.75
+    # node arrays stored by a ModelBundle
+    ARRAY_NAMES = ("feature", "threshold", "children", "value", "roots")
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, classes: np.ndarray, input_dtype=np.float32):
+        """
+        :param feature: Split feature per node, -1 for leaves
+        :param threshold: Split threshold per node, samples with x <= threshold go left
+        :param children: Global child indices, shape (n_nodes, 2) as [right, left] so that
+                         children[node, x <= threshold] is the next node; leaves point to themselves
+        :param value: Class probabilities per node, shape (n_nodes, n_classes)
+        :param roots: Global index of each tree's root node
+        :param classes: Class label per value column
+        :param input_dtype: dtype inputs are cast to before comparison
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.input_dtype = np.dtype(input_dtype)
+        self._children_flat = children.reshape(-1)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.children, self.value, self.roots))
+
+    @classmethod
+    def from_sklearn(cls, forest: object, dtype=np.float64) -> "FlatForest":
+        """
+        Export a fitted sklearn forest classifier (or a search object wrapping one)
+        :param forest: e.g. RandomForestClassifier, ExtraTreesClassifier or GridSearchCV over them
+        :param dtype: np.float64, or np.float32 to halve threshold memory; float32 thresholds are
+                      rounded down so comparisons against float32 inputs stay exact
+        """
+        try:
+            forest = getattr(forest, "best_estimator_", forest)
+            estimators = getattr(forest, "estimators_", None)
+            if estimators is None or not hasattr(forest, "classes_") or getattr(forest, "n_outputs_", 1) != 1:
+                raise ValueError(f"{type(forest).__name__} is not a fitted single-output forest classifier")
+
+            trees = [estimator.tree_ for estimator in estimators]
+            n_nodes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+            offsets = np.concatenate([[0], np.cumsum(n_nodes)[:-1]])
+            if n_nodes.sum() >= np.iinfo(np.int32).max // 2:
+                raise ValueError(f"Forest with {n_nodes.sum()} nodes is too large for int32 node indices")
+
+            leaves = np.concatenate([tree.children_left < 0 for tree in trees])
+            own_index = np.arange(leaves.size, dtype=np.int32)
+            feature = np.concatenate([tree.feature for tree in trees]).astype(np.int32)
+            feature[leaves] = -1
+            threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+            threshold[leaves] = 0.0
+            children = np.empty((leaves.size, 2), dtype=np.int32)
+            children[:, 0] = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+            children[:, 1] = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)])
+            children[leaves, 0] = own_index[leaves]
+            children[leaves, 1] = own_index[leaves]
+
+            n_classes = len(forest.classes_)
+            value = np.ascontiguousarray(np.concatenate([tree.value[:, 0, :n_classes] for tree in trees]),
+                                         dtype=np.float64)
+            if _tree_proba_is_normalised():
+                # sklearn < 1.4 stores class counts and normalises them in predict_proba
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+
+            flat_forest = cls(feature=feature, threshold=threshold, children=children, value=value,
+                              roots=offsets.astype(np.int32), classes=np.asarray(forest.classes_),
+                              input_dtype=np.float32)
+            return flat_forest.astype(dtype)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def astype(self, dtype) -> "FlatForest":
+        """
+        Return a copy whose thresholds are stored as dtype
+        """
+        dtype = np.dtype(dtype)
+        threshold = self.threshold
+        if dtype == np.float32 and threshold.dtype != np.float32:
+            if self.input_dtype != np.float32:
+                raise ForestException("float32 thresholds require float32 inputs", sys)
+            # largest float32 <= t keeps "x <= t" unchanged for every float32 x
+            rounded = threshold.astype(np.float32)
+            too_high = rounded.astype(np.float64) > threshold
+            rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+            threshold = rounded
+        elif dtype != np.float32:
+            threshold = threshold.astype(dtype)
+        return FlatForest(feature=self.feature, threshold=threshold, children=self.children, value=self.value,
+                          roots=self.roots, classes=self.classes, input_dtype=self.input_dtype)
+
+    def fold_scaling(self, mean: np.ndarray, scale: np.ndarray) -> "FlatForest":
+        """
+        Return a forest on raw feature values, equivalent to this one on (x - mean) / scale.
+
+        For every split the raw threshold is the largest float64 x whose scaled value, cast to
+        input_dtype like sklearn does, still goes left; the scaling is monotone so the routing
+        of every raw input is unchanged, including float32 rounding at the split boundary.
+        :param mean: Per-feature offset, e.g. StandardScaler.mean_
+        :param scale: Per-feature positive divisor, e.g. StandardScaler.scale_
+        """
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        internal = np.flatnonzero(self.feature >= 0)
+        features = self.feature[internal]
+        node_mean, node_scale = mean[features], scale[features]
+        threshold = self.threshold[internal].astype(np.float64)
+
+        def goes_left(x: np.ndarray) -> np.ndarray:
+            return ((x - node_mean) / node_scale).astype(self.input_dtype) <= threshold
+
+        # bisect over the ordered float64 bit patterns: low always goes left, high never does
+        max_value = np.finfo(np.float64).max
+        low = np.full(internal.size, _ordered_bits(np.array(-max_value)), dtype=np.uint64)
+        high = np.full(internal.size, _ordered_bits(np.array(max_value)), dtype=np.uint64)
+        with np.errstate(over="ignore", invalid="ignore"):
+            for _ in range(64):
+                middle = low + (high - low) // np.uint64(2)
+                left = goes_left(_from_ordered_bits(middle))
+                low = np.where(left, middle, low)
+                high = np.where(left, high, middle)
+
+        raw_threshold = np.zeros(self.n_nodes, dtype=np.float64)
+        raw_threshold[internal] = _from_ordered_bits(low)
+        return FlatForest(feature=self.feature, threshold=raw_threshold, children=self.children, value=self.value,
+                          roots=self.roots, classes=self.classes, input_dtype=np.float64)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Route every sample through every tree
+        :return: leaf index per (tree, sample), shape (n_trees, n_samples)
+        """
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        n_samples, n_features = X.shape
+        values = X.reshape(-1)
+        leaves = np.empty(self.n_trees * n_samples, dtype=np.int32)
+
+        # one entry per (tree, sample) pair still being routed, tree-major
+        pairs = np.arange(leaves.size)
+        nodes = np.repeat(self.roots, n_samples)
+        row_offsets = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+        features = self.feature.take(nodes)
+        while True:
+            internal = features >= 0
+            n_internal = np.count_nonzero(internal)
+            if n_internal == 0:
+                break
+            if n_internal < self.COMPACT_RATIO * pairs.size:
+                finished = ~internal
+                leaves[pairs[finished]] = nodes[finished]
+                keep = np.flatnonzero(internal)
+                pairs, nodes, row_offsets, features = (pairs.take(keep), nodes.take(keep),
+                                                       row_offsets.take(keep), features.take(keep))
+            # pairs already on a leaf (feature -1) read an arbitrary value and stay put
+            go_left = values.take(row_offsets + features, mode="wrap") <= self.threshold.take(nodes)
+            nodes = self._children_flat.take(2 * nodes + go_left)
+            features = self.feature.take(nodes)
+        leaves[pairs] = nodes
+        return leaves.reshape(self.n_trees, n_samples)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[1], self.value.shape[1]), dtype=np.float64)
+        for tree_leaves in leaves:
+            proba += self.value.take(tree_leaves, axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class FusedForest:
+    """
+    This class predicts on raw feature columns with the preprocessing folded into the trees.
+
+    The StandardScaler is folded into the split thresholds (see FlatForest.fold_scaling), so
+    only rows that actually contain NaNs are touched, by filling them with the imputer's
+    statistics before routing.
+    """
+
+    def __init__(self, forest: FlatForest, columns: Sequence[str], fill_values: np.ndarray):
+        """
+        :param forest: Forest with raw-unit thresholds over columns
+        :param columns: Raw input columns in the preprocessor's order
+        :param fill_values: Imputed value per column for missing inputs
+        """
+        self.forest = forest
+        self.columns: List[str] = list(columns)
+        self.fill_values = fill_values
+
+    @classmethod
+    def from_preprocessor(cls, preprocessing_object: object, forest: FlatForest) -> "FusedForest":
+        """
+        Fold a fitted ColumnTransformer made of one SimpleImputer/StandardScaler pipeline into forest
+        :param preprocessing_object: e.g. the object built by DataTransformation.get_data_transformer_object
+        :param forest: FlatForest exported from the model trained on the preprocessor output
+        """
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        try:
+            if not isinstance(preprocessing_object, ColumnTransformer):
+                raise ValueError(f"Cannot fold {type(preprocessing_object).__name__}, expected a ColumnTransformer")
+            transformers = [(transformer, columns) for _, transformer, columns in preprocessing_object.transformers_
+                            if not (isinstance(transformer, str) and transformer == "drop")]
+            if len(transformers) != 1:
+                raise ValueError(f"Cannot fold {len(transformers)} transformers, expected one")
+            pipeline, columns = transformers[0]
+            if not all(isinstance(column, str) for column in columns):
+                raise ValueError("Cannot fold a transformer over positional columns")
+            steps = [step for _, step in pipeline.steps] if isinstance(pipeline, Pipeline) else [pipeline]
+
+            n_features = len(columns)
+            fill_values = np.full(n_features, np.nan)
+            mean, scale = np.zeros(n_features), np.ones(n_features)
+            for position, step in enumerate(steps):
+                if isinstance(step, SimpleImputer) and position == 0:
+                    statistics = np.asarray(step.statistics_, dtype=np.float64)
+                    if step.add_indicator or not np.isnan(step.missing_values) or np.isnan(statistics).any():
+                        raise ValueError("Cannot fold an imputer that adds or drops columns")
+                    fill_values = statistics
+                elif isinstance(step, StandardScaler) and position == len(steps) - 1:
+                    if step.mean_ is not None:
+                        mean = np.asarray(step.mean_, dtype=np.float64)
+                    if step.scale_ is not None:
+                        scale = np.asarray(step.scale_, dtype=np.float64)
+                elif not (isinstance(step, str) and step == "passthrough"):
+                    raise ValueError(f"Cannot fold preprocessing step {type(step).__name__}")
+            if forest.feature.max(initial=-1) >= n_features:
+                raise ValueError(f"Forest splits on more than the {n_features} preprocessed columns")
+            return cls(forest=forest.fold_scaling(mean, scale), columns=columns, fill_values=fill_values)
+        except Exception as e:
+            raise ForestException(e, sys) from e
+
+    def _impute(self, features: np.ndarray) -> np.ndarray:
+        missing = np.isnan(features)
+        missing_rows = missing.any(axis=1)
+        if missing_rows.any():
+            features = features.copy()
+            features[missing_rows] = np.where(missing[missing_rows], self.fill_values, features[missing_rows])
+        return features
+
+    def predict_features(self, features: np.ndarray, columns: Sequence[str]) -> np.ndarray:
+        """
+        Predict on a raw feature matrix laid out like columns
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if list(columns) != self.columns:
+            column_index = {column: i for i, column in enumerate(columns)}
+            features = features[:, [column_index[column] for column in self.columns]]
+        return self.forest.predict(self._impute(features))
+
+    def predict(self, dataframe) -> np.ndarray:
+        features = dataframe[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        return self.forest.predict(self._impute(features))
+
+
+_SIGN_BIT = np.uint64(1 << 63)
+
+
+def _ordered_bits(values: np.ndarray) -> np.ndarray:
+    """
+    Map float64 values to uint64 keys with the same ordering
+    """
+    bits = np.asarray(values, dtype=np.float64).view(np.uint64)
+    return np.where(bits >> np.uint64(63), ~bits, bits | _SIGN_BIT)
+
+
+def _from_ordered_bits(keys: np.ndarray) -> np.ndarray:
+    bits = np.where(keys >> np.uint64(63), keys & ~_SIGN_BIT, ~keys)
+    return bits.view(np.float64)
+
+
+def _tree_proba_is_normalised() -> bool:
+    """
+    True when DecisionTreeClassifier.predict_proba divides leaf values by their sum (sklearn < 1.4)
+    """
+    import sklearn
+
+    major, minor = (int(part) for part in sklearn.__version__.split(".")[:2])
+    return (major, minor) < (1, 4)
+
+
+def compile_forest(model: object, dtype=np.float64) -> Optional[FlatForest]:
+    """
+    Export model to a FlatForest, or return None when it is not a supported forest
+    """
+    try:
+        return FlatForest.from_sklearn(model, dtype=dtype)
+    except ForestException:
+        return None
+
+
+def fuse_forest(preprocessing_object: object, forest: FlatForest) -> Optional[FusedForest]:
+    """
+    Fold preprocessing_object into forest, or return None when the preprocessor cannot be folded
+    """
+    try:
+        return FusedForest.from_preprocessor(preprocessing_object, forest)
+    except ForestException:
+        return None
@@ -29,15 +29,25 @@ import os
 from from_root import from_root
 from datetime import datetime
 
+
+class _LazyFileHandler(logging.FileHandler):
+    """
+    File handler that creates its log directory and file on the first record instead of at import,
+    so importing the package has no filesystem side effects
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 logs_path = os.path.join(from_root(), "logs", LOG_FILE)
 
-os.makedirs(logs_path, exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
+    handlers=[_LazyFileHandler(LOG_FILE_PATH, delay=True)],
     format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
     level=logging.DEBUG,
-)
\ No newline at end of file
+)
@@ -1,67 +1,145 @@
+import io
+import multiprocessing
+import shutil
 import sys
 import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, BinaryIO, Callable, ContextManager, Iterator, List, NamedTuple, Optional, Tuple
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
-from src.forest.cloud_storage.aws_storage import SimpleStorageService
+from src.forest.cloud_storage.artifact_cache import log_artifact_cache_stats
 from src.forest.exception import ForestException
 from src.forest.logger import logging
 from src.forest.utils.main_utils import read_yaml_file
 from src.forest.constant.training_pipeline import SCHEMA_FILE_PATH
 from src.forest.entity.config_entity import PredictionPipelineConfig
-from src.forest.entity.s3_estimator import SensorEstimator
+from src.forest.entity.feature_assembler import get_feature_assembler
+from src.forest.entity.prediction_index import IndexEntries, PredictionIndex
+from src.forest.serving.model_holder import ModelHolder
+from src.forest.utils.table_format import CSV, EncodedChunk, TableWriter, encode_chunk, read_table_chunks, \
+    table_format_for, write_table
+
+if TYPE_CHECKING:
+    from src.forest.cloud_storage.aws_storage import SimpleStorageService
+
+# bytes read from the input stream at a time when splitting it into shards
+SHARD_READ_SIZE = 1024 * 1024
+
+
+class ScoredChunk(NamedTuple):
+    """
+    Predictions of one chunk, as produced by the scoring process
+    """
+    chunk: EncodedChunk
+    n_rows: int
+    # None for dummy predictions or when no prediction index is kept
+    entries: Optional[IndexEntries]
 
 
 class PredictionPipeline:
-    def __init__(self,prediction_pipeline_config:PredictionPipelineConfig=PredictionPipelineConfig(),)->None:
+    def __init__(self,prediction_pipeline_config:PredictionPipelineConfig=PredictionPipelineConfig(),
+                 storage: Optional["SimpleStorageService"] = None)->None:
         """
         :param prediction_pipeline_config:
+        :param storage: Storage service holding the input and output files, created on first use when None
         """
         try:
             self.schema_config = read_yaml_file(SCHEMA_FILE_PATH)
             self.prediction_pipeline_config = prediction_pipeline_config
-            self.s3 = SimpleStorageService()
+            # same schema-compiled layout as the live endpoints
+            self.feature_assembler = get_feature_assembler()
+            self._s3 = storage
+            # csv, parquet or arrow, from the config or the file extensions
+            self.input_format = table_format_for(prediction_pipeline_config.data_file_path,
+                                                 prediction_pipeline_config.data_format)
+            self.output_format = table_format_for(prediction_pipeline_config.output_file_name,
+                                                  prediction_pipeline_config.output_format)
+            # predictions of the previous run, set by _load_prediction_index when the run is incremental
+            self.prediction_index: Optional[PredictionIndex] = None
         except Exception as e:
             raise ForestException(e,sys)
 
+    @property
+    def s3(self) -> "SimpleStorageService":
+        # scoring workers never touch S3, so the client is only created when files are read or written
+        if self._s3 is None:
+            from src.forest.cloud_storage.aws_storage import SimpleStorageService
+
+            self._s3 = SimpleStorageService()
+        return self._s3
+
     def get_data(self,)->DataFrame:
         try:
             logging.info("Entered get_data method of PredictionPipeline class")
 
             try:
                 # Try to read the prediction data from S3
-                prediction_df: DataFrame = self.s3.read_csv(
-                    filename=self.prediction_pipeline_config.data_file_path,
-                    bucket_name=self.prediction_pipeline_config.data_bucket_name
+                prediction_df: DataFrame = self.s3.download_dataframe(
+                    bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                    s3_key=self.prediction_pipeline_config.data_file_path,
+                    table_format=self.input_format
                 )
-                logging.info("Read prediction csv file from s3 bucket")
+                logging.info(f"Read prediction {self.input_format} file from s3 bucket")
             except Exception as s3_error:
                 # If file doesn't exist in S3, create a sample dataframe for testing
                 logging.warning(f"Could not read prediction data from S3: {str(s3_error)}")
-                logging.info("Creating a sample dataframe for testing purposes")
+                prediction_df = self._sample_dataframe()
 
-                # Use the numerical_columns from schema which has the correct case
-                columns = self.schema_config["numerical_columns"]
-                logging.info(f"Using numerical columns from schema: {columns}")
+            logging.info("Exited the get_data method of PredictionPipeline class")
+            return prediction_df
+        except Exception as e:
+            raise ForestException(e, sys)
 
-                # Create an empty dataframe with the correct columns
-                prediction_df = pd.DataFrame(columns=columns)
+    def get_data_chunks(self) -> Iterator[DataFrame]:
+        """
+        Read the prediction file as DataFrames of at most chunk_size rows, parsed from the
+        S3 body while it is downloaded, so the whole file is never held in memory.
+        Falls back to the sample dataframe like get_data when the file cannot be opened.
+        """
+        stream = self._open_data_stream()
+        if stream is None:
+            return iter([self._sample_dataframe()])
+        return self._read_table_chunks(stream)
 
-                # Add a sample row with default values (all zeros)
-                sample_row = {col: 0 for col in columns}
+    def _open_data_stream(self) -> Optional[BinaryIO]:
+        try:
+            stream = self.s3.open_object_stream(
+                bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                s3_key=self.prediction_pipeline_config.data_file_path
+            )
+            logging.info(f"Opened prediction {self.input_format} file from s3 bucket")
+            return stream
+        except Exception as s3_error:
+            logging.warning(f"Could not read prediction data from S3: {str(s3_error)}")
+            return None
 
-                # Use pandas concat instead of append (which is deprecated)
-                prediction_df = pd.concat([prediction_df, pd.DataFrame([sample_row])], ignore_index=True)
+    def _read_table_chunks(self, stream) -> Iterator[DataFrame]:
+        with stream:
+            yield from read_table_chunks(stream, self.input_format, self.prediction_pipeline_config.chunk_size)
 
-                # Log the column names to verify
-                logging.info(f"Created sample dataframe with columns: {prediction_df.columns.tolist()}")
+    def _sample_dataframe(self) -> DataFrame:
+        logging.info("Creating a sample dataframe for testing purposes")
 
-                logging.info(f"Created sample dataframe with columns: {columns}")
+        # Use the numerical_columns from schema which has the correct case
+        columns = self.schema_config["numerical_columns"]
+        logging.info(f"Using numerical columns from schema: {columns}")
 
-            logging.info("Exited the get_data method of PredictionPipeline class")
-            return prediction_df
-        except Exception as e:
-            raise ForestException(e, sys)
+        # Create an empty dataframe with the correct columns
+        prediction_df = pd.DataFrame(columns=columns)
+
+        # Add a sample row with default values (all zeros)
+        sample_row = {col: 0 for col in columns}
+
+        # Use pandas concat instead of append (which is deprecated)
+        prediction_df = pd.concat([prediction_df, pd.DataFrame([sample_row])], ignore_index=True)
+
+        # Log the column names to verify
+        logging.info(f"Created sample dataframe with columns: {prediction_df.columns.tolist()}")
+        return prediction_df
 
 
 
@@ -71,23 +149,15 @@ class PredictionPipeline:
             logging.info(f"Input dataframe shape: {dataframe.shape}")
             logging.info(f"Input dataframe columns: {dataframe.columns.tolist()}")
 
-            # Create the model estimator
-            model = SensorEstimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path
-            )
-            logging.info(f"Created SensorEstimator with bucket: {self.prediction_pipeline_config.model_bucket_name}, path: {self.prediction_pipeline_config.model_file_path}")
-
-            # Check if model is present
-            is_model_present = model.is_model_present(self.prediction_pipeline_config.model_file_path)
-            logging.info(f"Is model present in S3: {is_model_present}")
-
-            if not is_model_present:
-                raise ForestException(f"Model not found at {self.prediction_pipeline_config.model_file_path} in bucket {self.prediction_pipeline_config.model_bucket_name}", sys)
+            # Use the process-wide resident model instead of downloading it on every call
+            model_holder = self._model_holder()
+            model = model_holder.get_model()
+            logging.info(f"Using resident model from bucket: {self.prediction_pipeline_config.model_bucket_name}, path: {self.prediction_pipeline_config.model_file_path}, version: {model_holder.version}")
 
             # Make predictions
             logging.info("Making predictions...")
-            predictions = model.predict(dataframe)
+            features = self.feature_assembler.assemble_frame(dataframe)
+            predictions = model.predict_features(features, self.feature_assembler.columns)
             logging.info(f"Predictions shape: {predictions.shape if hasattr(predictions, 'shape') else 'unknown'}")
             logging.info("Exited the predict method of PredictionPipeline class")
 
@@ -97,68 +167,443 @@ class PredictionPipeline:
             raise ForestException(e, sys)
 
 
-    def initiate_prediction(self,)->None:
+    def _model_holder(self) -> ModelHolder:
+        return ModelHolder.get(
+            bucket_name=self.prediction_pipeline_config.model_bucket_name,
+            model_path=self.prediction_pipeline_config.model_file_path
+        )
+
+    def _predict_incremental(self, dataframe: DataFrame) -> Tuple[np.ndarray, Optional[IndexEntries]]:
+        """
+        Predict like predict, reusing the predictions of the prediction index for the rows it holds
+        :return: (predictions, index entries of the rows or None when the predictions cannot be indexed)
+        """
+        if self.prediction_index is None:
+            return self.predict(dataframe), None
+        try:
+            model = self._model_holder().get_model()
+            columns = self.feature_assembler.columns
+            features = self.feature_assembler.assemble_frame(dataframe)
+            fingerprints = PredictionIndex.fingerprint(features)
+            found, cached_predictions = self.prediction_index.lookup(fingerprints)
+            if found.all():
+                predictions = cached_predictions
+            elif not found.any():
+                predictions = model.predict_features(features, columns)
+            else:
+                new_predictions = model.predict_features(features[~found], columns)
+                predictions = np.empty(len(features), dtype=np.result_type(cached_predictions, new_predictions))
+                predictions[found] = cached_predictions
+                predictions[~found] = new_predictions
+            logging.info(f"Scored {len(features) - int(found.sum())} new or changed rows, "
+                         f"reused {int(found.sum())} predictions")
+            if predictions.dtype.kind not in "biu":
+                # class labels that are not numbers would need pickling to be saved in the index
+                return predictions, None
+            return predictions, IndexEntries(fingerprints=fingerprints, predictions=predictions,
+                                             reused=int(found.sum()))
+        except Exception as e:
+            logging.error(f"Error in _predict_incremental method: {str(e)}")
+            raise ForestException(e, sys)
+
+    @property
+    def _prediction_index_directory(self) -> str:
+        # local copy mapped by the scoring processes, outside the working directory
+        config = self.prediction_pipeline_config
+        return os.path.join(config.index_local_dir, config.data_bucket_name,
+                            os.path.splitext(os.path.basename(config.index_file_name))[0])
+
+    def _load_prediction_index(self) -> None:
+        """
+        Make the index saved by the previous run current when it was built by the resident model
+        version, else start an empty one, so that a new model version rescores every row
+        """
+        config = self.prediction_pipeline_config
+        if not config.incremental:
+            return
+        model_holder = self._model_holder()
+        model_holder.get_model()
+        model_version = model_holder.version
+        if model_version is None:
+            logging.warning("The model has no version to key the prediction index with, every row is scored")
+            return
+        prediction_index = None
+        try:
+            with self.s3.open_object_stream(config.data_bucket_name, config.index_file_name) as stream, \
+                    tempfile.TemporaryFile() as archive_file:
+                shutil.copyfileobj(stream, archive_file, 1024 * 1024)
+                archive_file.seek(0)
+                prediction_index = PredictionIndex.load_archive(archive_file)
+        except Exception as index_error:
+            logging.info(f"No prediction index from a previous run, every row is scored: {str(index_error)}")
+        if prediction_index is not None and not prediction_index.matches(model_version, self.feature_assembler.columns):
+            logging.info(f"The prediction index was built by model version {prediction_index.model_version}, "
+                         f"every row is scored with version {model_version}")
+            prediction_index = None
+        if prediction_index is None:
+            prediction_index = PredictionIndex.from_entries([], model_version, self.feature_assembler.columns)
+        else:
+            logging.info(f"Loaded the predictions of {len(prediction_index)} rows from the previous run")
+        try:
+            self._replace_local_prediction_index(prediction_index)
+            self.prediction_index = PredictionIndex.load(self._prediction_index_directory)
+        except Exception as index_error:
+            logging.warning(f"Cannot keep a local prediction index, every row is scored: {str(index_error)}")
+
+    def _replace_local_prediction_index(self, prediction_index: PredictionIndex) -> None:
+        directory = self._prediction_index_directory
+        staging_directory = directory + ".partial"
+        shutil.rmtree(staging_directory, ignore_errors=True)
+        prediction_index.save(staging_directory)
+        # processes that mapped the old files keep reading them after they are deleted
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(staging_directory, directory)
+
+    def _save_prediction_index(self, entries: List[IndexEntries]) -> None:
+        """
+        Replace the prediction index with the rows of this run, so that rows dropped from the input leave it
+        """
+        if self.prediction_index is None:
+            return
+        config = self.prediction_pipeline_config
+        prediction_index = PredictionIndex.from_entries(entries, self.prediction_index.model_version,
+                                                        self.feature_assembler.columns)
+        self._replace_local_prediction_index(prediction_index)
+        reused = sum(entry.reused for entry in entries)
+        logging.info(f"Reused {reused} predictions of the previous run, indexed {len(prediction_index)} rows")
+        archive_path = self._prediction_index_directory + ".npz"
+        try:
+            # one object, replaced in a single write, so a run never reads a partly updated index
+            prediction_index.save_archive(archive_path)
+            self.s3.upload_file(archive_path, config.index_file_name, config.data_bucket_name, compress=True)
+        except Exception as upload_error:
+            logging.warning(f"Failed to upload the prediction index to S3: {str(upload_error)}")
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+
+    def initiate_prediction(self, stage_tracker: Optional[Callable[[str], ContextManager]] = None) -> Optional[DataFrame]:
+        """
+        :param stage_tracker: Optional callable returning a context manager that wraps each stage,
+                              used by background jobs to report per-stage progress and timings
+        :return: The predicted dataframe when chunk_size is 0, None when the file is predicted in chunks
+        """
+        track = stage_tracker or (lambda stage_name: nullcontext())
         try:
             logging.info("Entered initiate_prediction method of PredictionPipeline class")
 
+            if self.prediction_pipeline_config.incremental:
+                with track("load_index"):
+                    self._load_prediction_index()
+
+            if self.prediction_pipeline_config.chunk_size:
+                self._predict_in_chunks(track)
+                logging.info("Exited initiate_prediction method of PredictionPipeline class")
+                return None
+
             # Get data (either from S3 or a sample dataframe)
-            dataframe = self.get_data()
+            with track("get_data"):
+                dataframe = self.get_data()
             logging.info(f"Got dataframe with shape: {dataframe.shape}")
 
-            try:
-                # Try to make predictions
-                predicted_arr = self.predict(dataframe)
-                logging.info(f"Made predictions with shape: {predicted_arr.shape if hasattr(predicted_arr, 'shape') else 'unknown'}")
-
-                # Create a dataframe with predictions
-                prediction = pd.DataFrame(list(predicted_arr))
-                prediction.columns = ['Cover_Type']
-
-                # If the original dataframe already has Cover_Type column, drop it before concatenating
-                if 'Cover_Type' in dataframe.columns:
-                    dataframe = dataframe.drop('Cover_Type', axis=1)
-                    logging.info("Dropped existing Cover_Type column from input dataframe")
-
-                # Combine original data with predictions
-                predicted_dataframe = pd.concat([dataframe, prediction], axis=1)
-                logging.info(f"Created final dataframe with shape: {predicted_dataframe.shape}")
-            except Exception as predict_error:
-                # If prediction fails, create a dummy prediction
-                logging.warning(f"Failed to make predictions: {str(predict_error)}")
-                logging.info("Creating dummy predictions for demonstration purposes")
-
-                # Create a dummy prediction (all 1's)
-                prediction = pd.DataFrame({'Cover_Type': [1] * len(dataframe)})
-
-                # Combine original data with dummy predictions
-                predicted_dataframe = pd.concat([dataframe, prediction], axis=1)
-                logging.info(f"Created final dataframe with dummy predictions, shape: {predicted_dataframe.shape}")
+            with track("predict"):
+                predicted_dataframe, entries = self._predict_with_fallback(dataframe)
 
-            try:
-                # Try to upload the results to S3
-                self.s3.upload_df_as_csv(
-                    predicted_dataframe,
-                    self.prediction_pipeline_config.output_file_name,
-                    self.prediction_pipeline_config.output_file_name,
-                    self.prediction_pipeline_config.data_bucket_name,
-                )
-                logging.info(f"Uploaded predictions to S3 bucket: {self.prediction_pipeline_config.data_bucket_name}")
-            except Exception as upload_error:
-                # If upload fails, log the error but continue
-                logging.warning(f"Failed to upload predictions to S3: {str(upload_error)}")
-                logging.info("Continuing without uploading to S3")
-
-            # Save predictions locally as a fallback
-            local_output_path = os.path.join(os.getcwd(), self.prediction_pipeline_config.output_file_name)
-            predicted_dataframe.to_csv(local_output_path, index=False)
-            logging.info(f"Saved predictions locally to: {local_output_path}")
+            with track("save_predictions"):
+                self._save_predictions(predicted_dataframe)
+                self._save_prediction_index([entries] if entries is not None else [])
 
             logging.info("Exited initiate_prediction method of PredictionPipeline class")
             return predicted_dataframe
         except Exception as e:
             logging.error(f"Error in initiate_prediction: {str(e)}")
             raise ForestException(e, sys)
+        finally:
+            log_artifact_cache_stats()
 
-
-
-
+    def _predict_with_fallback(self, dataframe: DataFrame) -> Tuple[DataFrame, Optional[IndexEntries]]:
+        """
+        :return: (dataframe with its Cover_Type predictions, prediction index entries of its rows,
+                  None for dummy predictions or when no index is kept)
+        """
+        entries = None
+        try:
+            # Try to make predictions
+            predicted_arr, entries = self._predict_incremental(dataframe)
+            logging.info(f"Made predictions with shape: {predicted_arr.shape if hasattr(predicted_arr, 'shape') else 'unknown'}")
+
+            # Create a dataframe with predictions
+            # aligned on the input index, which does not start at 0 for later chunks
+            prediction = pd.DataFrame({'Cover_Type': list(predicted_arr)}, index=dataframe.index)
+
+            # If the original dataframe already has Cover_Type column, drop it before concatenating
+            if 'Cover_Type' in dataframe.columns:
+                dataframe = dataframe.drop('Cover_Type', axis=1)
+                logging.info("Dropped existing Cover_Type column from input dataframe")
+
+            # Combine original data with predictions
+            predicted_dataframe = pd.concat([dataframe, prediction], axis=1)
+            logging.info(f"Created final dataframe with shape: {predicted_dataframe.shape}")
+        except Exception as predict_error:
+            # If prediction fails, create a dummy prediction
+            logging.warning(f"Failed to make predictions: {str(predict_error)}")
+            logging.info("Creating dummy predictions for demonstration purposes")
+
+            # Create a dummy prediction (all 1's)
+            prediction = pd.DataFrame({'Cover_Type': [1] * len(dataframe)}, index=dataframe.index)
+
+            # Combine original data with dummy predictions
+            predicted_dataframe = pd.concat([dataframe, prediction], axis=1)
+            logging.info(f"Created final dataframe with dummy predictions, shape: {predicted_dataframe.shape}")
+            entries = None
+
+        return predicted_dataframe, entries
+
+    def _save_predictions(self, predicted_dataframe: DataFrame) -> None:
+        """
+        Serialize the predictions straight into their S3 upload, also writing them to the working
+        directory when save_local_copy is set or as a fallback when the upload fails
+        """
+        config = self.prediction_pipeline_config
+        local_output_path = os.path.join(os.getcwd(), config.output_file_name)
+        try:
+            # Try to upload the results to S3
+            self.s3.upload_dataframe(
+                predicted_dataframe,
+                bucket_name=config.data_bucket_name,
+                s3_key=config.output_file_name,
+                table_format=self.output_format,
+                part_size=config.upload_part_size,
+                concurrency=config.upload_concurrency,
+                local_filename=local_output_path if config.save_local_copy else None,
+            )
+            logging.info(f"Uploaded predictions to S3 bucket: {config.data_bucket_name}")
+            if config.save_local_copy:
+                logging.info(f"Saved predictions locally to: {local_output_path}")
+            return
+        except Exception as upload_error:
+            # If upload fails, log the error but continue
+            logging.warning(f"Failed to upload predictions to S3: {str(upload_error)}")
+            logging.info("Continuing without uploading to S3")
+
+        # Save predictions locally as a fallback
+        write_table(predicted_dataframe, local_output_path, self.output_format)
+        logging.info(f"Saved predictions locally to: {local_output_path}")
+
+    def _predict_in_chunks(self, track) -> None:
+        """
+        Read, score and write the prediction file chunk by chunk. Each chunk's predictions are
+        appended to a multipart upload of the S3 output object, and to the local output file when
+        save_local_copy is set or the upload cannot be started, so peak memory is bounded by
+        chunk_size rows instead of the file size.
+        With n_workers above 1 the chunks are scored by a pool of processes, see _score_shards.
+        """
+        config = self.prediction_pipeline_config
+        with track("get_data"):
+            stream = self._open_data_stream()
+        if stream is None:
+            scored_chunks = self._score_chunks(iter([self._sample_dataframe()]))
+        elif config.n_workers > 1:
+            scored_chunks = self._score_shards(stream)
+        else:
+            scored_chunks = self._score_chunks(self._read_table_chunks(stream))
+
+        local_output_path = os.path.join(os.getcwd(), config.output_file_name)
+        staging_path = local_output_path + ".partial"
+        upload = self._open_prediction_upload()
+        keep_local_copy = config.save_local_copy or upload is None
+        n_rows = 0
+        index_entries: List[IndexEntries] = []
+        try:
+            with track("predict"), \
+                    (open(staging_path, "wb") if keep_local_copy else nullcontext()) as local_file:
+                sink = _PredictionSink(local_file, upload)
+                with TableWriter(sink, self.output_format) as writer:
+                    for chunk, n_chunk_rows, entries in scored_chunks:
+                        writer.write(chunk)
+                        n_rows += n_chunk_rows
+                        if entries is not None:
+                            index_entries.append(entries)
+                        logging.info(f"Predicted {n_rows} rows so far")
+                upload = sink.upload
+
+            with track("save_predictions"):
+                if keep_local_copy:
+                    os.replace(staging_path, local_output_path)
+                    logging.info(f"Saved {n_rows} predictions locally to: {local_output_path}")
+                if upload is not None:
+                    try:
+                        upload.close()
+                        logging.info(f"Uploaded predictions to S3 bucket: {config.data_bucket_name}")
+                    except Exception as upload_error:
+                        upload.abort()
+                        if not keep_local_copy:
+                            raise
+                        logging.warning(f"Failed to upload predictions to S3: {str(upload_error)}")
+                self._save_prediction_index(index_entries)
+        except BaseException:
+            if upload is not None:
+                upload.abort()
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+            raise
+
+    def _score_chunks(self, chunks: Iterator[DataFrame]) -> Iterator[ScoredChunk]:
+        """
+        Score DataFrame chunks in this process
+        :return: Iterator of ScoredChunk; a CSV header comes with the first one
+        """
+        first_chunk = True
+        for dataframe in chunks:
+            predicted_dataframe, entries = self._predict_with_fallback(dataframe)
+            yield ScoredChunk(chunk=encode_chunk(predicted_dataframe, self.output_format, header=first_chunk),
+                              n_rows=len(predicted_dataframe), entries=entries)
+            first_chunk = False
+
+    def _score_shards(self, stream: BinaryIO) -> Iterator[ScoredChunk]:
+        """
+        Split the input into shards of about chunk_size rows and have n_workers processes score and
+        encode them, using the prediction index mapped from its local copy. CSV input is split into
+        blocks of lines that the workers also parse; Parquet and Arrow input is decoded here, which
+        is cheap, and sent as DataFrames. Each worker loads the model once; results are yielded in
+        input order, and at most two shards per worker are in flight so memory stays bounded.
+        """
+        config = self.prediction_pipeline_config
+        pool = ProcessPoolExecutor(max_workers=config.n_workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_prediction_worker,
+                                   initargs=(config, self.prediction_index is not None))
+        logging.info(f"Scoring shards of {config.chunk_size} rows on {config.n_workers} worker processes")
+        try:
+            with stream:
+                if self.input_format == CSV:
+                    shards = ((_score_csv_shard, header, block, first_row)
+                              for first_row, header, block in _iter_csv_shards(stream, config.chunk_size))
+                else:
+                    shards = ((_score_dataframe_shard, dataframe)
+                              for dataframe in read_table_chunks(stream, self.input_format, config.chunk_size))
+                pending = deque()
+                for score_shard, *shard in shards:
+                    pending.append(pool.submit(score_shard, *shard))
+                    if len(pending) >= 2 * config.n_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _open_prediction_upload(self):
+        try:
+            return self.s3.open_multipart_upload(
+                bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                s3_key=self.prediction_pipeline_config.output_file_name,
+                part_size=self.prediction_pipeline_config.upload_part_size,
+                concurrency=self.prediction_pipeline_config.upload_concurrency,
+            )
+        except Exception as upload_error:
+            # as in whole-file mode, predictions are still saved locally
+            logging.warning(f"Failed to start the upload of predictions to S3: {str(upload_error)}")
+            logging.info("Continuing without uploading to S3")
+            return None
+
+
+
+class _PredictionSink:
+    """
+    Binary file object writing the prediction file to its upload and, when given, a local file.
+    A failed upload is aborted and dropped if the local file is still saved, and raises otherwise.
+    """
+
+    def __init__(self, local_file: Optional[BinaryIO], upload):
+        self.local_file = local_file
+        self.upload = upload
+        self.closed = False
+        self._position = 0
+
+    def write(self, data) -> int:
+        if self.local_file is not None:
+            self.local_file.write(data)
+        self._position += len(data)
+        if self.upload is not None:
+            try:
+                self.upload.write(data)
+            except Exception as upload_error:
+                self.upload.abort()
+                self.upload = None
+                if self.local_file is None:
+                    raise
+                logging.warning(f"Failed to upload predictions to S3: {str(upload_error)}")
+                logging.info("Continuing without uploading to S3")
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        if self.local_file is not None:
+            self.local_file.flush()
+
+    def close(self) -> None:
+        # the local file and the upload are closed by _predict_in_chunks
+        self.closed = True
+
+
+def _iter_csv_shards(stream: BinaryIO, rows_per_shard: int) -> Iterator[Tuple[int, bytes, bytes]]:
+    """
+    Split a CSV byte stream at line boundaries without parsing it (fields must not contain newlines)
+    :return: Iterator of (index of the shard's first line, header line, lines of the shard)
+    """
+    header = stream.readline()
+    first_row = 0
+    blocks, n_lines = [], 0
+    partial_line = b""
+    while True:
+        data = stream.read(SHARD_READ_SIZE)
+        if not data:
+            break
+        data = partial_line + data
+        end_of_lines = data.rfind(b"\n") + 1
+        partial_line = data[end_of_lines:]
+        if end_of_lines:
+            blocks.append(data[:end_of_lines])
+            n_lines += blocks[-1].count(b"\n")
+        if n_lines >= rows_per_shard:
+            yield first_row, header, b"".join(blocks)
+            first_row += n_lines
+            blocks, n_lines = [], 0
+    if partial_line.strip():
+        blocks.append(partial_line + b"\n")
+    if blocks:
+        yield first_row, header, b"".join(blocks)
+
+
+# pipeline of a scoring worker process, created once by _init_prediction_worker
+_WORKER_PIPELINE: Optional[PredictionPipeline] = None
+
+
+def _init_prediction_worker(prediction_pipeline_config: PredictionPipelineConfig, use_prediction_index: bool) -> None:
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = PredictionPipeline(prediction_pipeline_config)
+    # load the model before the first shard arrives
+    _WORKER_PIPELINE._model_holder().get_model()
+    if use_prediction_index:
+        # written by the parent's _load_prediction_index, the workers share its pages
+        _WORKER_PIPELINE.prediction_index = PredictionIndex.load(_WORKER_PIPELINE._prediction_index_directory)
+
+
+def _score_csv_shard(header: bytes, block: bytes, first_row: int) -> ScoredChunk:
+    """
+    Parse, score and encode one shard of CSV lines in a worker process
+    """
+    dataframe = pd.read_csv(io.BytesIO(header + block), na_values="na")
+    dataframe.index += first_row
+    return _score_dataframe_shard(dataframe)
+
+
+def _score_dataframe_shard(dataframe: DataFrame) -> ScoredChunk:
+    """
+    Score and encode one shard in a worker process; the shard starting at row 0 carries the CSV header
+    """
+    predicted_dataframe, entries = _WORKER_PIPELINE._predict_with_fallback(dataframe)
+    header = len(dataframe) == 0 or dataframe.index[0] == 0
+    return ScoredChunk(chunk=encode_chunk(predicted_dataframe, _WORKER_PIPELINE.output_format, header=header),
+                       n_rows=len(predicted_dataframe), entries=entries)
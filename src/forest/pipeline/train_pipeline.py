@@ -1,4 +1,7 @@
 import sys
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Optional
+from src.forest.cloud_storage.artifact_cache import log_artifact_cache_stats
 from src.forest.components.data_ingestion import DataIngestion
 from src.forest.components.data_validation import DataValidation
 from src.forest.components.data_transformation import DataTransformation
@@ -7,17 +10,20 @@ from src.forest.components.model_evaluation import ModelEvaluation
 from src.forest.components.model_pusher import ModelPusher
 from src.forest.exception import ForestException
 from src.forest.logger import logging
-from src.forest.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig,\
-ModelTrainerConfig,ModelEvaluationConfig, ModelPusherConfig
+from src.forest.entity.config_entity import TrainingPipelineConfig, DataIngestionConfig, DataValidationConfig, \
+DataTransformationConfig, ModelTrainerConfig,ModelEvaluationConfig, ModelPusherConfig
 from src.forest.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact,\
 ModelTrainerArtifact,ModelEvaluationArtifact
 
 class TrainPipeline:
     def __init__(self):
-        self.data_ingestion_config = DataIngestionConfig()
-        self.data_validation_config = DataValidationConfig()
-        self.data_transformation_config = DataTransformationConfig()
-        self.model_trainer_config = ModelTrainerConfig()
+        # one timestamped artifact directory per pipeline run
+        self.training_pipeline_config = TrainingPipelineConfig()
+        self.data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
+        self.data_validation_config = DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
+        self.data_transformation_config = DataTransformationConfig(
+            training_pipeline_config=self.training_pipeline_config)
+        self.model_trainer_config = ModelTrainerConfig(training_pipeline_config=self.training_pipeline_config)
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
 
@@ -101,27 +107,40 @@ class TrainPipeline:
             raise ForestException(e, sys)
 
 
-    def run_pipeline(self) -> None:
+    def run_pipeline(self, stage_tracker: Optional[Callable[[str], ContextManager]] = None) -> None:
+        """
+        :param stage_tracker: Optional callable returning a context manager that wraps each stage,
+                              used by background jobs to report per-stage progress and timings
+        """
         logging.info("Entered the run_pipeline method of TrainPipeline class")
+        track = stage_tracker or (lambda stage_name: nullcontext())
 
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact= self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-
-            data_transformation_artifact = self.start_data_transformation(
-                data_ingestion_artifact=data_ingestion_artifact)
+            with track("data_ingestion"):
+                data_ingestion_artifact = self.start_data_ingestion()
+            with track("data_validation"):
+                data_validation_artifact= self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+
+            with track("data_transformation"):
+                data_transformation_artifact = self.start_data_transformation(
+                    data_ingestion_artifact=data_ingestion_artifact)
             
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            with track("model_trainer"):
+                model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
 
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                    model_trainer_artifact=model_trainer_artifact)
+            with track("model_evaluation"):
+                model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
+                                                                        model_trainer_artifact=model_trainer_artifact)
 
             if not model_evaluation_artifact.is_model_accepted:
                 logging.info(f"Model not accepted.")
                 return None
-            model_pusher_artifact = self.start_model_pusher(model_trainer_artifact=model_trainer_artifact)
+            with track("model_pusher"):
+                model_pusher_artifact = self.start_model_pusher(model_trainer_artifact=model_trainer_artifact)
 
             logging.info("Exited the run_pipeline method of TrainPipeline class")
 
         except Exception as e:
             raise ForestException(e, sys) from e
+        finally:
+            log_artifact_cache_stats()
@@ -0,0 +1,176 @@
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.forest.constant.application import MODEL_SERVING_MICRO_BATCH_WINDOW_MS, MODEL_SERVING_MICRO_BATCH_MAX_SIZE, \
+    MODEL_SERVING_MICRO_BATCH_QUEUE_SIZE
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+
+
+class BatcherQueueFull(ForestException):
+    """
+    Raised when the micro-batcher queue is at capacity and the request should be shed
+    """
+
+
+class PredictionBatcher:
+    """
+    This class coalesces concurrent single-row predictions into batched model calls.
+
+    Rows submitted within window_ms of the first queued row (or until max_batch_size rows
+    are collected) are stacked into one matrix and scored by predict_fn off the event loop;
+    each awaiting caller then receives its own prediction.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], Sequence],
+                 window_ms: float = MODEL_SERVING_MICRO_BATCH_WINDOW_MS,
+                 max_batch_size: int = MODEL_SERVING_MICRO_BATCH_MAX_SIZE,
+                 max_queue_size: int = MODEL_SERVING_MICRO_BATCH_QUEUE_SIZE,
+                 max_concurrent_batches: int = 1):
+        """
+        :param predict_fn: Callable scoring a 2D feature matrix and returning one prediction per row.
+                           A coroutine function is awaited (e.g. to dispatch to an executor),
+                           a plain function is run on the default thread pool.
+        :param window_ms: How long the first row of a batch waits for more rows
+        :param max_batch_size: Maximum rows scored in one predict_fn call
+        :param max_queue_size: Maximum rows waiting to be batched before requests are rejected
+        :param max_concurrent_batches: Batches scored at the same time; rows keep accumulating while all are busy
+        """
+        self.predict_fn = predict_fn
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.requests_total = 0
+        self.rejected_total = 0
+        self.errors_total = 0
+        self.batches_total = 0
+        self.rows_total = 0
+        self.last_batch_size = 0
+        self.max_observed_batch_size = 0
+        self.predict_seconds_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def start(self) -> None:
+        """
+        Start the batching loop on the running event loop
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, row: np.ndarray):
+        """
+        Queue one feature row and wait for its prediction
+        """
+        if self._task is None:
+            self.start()
+        self.requests_total += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((row, future))
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            raise BatcherQueueFull(f"Prediction queue is full ({self.max_queue_size} rows waiting)", sys)
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            # take whatever is already queued before waiting on the window
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._batch_slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._batch_slots.release()
+                raise
+            asyncio.get_running_loop().create_task(self._score(batch))
+
+    async def _score(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        try:
+            # callers that gave up (client disconnect) do not need scoring
+            batch = [(row, future) for row, future in batch if not future.cancelled()]
+            if not batch:
+                return
+
+            matrix = np.vstack([row for row, _ in batch])
+            start_time = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(self.predict_fn):
+                    predictions = await self.predict_fn(matrix)
+                else:
+                    predictions = await asyncio.get_running_loop().run_in_executor(None, self.predict_fn, matrix)
+            except Exception as e:
+                self.errors_total += 1
+                logging.error(f"Batched prediction of {len(batch)} rows failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                self.predict_seconds_total += time.perf_counter() - start_time
+
+            self.batches_total += 1
+            self.rows_total += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_observed_batch_size = max(self.max_observed_batch_size, len(batch))
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+        finally:
+            self._batch_slots.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_queue_size": self.max_queue_size,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "queue_depth": self.queue_depth,
+            "requests_total": self.requests_total,
+            "rejected_total": self.rejected_total,
+            "errors_total": self.errors_total,
+            "batches_total": self.batches_total,
+            "rows_total": self.rows_total,
+            "mean_batch_size": self.rows_total / self.batches_total if self.batches_total else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "max_observed_batch_size": self.max_observed_batch_size,
+            "predict_seconds_total": self.predict_seconds_total,
+        }
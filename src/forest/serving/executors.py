@@ -0,0 +1,199 @@
+import asyncio
+import functools
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from src.forest.constant.application import MODEL_SERVING_IO_WORKERS, MODEL_SERVING_IO_QUEUE_SIZE, \
+    MODEL_SERVING_CPU_WORKERS, MODEL_SERVING_CPU_QUEUE_SIZE
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+
+
+class ExecutorSaturated(ForestException):
+    """
+    Raised when an executor already has its maximum number of pending jobs
+    """
+
+
+class BoundedExecutor:
+    """
+    This class wraps an executor with a cap on submitted-but-unfinished jobs.
+
+    Submissions beyond the cap fail immediately with ExecutorSaturated instead of
+    queueing without limit, so callers can answer 503 rather than hang. Callers that
+    should wait instead, e.g. a stream already being answered, use run_when_free.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_pending: int):
+        self.name = name
+        self.executor = executor
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        # (loop, future) of run_when_free callers, woken when a job frees its slot
+        self._waiters = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+            waiters, self._waiters = self._waiters, []
+        self._slots.release()
+        # done callbacks run on executor threads, the waiters are woken on their own loops
+        for loop, freed in waiters:
+            loop.call_soon_threadsafe(_set_result_once, freed)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the executor and await its result
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(f"{self.name} executor is saturated ({self.max_pending} jobs pending)", sys)
+        return await self._submit(fn, *args, **kwargs)
+
+    async def run_when_free(self, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the executor once it has a free slot and await its result
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            freed = loop.create_future()
+            # registered before trying, so a slot freed in between still wakes this caller
+            with self._pending_lock:
+                self._waiters.append((loop, freed))
+            if self._slots.acquire(blocking=False):
+                break
+            await freed
+        return await self._submit(fn, *args, **kwargs)
+
+    async def _submit(self, fn: Callable, *args, **kwargs):
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self.executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        # the slot is freed when the job finishes, even if the awaiting request was cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _set_result_once(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _init_cpu_worker() -> None:
+    """
+    Load the served model once per worker process and keep it fresh
+    """
+    from src.forest.serving.model_holder import ModelHolder
+
+    ModelHolder.default().start()
+
+
+def predict_feature_matrix(matrix, columns):
+    """
+    Score a feature matrix with the resident model of the current process
+    :return: (predictions, model version, (stage, seconds) timings of this call and of recent model loads)
+    """
+    from src.forest.serving.model_holder import ModelHolder
+
+    model_holder = ModelHolder.default()
+    model = model_holder.get_model()
+    start_time = time.perf_counter()
+    predictions = model.predict_features(matrix, columns)
+    timings = model_holder.drain_stage_timings()
+    timings.append(("model_predict", time.perf_counter() - start_time))
+    return predictions, model_holder.version, timings
+
+
+class ServingExecutors:
+    """
+    This class owns the executors used by the async request handlers.
+
+    io runs blocking network work (S3, MongoDB) on threads. cpu runs inference and batch
+    scoring in worker processes that each hold the model; with cpu_workers=0 it falls
+    back to an in-process thread pool sharing the parent's model.
+    """
+
+    def __init__(self,
+                 io_workers: int = MODEL_SERVING_IO_WORKERS,
+                 io_queue_size: int = MODEL_SERVING_IO_QUEUE_SIZE,
+                 cpu_workers: int = MODEL_SERVING_CPU_WORKERS,
+                 cpu_queue_size: int = MODEL_SERVING_CPU_QUEUE_SIZE):
+        self.io_workers = io_workers
+        self.io_queue_size = io_queue_size
+        self.cpu_workers = cpu_workers
+        self.cpu_queue_size = cpu_queue_size
+        self.io: Optional[BoundedExecutor] = None
+        self.cpu: Optional[BoundedExecutor] = None
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.cpu_workers > 0
+
+    def start(self) -> None:
+        if self.io is not None and self.cpu is not None:
+            return
+        if self.io is None:
+            self.io = BoundedExecutor("io",
+                                      ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="serving-io"),
+                                      max_pending=self.io_workers + self.io_queue_size)
+        if self.cpu is None:
+            if self.uses_processes:
+                # spawn keeps worker processes free of the parent's event loop and threads
+                executor = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                               mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=_init_cpu_worker)
+                max_pending = self.cpu_workers + self.cpu_queue_size
+            else:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="serving-cpu")
+                max_pending = 1 + self.cpu_queue_size
+            self.cpu = BoundedExecutor("cpu", executor, max_pending=max_pending)
+        logging.info(f"Started serving executors: io_workers={self.io_workers}, cpu_workers={self.cpu_workers}")
+
+    async def run_io(self, fn: Callable, *args, **kwargs):
+        self.start()
+        return await self.io.run(fn, *args, **kwargs)
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs):
+        self.start()
+        return await self.cpu.run(fn, *args, **kwargs)
+
+    async def run_io_when_free(self, fn: Callable, *args, **kwargs):
+        self.start()
+        return await self.io.run_when_free(fn, *args, **kwargs)
+
+    async def run_cpu_when_free(self, fn: Callable, *args, **kwargs):
+        self.start()
+        return await self.cpu.run_when_free(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "io_workers": self.io_workers,
+            "io_pending": 0 if self.io is None else self.io.pending,
+            "io_max_pending": self.io_workers + self.io_queue_size,
+            "cpu_workers": self.cpu_workers,
+            "cpu_pending": 0 if self.cpu is None else self.cpu.pending,
+            "cpu_max_pending": (self.cpu_workers or 1) + self.cpu_queue_size,
+        }
+
+    def shutdown(self) -> None:
+        for executor in (self.io, self.cpu):
+            if executor is not None:
+                executor.shutdown()
+        self.io = None
+        self.cpu = None
@@ -0,0 +1,153 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from src.forest.constant.application import JOBS_MAX_CONCURRENCY, JOBS_HISTORY_SIZE
+from src.forest.logger import logging
+from src.forest.serving.metrics import STAGE_LATENCY
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class JobStage:
+    name: str
+    state: str = JOB_RUNNING
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    duration_seconds: Optional[float] = None
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    state: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stages: List[JobStage] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in (JOB_QUEUED, JOB_RUNNING)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": None if self.started_at is None or self.finished_at is None
+            else self.finished_at - self.started_at,
+            "current_stage": next((stage.name for stage in reversed(self.stages) if stage.state == JOB_RUNNING), None),
+            "stages": [stage.__dict__.copy() for stage in self.stages],
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    This class runs long pipelines (training, batch prediction) as background jobs.
+
+    Jobs execute on a local worker pool with a fixed concurrency limit. Each job records
+    its state and per-stage timings so clients can poll it by id instead of holding an
+    HTTP request open for the whole pipeline.
+    """
+
+    def __init__(self, max_concurrency: int = JOBS_MAX_CONCURRENCY, history_size: int = JOBS_HISTORY_SIZE):
+        self.max_concurrency = max_concurrency
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="jobs")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Callable[[str], ContextManager]], None],
+               deduplicate: bool = False) -> Tuple[Job, bool]:
+        """
+        Queue fn as a background job
+        :param kind: Job type, e.g. "train" or "predict"
+        :param fn: Callable receiving a stage tracker, see TrainPipeline.run_pipeline
+        :param deduplicate: Return the queued or running job of the same kind instead of starting another
+        :return: (job, created) where created is False when an active job was reused
+        """
+        with self._lock:
+            if deduplicate:
+                for job in reversed(self._jobs.values()):
+                    if job.kind == kind and job.is_active:
+                        logging.info(f"Reusing active {kind} job {job.job_id}")
+                        return job, False
+            job = Job(job_id=uuid.uuid4().hex, kind=kind)
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, fn)
+        logging.info(f"Queued {kind} job {job.job_id}")
+        return job, True
+
+    def _trim_history(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active]
+        for job_id in finished[:max(len(self._jobs) - self.history_size, 0)]:
+            del self._jobs[job_id]
+
+    def _stage_tracker(self, job: Job) -> Callable[[str], ContextManager]:
+        @contextmanager
+        def track(stage_name: str):
+            stage = JobStage(name=stage_name)
+            with self._lock:
+                job.stages.append(stage)
+            try:
+                yield stage
+            except BaseException:
+                stage.state = JOB_FAILED
+                raise
+            else:
+                stage.state = JOB_SUCCEEDED
+            finally:
+                stage.finished_at = time.time()
+                stage.duration_seconds = stage.finished_at - stage.started_at
+                STAGE_LATENCY.labels(job.kind, stage_name).observe(stage.duration_seconds)
+        return track
+
+    def _run(self, job: Job, fn: Callable) -> None:
+        job.state = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            fn(self._stage_tracker(job))
+            job.state = JOB_SUCCEEDED
+            logging.info(f"{job.kind} job {job.job_id} succeeded")
+        except Exception as e:
+            job.error = str(e)
+            job.state = JOB_FAILED
+            logging.error(f"{job.kind} job {job.job_id} failed: {e}\n{traceback.format_exc()}")
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stats(self) -> Dict[str, int]:
+        jobs = self.list()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queued": sum(job.state == JOB_QUEUED for job in jobs),
+            "running": sum(job.state == JOB_RUNNING for job in jobs),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,331 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# upper bounds in seconds, from sub-millisecond model calls to multi-second model downloads
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base class of the metric families: one child per combination of label values
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str, **labels: str):
+        """
+        Return the child for these label values, creating it on first use
+        """
+        key = tuple(map(str, values)) if values else tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        return self._children[()]
+
+    def samples(self) -> Iterator[Sample]:
+        for key, child in list(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, key)))
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterator[Sample]:
+        yield name, labels, self._value
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterator[Sample]:
+        yield name, labels, self._value
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # one slot per bucket plus +Inf, kept non-cumulative so observe touches a single slot
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterator[Sample]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative = 0
+        for upper_bound, count in zip(list(self._buckets) + [float("inf")], counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _format_value(upper_bound)}, cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class _Timer:
+    """
+    Context manager observing the duration of its block into a histogram child
+    """
+
+    __slots__ = ("_child", "_start_time")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._child.observe(time.perf_counter() - self._start_time)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+
+class CallbackMetric(_Metric):
+    """
+    Metric whose samples are read from fn at scrape time, for values other objects already keep
+    (queue depth, cache counters); recording it costs nothing on the request path
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 fn: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()):
+        """
+        :param metric_type: "gauge" or "counter"
+        :param fn: Returns the current value per tuple of label values
+        """
+        self.metric_type = metric_type
+        self.fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self.fn().items():
+            if value is not None:
+                yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class MetricsRegistry:
+    """
+    This class holds the process's metrics and renders them in the Prometheus text format.
+
+    Recording only takes an uncontended per-series lock; formatting happens at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, metric_type: str,
+                 fn: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, metric_type, fn, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process-wide registry and the serving metrics recorded on the request paths
+METRICS = MetricsRegistry()
+REQUESTS = METRICS.counter("forest_http_requests_total", "HTTP requests by endpoint and status code",
+                           ["endpoint", "status"])
+REQUEST_ERRORS = METRICS.counter("forest_http_request_errors_total",
+                                 "HTTP requests answered with a 5xx status or an unhandled exception", ["endpoint"])
+REQUEST_LATENCY = METRICS.histogram("forest_http_request_duration_seconds",
+                                    "Time until the response started, by endpoint", ["endpoint"])
+REQUESTS_IN_FLIGHT = METRICS.gauge("forest_http_requests_in_flight", "HTTP requests currently being handled")
+STAGE_LATENCY = METRICS.histogram("forest_stage_duration_seconds",
+                                  "Duration of each stage of the prediction paths and of model loading",
+                                  ["path", "stage"])
+
+
+def observe_stage_timings(path: str, timings: Iterable[Tuple[str, float]]) -> None:
+    """
+    Record (stage, seconds) pairs measured elsewhere, e.g. returned by an inference worker process
+    """
+    for stage, seconds in timings:
+        STAGE_LATENCY.labels(path, stage).observe(seconds)
+
+
+def stage_timer(path: str, stage: str):
+    """
+    Context manager recording the duration of its block as one stage of path
+    """
+    return STAGE_LATENCY.labels(path, stage).time()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests, errors, latency and in-flight requests per endpoint.
+
+    The endpoint label is the name of the matched route's handler, so path parameters
+    such as job ids do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start_time = time.perf_counter()
+        response_started: Optional[float] = None
+
+        async def send_with_status(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = time.perf_counter()
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # the router stores the matched handler in the shared scope
+            endpoint = scope.get("endpoint")
+            endpoint_name = getattr(endpoint, "__name__", type(endpoint).__name__) if endpoint else "unmatched"
+            REQUESTS.labels(endpoint_name, str(status_code)).inc()
+            if status_code >= 500:
+                REQUEST_ERRORS.labels(endpoint_name).inc()
+            REQUEST_LATENCY.labels(endpoint_name).observe((response_started or time.perf_counter()) - start_time)
@@ -0,0 +1,292 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.forest.constant.application import MODEL_SERVING_REFRESH_INTERVAL_SECONDS, MODEL_SERVING_SHARED_DIR
+from src.forest.entity.config_entity import PredictionPipelineConfig
+from src.forest.entity.estimator import SensorModel
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+from src.forest.serving.shared_model import SharedModelStore
+
+if TYPE_CHECKING:
+    from src.forest.cloud_storage.aws_storage import SimpleStorageService
+
+
+class ModelHolder:
+    """
+    This class keeps one loaded SensorModel per registry object for the whole process.
+
+    The model is downloaded and unpickled once, every caller is served from memory, and a
+    background thread reloads it only when the registry object's version (ETag) changes.
+    With a shared_store, the compiled forest is published once per version and memory-mapped,
+    so the processes of one host share a single copy of it.
+    """
+
+    _holders: Dict[Tuple[str, str], "ModelHolder"] = {}
+    _holders_lock = threading.Lock()
+
+    def __init__(self, bucket_name: str, model_path: str,
+                 refresh_interval: float = MODEL_SERVING_REFRESH_INTERVAL_SECONDS,
+                 storage: Optional["SimpleStorageService"] = None,
+                 shared_store: Optional[SharedModelStore] = None):
+        """
+        :param bucket_name: Name of your model bucket
+        :param model_path: Location of your model in bucket
+        :param refresh_interval: Seconds between two version checks of the registry object
+        :param storage: Storage service used to reach the registry, created on first use when None
+        :param shared_store: Where compiled forests are shared with the host's other processes, None keeps
+                             a private copy of the unpickled model
+        """
+        self.bucket_name = bucket_name
+        self.model_path = model_path
+        self.refresh_interval = refresh_interval
+        self._storage = storage
+        self.shared_store = shared_store
+        # (model, version) is swapped as one tuple so readers never see a mismatched pair
+        self._current: Tuple[Optional[SensorModel], Optional[str]] = (None, None)
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        # (stage, seconds) of recent loads, collected by the caller that reports metrics
+        self._stage_timings: deque = deque(maxlen=64)
+
+    @classmethod
+    def get(cls, bucket_name: str, model_path: str) -> "ModelHolder":
+        """
+        Return the process-wide holder for bucket_name/model_path, creating it on first use
+        """
+        key = (bucket_name, model_path)
+        holder = cls._holders.get(key)
+        if holder is None:
+            with cls._holders_lock:
+                holder = cls._holders.get(key)
+                if holder is None:
+                    shared_store = SharedModelStore(MODEL_SERVING_SHARED_DIR) if MODEL_SERVING_SHARED_DIR else None
+                    holder = cls(bucket_name=bucket_name, model_path=model_path, shared_store=shared_store)
+                    cls._holders[key] = holder
+        return holder
+
+    @classmethod
+    def default(cls) -> "ModelHolder":
+        """
+        Return the holder for the model registry configured in PredictionPipelineConfig
+        """
+        config = PredictionPipelineConfig()
+        return cls.get(bucket_name=config.model_bucket_name, model_path=config.model_file_path)
+
+    @property
+    def storage(self) -> "SimpleStorageService":
+        if self._storage is None:
+            # boto3 is imported with the first S3 storage client, not with the serving modules
+            from src.forest.cloud_storage.aws_storage import SimpleStorageService
+
+            self._storage = SimpleStorageService()
+        return self._storage
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._current[1]
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._current[0] is not None
+
+    def get_model(self) -> SensorModel:
+        """
+        Return the in-memory model. Concurrent first callers wait on a single load.
+        """
+        model = self._current[0]
+        if model is None:
+            with self._load_lock:
+                if self._current[0] is None:
+                    self._load()
+                model = self._current[0]
+        return model
+
+    @contextmanager
+    def _track_stage(self, stage_name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stage_timings.append((stage_name, time.perf_counter() - start_time))
+
+    def drain_stage_timings(self) -> List[Tuple[str, float]]:
+        """
+        Return and forget the (stage, seconds) timings of the loads since the last call
+        """
+        timings = []
+        while self._stage_timings:
+            timings.append(self._stage_timings.popleft())
+        return timings
+
+    def _load(self, version: Optional[str] = None) -> None:
+        """
+        Map the shared copy of the registry model, or download and unpickle it.
+        Must be called with _load_lock held.
+        """
+        try:
+            # Read the version before the body: if the object changes in between,
+            # the next refresh sees a newer version and simply reloads again.
+            if version is None:
+                with self._track_stage("model_version_check"):
+                    version = self.storage.get_object_version(self.bucket_name, self.model_path)
+            model = None
+            if self.shared_store is not None and version is not None:
+                try:
+                    with self._track_stage("model_map"):
+                        model = self.shared_store.open(self.bucket_name, self.model_path, version)
+                except Exception as e:
+                    logging.warning(f"Cannot map the shared copy of version {version}, downloading it: {e}")
+            if model is None:
+                model = self._download(version)
+            self._current = (model, version)
+            logging.info(f"Loaded model {model} at version {version}")
+        except Exception as e:
+            raise ForestException(f"Model not found at {self.model_path} in bucket {self.bucket_name}: {e}", sys) from e
+
+    def _download(self, version: Optional[str]) -> SensorModel:
+        logging.info(f"Loading model {self.model_path} from bucket {self.bucket_name} at version {version}")
+        model = self.storage.load_model(self.model_path, bucket_name=self.bucket_name,
+                                        stage_tracker=self._track_stage)
+        if isinstance(model, SensorModel) and getattr(model, "fused_forest", None) is None:
+            # registry models trained before compiled forests existed are compiled on load
+            with self._track_stage("model_compile"):
+                model.compile_forest()
+        if self.shared_store is None or version is None or not isinstance(model, SensorModel):
+            return model
+        try:
+            with self._track_stage("model_share"):
+                shared_model = self.shared_store.publish(model, self.bucket_name, self.model_path, version)
+        except Exception as e:
+            logging.warning(f"Cannot share model {model} at version {version}, keeping a private copy: {e}")
+            return model
+        if shared_model is None:
+            logging.info(f"Model {model} has no fused forest to share, keeping a private copy")
+            return model
+        return shared_model
+
+    def refresh(self) -> bool:
+        """
+        Reload the model if the registry object changed since it was loaded
+        :return: True when a new version was loaded
+        """
+        with self._track_stage("model_version_check"):
+            latest_version = self.storage.get_object_version(self.bucket_name, self.model_path)
+        if latest_version == self.version:
+            return False
+        with self._load_lock:
+            if latest_version == self.version:
+                return False
+            self._load(version=latest_version)
+        return True
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"Model refresh failed, keeping version {self.version}: {e}")
+
+    def start(self) -> None:
+        """
+        Load the model eagerly and start the background refresh thread
+        """
+        try:
+            self.get_model()
+        except Exception as e:
+            # the next get_model() call retries, so a cold registry does not stop the app
+            logging.warning(f"Initial model load failed: {e}")
+
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._stop_event.clear()
+            self._refresh_thread = threading.Thread(target=self._refresh_loop,
+                                                    name="model-holder-refresh",
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
+
+
+class ModelVersionWatcher:
+    """
+    This class follows the registry version of a model without loading it.
+
+    When inference runs in worker processes, each worker holds its own ModelHolder and the
+    serving process has no model to ask. The watcher gives it the version the workers are
+    moving to, from one HEAD request per refresh interval, so that the prediction cache
+    stops serving the previous model's predictions as soon as a new model is pushed.
+    """
+
+    def __init__(self, bucket_name: str, model_path: str,
+                 refresh_interval: float = MODEL_SERVING_REFRESH_INTERVAL_SECONDS,
+                 storage: Optional["SimpleStorageService"] = None):
+        """
+        :param bucket_name: Name of your model bucket
+        :param model_path: Location of your model in bucket
+        :param refresh_interval: Seconds between two version checks of the registry object
+        :param storage: Storage service used to reach the registry, created on first use when None
+        """
+        self.bucket_name = bucket_name
+        self.model_path = model_path
+        self.refresh_interval = refresh_interval
+        self._storage = storage
+        self.version: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def default(cls) -> "ModelVersionWatcher":
+        """
+        Return a watcher of the model registry configured in PredictionPipelineConfig
+        """
+        config = PredictionPipelineConfig()
+        return cls(bucket_name=config.model_bucket_name, model_path=config.model_file_path)
+
+    @property
+    def storage(self) -> "SimpleStorageService":
+        if self._storage is None:
+            from src.forest.cloud_storage.aws_storage import SimpleStorageService
+
+            self._storage = SimpleStorageService()
+        return self._storage
+
+    def check(self) -> Optional[str]:
+        """
+        Read the current version of the registry object, keeping the last one known when it cannot be read
+        """
+        try:
+            self.version = self.storage.get_object_version(self.bucket_name, self.model_path)
+        except Exception as e:
+            logging.warning(f"Model version check failed, keeping version {self.version}: {e}")
+        return self.version
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            self.check()
+
+    def start(self) -> None:
+        """
+        Read the version eagerly and start the background check thread
+        """
+        self.check()
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._stop_event.clear()
+            self._refresh_thread = threading.Thread(target=self._refresh_loop,
+                                                    name="model-version-watcher",
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.forest.constant.application import MODEL_SERVING_CACHE_MAX_SIZE, MODEL_SERVING_CACHE_TTL_SECONDS
+from src.forest.logger import logging
+
+# replaced model versions remembered, so that lagging workers cannot switch the cache back to them
+RETIRED_VERSIONS_MAX_SIZE = 16
+
+
+class PredictionCache:
+    """
+    This class caches predictions per assembled feature vector and served model version.
+
+    Entries are kept in least-recently-used order, bounded by max_size and expired after
+    ttl_seconds. The cache follows the served model: as soon as a lookup or a stored result
+    reports a different model version, every entry is dropped. Replaced versions are retired:
+    results of workers still serving one are not cached and do not switch the cache back,
+    unless the registry itself changes back to it (a rollback).
+    """
+
+    def __init__(self, max_size: int = MODEL_SERVING_CACHE_MAX_SIZE,
+                 ttl_seconds: float = MODEL_SERVING_CACHE_TTL_SECONDS):
+        """
+        :param max_size: Maximum cached rows, 0 disables the cache
+        :param ttl_seconds: Seconds a cached prediction stays valid
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.model_version: Optional[str] = None
+        # last version read from the registry by the serving process, and versions replaced since
+        self._current_version: Optional[str] = None
+        self._retired_versions: "OrderedDict[str, None]" = OrderedDict()
+        # (model version, row bytes) -> (prediction, expiry time)
+        self._entries: "OrderedDict[Tuple[Optional[str], bytes], Tuple[Hashable, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits_total = 0
+        self.misses_total = 0
+        self.evictions_total = 0
+        self.expirations_total = 0
+        self.invalidations_total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def row_keys(matrix: np.ndarray) -> List[bytes]:
+        """
+        Return one key per row; -0.0 and every NaN payload are normalized so equal inputs share a key
+        """
+        normalized = np.ascontiguousarray(matrix, dtype=np.float64) + 0.0
+        normalized[np.isnan(normalized)] = np.nan
+        return [row.tobytes() for row in normalized]
+
+    def observe_version(self, model_version: Optional[str], current: bool = False) -> None:
+        """
+        Record the served model version, dropping every entry when it changed
+        :param current: model_version was read from the registry by the serving process itself, rather than
+                        reported by a worker that may lag behind; a new current version is always followed,
+                        even one retired before (a rollback), and a worker version is ignored once retired
+        """
+        if model_version is None or (model_version == self.model_version
+                                     and (not current or model_version == self._current_version)):
+            return
+        with self._lock:
+            if current:
+                if model_version == self._current_version:
+                    # unchanged in the registry, and possibly already replaced by a newer version a worker reported
+                    return
+                self._current_version = model_version
+            elif model_version in self._retired_versions:
+                return
+            if model_version == self.model_version:
+                return
+            self._retired_versions.pop(model_version, None)
+            if self.model_version is not None:
+                self._retired_versions[self.model_version] = None
+                while len(self._retired_versions) > RETIRED_VERSIONS_MAX_SIZE:
+                    self._retired_versions.popitem(last=False)
+            if self._entries:
+                self.invalidations_total += 1
+                logging.info(f"Model version changed from {self.model_version} to {model_version}, "
+                             f"dropping {len(self._entries)} cached predictions")
+            self._entries.clear()
+            self.model_version = model_version
+
+    def lookup(self, matrix: np.ndarray, model_version: Optional[str] = None) \
+            -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+        """
+        Look up every row of matrix at once
+        :param model_version: Current registry version when known, otherwise the last one observed is used
+        :return: (predictions, hit mask, model version of the hits); predictions is an object array
+                 holding None for misses
+        """
+        self.observe_version(model_version, current=True)
+        predictions = np.full(len(matrix), None, dtype=object)
+        hits = np.zeros(len(matrix), dtype=bool)
+        if not self.enabled:
+            return predictions, hits, self.model_version
+
+        keys = self.row_keys(matrix)
+        now = time.monotonic()
+        with self._lock:
+            model_version = self.model_version
+            for position, key in enumerate(keys):
+                entry_key = (model_version, key)
+                entry = self._entries.get(entry_key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[entry_key]
+                    self.expirations_total += 1
+                    continue
+                self._entries.move_to_end(entry_key)
+                predictions[position] = entry[0]
+                hits[position] = True
+            n_hits = int(hits.sum())
+            self.hits_total += n_hits
+            self.misses_total += len(keys) - n_hits
+        return predictions, hits, model_version
+
+    def store(self, matrix: np.ndarray, predictions: Sequence, model_version: Optional[str]) -> None:
+        """
+        Cache the predictions of matrix computed with model_version
+        """
+        self.observe_version(model_version)
+        if not self.enabled or model_version is None:
+            return
+
+        keys = self.row_keys(matrix)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if model_version != self.model_version:
+                # a newer model was observed while these rows were scored, or a worker still serves a retired one
+                return
+            for key, prediction in zip(keys, predictions):
+                entry_key = (model_version, key)
+                self._entries[entry_key] = (prediction, expires_at)
+                self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions_total += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits_total + self.misses_total
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "model_version": self.model_version,
+            "hits_total": self.hits_total,
+            "misses_total": self.misses_total,
+            "hit_rate": self.hits_total / lookups if lookups else 0.0,
+            "evictions_total": self.evictions_total,
+            "expirations_total": self.expirations_total,
+            "invalidations_total": self.invalidations_total,
+        }
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import re
+import sys
+from typing import Optional
+
+from src.forest.entity.estimator import MappedSensorModel, SensorModel
+from src.forest.entity.model_bundle import MODEL_BUNDLE_SUFFIX
+from src.forest.exception import ForestException
+from src.forest.logger import logging
+
+
+class SharedModelStore:
+    """
+    This class publishes the compiled forest of each registry model version once per host,
+    for every serving process to memory-map.
+
+    The first process that loads a version writes the fused forest as a model bundle under
+    directory; the others find it there, map it read-only and skip the download and unpickling
+    altogether. The OS page cache then holds a single copy of the trees whatever the number
+    of uvicorn workers and inference processes.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Host-local directory shared by the serving processes, e.g. under /dev/shm
+        """
+        self.directory = directory
+
+    def bundle_path(self, bucket_name: str, model_path: str, version: str) -> str:
+        """
+        Return the path of the bundle holding this registry object version
+        """
+        digest = hashlib.sha256(f"{bucket_name}/{model_path}@{version}".encode()).hexdigest()[:16]
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.splitext(os.path.basename(model_path))[0]) or "model"
+        return os.path.join(self.directory, f"{name}-{digest}{MODEL_BUNDLE_SUFFIX}")
+
+    def open(self, bucket_name: str, model_path: str, version: str) -> Optional[MappedSensorModel]:
+        """
+        Map the published bundle of this version, or return None when no process published it yet
+        """
+        bundle_path = self.bundle_path(bucket_name, model_path, version)
+        if not os.path.isfile(bundle_path):
+            return None
+        # published by a serving process from a model it already serves, the schema check is not repeated
+        model = MappedSensorModel.load_bundle(bundle_path, schema_file_path=None)
+        logging.info(f"Mapped shared model {model} at version {version} from {bundle_path}")
+        return model
+
+    def publish(self, model: SensorModel, bucket_name: str, model_path: str,
+                version: str) -> Optional[MappedSensorModel]:
+        """
+        Write the bundle of model unless another process already did, then map it
+        :return: The mapped model, or None when model has no fused forest to share
+        """
+        try:
+            bundle_path = self.bundle_path(bucket_name, model_path, version)
+            if not os.path.isfile(bundle_path):
+                # ModelBundle.write renames a complete file into place, so readers never map a partial one
+                if not model.save_bundle(bundle_path):
+                    return None
+                logging.info(f"Published shared model {model} at version {version} to {bundle_path}")
+            return self.open(bucket_name, model_path, version)
+        except Exception as e:
+            raise ForestException(e, sys) from e
@@ -0,0 +1,150 @@
+import csv
+import io
+import sys
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import pandas as pd
+
+from src.forest.constant.application import MODEL_SERVING_STREAM_CHUNK_ROWS
+from src.forest.exception import ForestException
+
+CSV_FORMAT = "csv"
+NDJSON_FORMAT = "ndjson"
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl",
+                        "application/x-jsonlines", "application/json-lines")
+
+
+class StreamFormatError(ForestException):
+    """
+    Raised when an uploaded record stream cannot be parsed
+    """
+
+
+def stream_format(content_type: Optional[str]) -> str:
+    """
+    Return NDJSON_FORMAT for newline-delimited JSON content types and CSV_FORMAT otherwise
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return NDJSON_FORMAT if media_type in NDJSON_CONTENT_TYPES else CSV_FORMAT
+
+
+class RecordChunker:
+    """
+    This class splits an incoming CSV or NDJSON byte stream into DataFrames of about chunk_rows rows.
+
+    Bytes are buffered only up to the last complete line, and complete lines are parsed
+    once chunk_rows of them are pending, so memory stays bounded by the chunk size
+    whatever the length of the stream. feed_blocks and close_blocks only split the bytes
+    into blocks of lines, so that parse_block can run off the event loop.
+    """
+
+    def __init__(self, data_format: str = CSV_FORMAT, chunk_rows: int = MODEL_SERVING_STREAM_CHUNK_ROWS):
+        """
+        :param data_format: CSV_FORMAT (first line is the header) or NDJSON_FORMAT (one JSON object per line)
+        :param chunk_rows: Rows per parsed DataFrame
+        """
+        if data_format not in (CSV_FORMAT, NDJSON_FORMAT):
+            raise StreamFormatError(f"Unsupported stream format {data_format}", sys)
+        self.data_format = data_format
+        self.chunk_rows = chunk_rows
+        self.header: Optional[List[str]] = None
+        self.rows_total = 0
+        self.bytes_total = 0
+        self._partial_line = bytearray()
+        self._pending_blocks: List[bytes] = []
+        self._pending_rows = 0
+
+    def feed(self, data: bytes) -> List[pd.DataFrame]:
+        """
+        Add bytes from the stream and return the chunks that became complete
+        """
+        return self._parse_blocks(self.feed_blocks(data))
+
+    def close(self) -> List[pd.DataFrame]:
+        """
+        Return the remaining rows once the stream has ended
+        """
+        return self._parse_blocks(self.close_blocks())
+
+    def feed_blocks(self, data: bytes) -> List[bytes]:
+        """
+        Add bytes from the stream and return the blocks of lines that became complete, see parse_block
+        """
+        self.bytes_total += len(data)
+        self._partial_line += data
+        end_of_lines = self._partial_line.rfind(b"\n")
+        if end_of_lines < 0:
+            return []
+        block = bytes(self._partial_line[:end_of_lines + 1])
+        del self._partial_line[:end_of_lines + 1]
+
+        if self.data_format == CSV_FORMAT and self.header is None:
+            header_line, _, block = block.partition(b"\n")
+            self.header = self._parse_header(header_line)
+        self._pending_blocks.append(block)
+        self._pending_rows += block.count(b"\n")
+        if self._pending_rows < self.chunk_rows:
+            return []
+        return self._take_pending()
+
+    def close_blocks(self) -> List[bytes]:
+        """
+        Return the remaining blocks of lines once the stream has ended
+        """
+        blocks = []
+        if self._partial_line.strip():
+            # the last line has no newline; terminating it may complete a chunk of its own
+            blocks += self.feed_blocks(b"\n")
+        self._partial_line.clear()
+        return blocks + self._take_pending()
+
+    @staticmethod
+    def _parse_header(header_line: bytes) -> List[str]:
+        header = next(csv.reader([header_line.decode("utf-8-sig").strip()]), [])
+        if not header:
+            raise StreamFormatError("CSV stream has an empty header line", sys)
+        return header
+
+    def _take_pending(self) -> List[bytes]:
+        block = b"".join(self._pending_blocks)
+        self._pending_blocks = []
+        self._pending_rows = 0
+        return [block] if block.strip() else []
+
+    def _parse_blocks(self, blocks: List[bytes]) -> List[pd.DataFrame]:
+        return [self.parse_block(block) for block in blocks]
+
+    def parse_block(self, block: bytes) -> pd.DataFrame:
+        """
+        Parse a block returned by feed_blocks or close_blocks; blocks must be parsed in the order they were returned
+        """
+        try:
+            if self.data_format == CSV_FORMAT:
+                dataframe = pd.read_csv(io.BytesIO(block), header=None, names=self.header)
+            else:
+                dataframe = pd.read_json(io.BytesIO(block), lines=True)
+        except Exception as e:
+            raise StreamFormatError(f"Cannot parse {self.data_format} rows after row {self.rows_total}: {e}",
+                                    sys) from e
+        dataframe.index += self.rows_total
+        self.rows_total += len(dataframe)
+        return dataframe
+
+
+async def iter_record_chunks(byte_stream: AsyncIterator[bytes], chunker: RecordChunker,
+                             run_parse: Optional[Callable[..., Awaitable]] = None) -> AsyncIterator[pd.DataFrame]:
+    """
+    Yield the DataFrames parsed from byte_stream, e.g. Request.stream(), as they complete
+    :param run_parse: Awaitable runner of chunker.parse_block, e.g. ServingExecutors.run_io_when_free to keep
+                      parsing off the event loop; None parses in place
+    """
+    async def parse(block: bytes) -> pd.DataFrame:
+        if run_parse is None:
+            return chunker.parse_block(block)
+        return await run_parse(chunker.parse_block, block)
+
+    async for data in byte_stream:
+        for block in chunker.feed_blocks(data):
+            yield await parse(block)
+    for block in chunker.close_blocks():
+        yield await parse(block)
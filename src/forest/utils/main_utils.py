@@ -1,7 +1,6 @@
 import os.path # it helps use to do the file path operation like getting the directory, checkign the existence of the directory or file
 import sys # used for accessing command line arguments and system-specific parameters
 import numpy as np # used for numerical operations and handling arrays
-import dill # used for serializing and deserializing Python objects
 import yaml # for readging the configuration files in YAML format
 from src.forest.exception import ForestException
 from src.forest.logger import logging
@@ -34,6 +33,8 @@ def load_object(file_path: str) -> object:
 
     try:
 
+        import dill # used for serializing and deserializing Python objects, loaded on first use
+
         with open(file_path, "rb") as file_obj:
             obj = dill.load(file_obj)
 
@@ -76,6 +77,8 @@ def save_object(file_path: str, obj: object) -> None:
     logging.info("Entered the save_object method of MainUtils class")
     
     try:
+        import dill # used for serializing and deserializing Python objects, loaded on first use
+
         os.makedirs(os.path.dirname(file_path), exist_ok = True)
         with open(file_path, "wb") as file_obj:
             dill.dump(obj, file_obj)
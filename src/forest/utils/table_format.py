@@ -0,0 +1,209 @@
+import os
+import shutil
+import sys
+import tempfile
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Mapping, Tuple, Union
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.forest.constant.prediction_pipeline import PREDICTION_COLUMN_DTYPES
+from src.forest.exception import ForestException
+
+if TYPE_CHECKING:
+    import pyarrow
+
+CSV = "csv"
+PARQUET = "parquet"
+# Arrow IPC streaming format, which unlike Parquet can be read and written without seeking
+ARROW = "arrow"
+TABLE_FORMATS = (CSV, PARQUET, ARROW)
+
+FORMAT_EXTENSIONS = {".csv": CSV, ".parquet": PARQUET, ".pq": PARQUET, ".arrow": ARROW, ".arrows": ARROW,
+                     ".ipc": ARROW, ".feather": ARROW}
+# codec of Parquet pages and Arrow IPC buffers
+TABLE_COMPRESSION = "zstd"
+# rows encoded at a time when a whole DataFrame is written, bounding the memory of its encoding
+WRITE_CHUNK_ROWS = 50000
+# Arrow IPC files (as opposed to streams) start with this and need random access, like Parquet
+ARROW_FILE_MAGIC = b"ARROW1"
+
+# a chunk encoded for TableWriter: CSV text or an Arrow table with compact dtypes
+EncodedChunk = Union[bytes, "pyarrow.Table"]
+
+
+def _pyarrow():
+    # pyarrow is optional and slow to import, CSV files never need it
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ForestException("Parquet and Arrow files need pyarrow, install it with `pip install pyarrow`", sys) from e
+    return pyarrow
+
+
+def table_format_for(path: str, table_format: str = "") -> str:
+    """
+    Return table_format when set, else the format implied by the extension of path, CSV by default
+    """
+    if table_format:
+        if table_format not in TABLE_FORMATS:
+            raise ForestException(f"Unknown table format {table_format}, expected one of {TABLE_FORMATS}", sys)
+        return table_format
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), CSV)
+
+
+def to_arrow(dataframe: DataFrame, dtypes: Mapping[str, str] = PREDICTION_COLUMN_DTYPES) -> "pyarrow.Table":
+    """
+    Convert dataframe to an Arrow table with the compact dtypes given for its columns.
+    Every chunk of a file gets the same dtypes, so a value that does not fit its column's
+    dtype raises a ForestException naming the column, whichever chunk it is in.
+    """
+    pyarrow = _pyarrow()
+    table = pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        dtype = dtypes.get(name)
+        if dtype is not None and column.type != dtype:
+            try:
+                column = column.cast(dtype)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError) as e:
+                value_range = pyarrow.compute.min_max(column).as_py()
+                raise ForestException(f"Column {name} holds values from {value_range['min']} to "
+                                      f"{value_range['max']} that do not fit its {dtype} dtype, "
+                                      f"change it in PREDICTION_COLUMN_DTYPES: {e}", sys) from e
+        columns.append(column)
+    return pyarrow.Table.from_arrays(columns, names=table.column_names)
+
+
+def _seekable(stream: BinaryIO) -> BinaryIO:
+    # Parquet footers and Arrow IPC files are read from the end, an S3 body is spilled to disk first
+    if stream.seekable():
+        return stream
+    spill_file = tempfile.TemporaryFile()
+    shutil.copyfileobj(stream, spill_file, 1024 * 1024)
+    spill_file.seek(0)
+    return spill_file
+
+
+def _open_arrow(stream: BinaryIO, table_format: str,
+                chunk_size: int) -> Tuple["pyarrow.Schema", Iterator["pyarrow.RecordBatch"]]:
+    pyarrow = _pyarrow()
+    if table_format == PARQUET:
+        parquet_file = pyarrow.parquet.ParquetFile(_seekable(stream))
+        batch_size = chunk_size or max(parquet_file.metadata.num_rows, 1)
+        return parquet_file.schema_arrow, parquet_file.iter_batches(batch_size=batch_size)
+    if hasattr(stream, "peek") and stream.peek(len(ARROW_FILE_MAGIC))[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+        reader = pyarrow.ipc.open_file(_seekable(stream))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        reader = pyarrow.ipc.open_stream(stream)
+        batches = iter(reader)
+    if not chunk_size:
+        return reader.schema, batches
+    # batches are cut at chunk_size rows whatever size they were written with
+    return reader.schema, (batch.slice(offset, chunk_size)
+                           for batch in batches for offset in range(0, batch.num_rows, chunk_size))
+
+
+def read_table_chunks(stream: BinaryIO, table_format: str, chunk_size: int) -> Iterator[DataFrame]:
+    """
+    Read a table file as DataFrames of at most chunk_size rows, indexed by row number in the file
+    :param chunk_size: Rows per DataFrame, 0 reads the whole file as one DataFrame
+    """
+    if table_format == CSV:
+        if not chunk_size:
+            yield pd.read_csv(stream, na_values="na")
+            return
+        with pd.read_csv(stream, chunksize=chunk_size, na_values="na") as reader:
+            yield from reader
+        return
+
+    schema, batches = _open_arrow(stream, table_format, chunk_size)
+    first_row = 0
+    for batch in batches:
+        dataframe = batch.to_pandas()
+        dataframe.index += first_row
+        first_row += len(dataframe)
+        yield dataframe
+    if not first_row:
+        # a file without rows still yields its columns, like a CSV file holding only a header
+        yield schema.empty_table().to_pandas()
+
+
+def read_table(stream: BinaryIO, table_format: str) -> DataFrame:
+    return pd.concat(list(read_table_chunks(stream, table_format, chunk_size=0)))
+
+
+def encode_chunk(dataframe: DataFrame, table_format: str, header: bool) -> EncodedChunk:
+    """
+    Encode dataframe for TableWriter; done by scoring workers so that the writing process only copies bytes
+    :param header: Whether a CSV chunk starts with the header line, i.e. is the first one of its file
+    """
+    if table_format == CSV:
+        return dataframe.to_csv(index=False, header=header).encode()
+    return to_arrow(dataframe)
+
+
+class TableWriter:
+    """
+    This class writes encoded chunks to a binary file object as one CSV, Parquet or Arrow IPC stream file.
+
+    Parquet and Arrow files take their schema from the first chunk. Columns of PREDICTION_COLUMN_DTYPES
+    have the same dtype in every chunk (see to_arrow); later chunks are cast to the schema, so that a
+    column of another type that is only null in some chunks keeps one type.
+    """
+
+    def __init__(self, sink: BinaryIO, table_format: str):
+        self.sink = sink
+        self.table_format = table_format
+        self.schema = None
+        self._writer = None
+
+    def write(self, chunk: EncodedChunk) -> None:
+        if self.table_format == CSV:
+            self.sink.write(chunk)
+            return
+        pyarrow = _pyarrow()
+        if self._writer is None:
+            self.schema = chunk.schema
+            if self.table_format == PARQUET:
+                self._writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression=TABLE_COMPRESSION)
+            else:
+                options = pyarrow.ipc.IpcWriteOptions(compression=TABLE_COMPRESSION)
+                self._writer = pyarrow.ipc.new_stream(self.sink, self.schema, options=options)
+        elif not chunk.schema.equals(self.schema, check_metadata=False):
+            chunk = chunk.cast(self.schema)
+        self._writer.write_table(chunk)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def write_dataframe(dataframe: DataFrame, sink: BinaryIO, table_format: str,
+                    chunk_rows: int = WRITE_CHUNK_ROWS) -> None:
+    """
+    Write dataframe to a binary file object, encoding chunk_rows rows at a time
+    """
+    with TableWriter(sink, table_format) as writer:
+        for start in range(0, max(len(dataframe), 1), chunk_rows):
+            writer.write(encode_chunk(dataframe.iloc[start:start + chunk_rows], table_format, header=start == 0))
+
+
+def write_table(dataframe: DataFrame, file_path: str, table_format: str) -> None:
+    try:
+        with open(file_path, "wb") as file_obj:
+            write_dataframe(dataframe, file_obj, table_format)
+    except Exception as e:
+        raise ForestException(e, sys) from e
@@ -2,44 +2,36 @@
 Verification script to check model requirements and test prediction
 """
 
-import boto3
-import tempfile
-import os
 import pandas as pd
 import numpy as np
-from src.forest.utils.main_utils import load_object
+from src.forest.cloud_storage.aws_storage import SimpleStorageService
+from src.forest.constant.s3_bucket import TRAINING_BUCKET_NAME
+from src.forest.entity.s3_estimator import MODEL_ARTIFACT_NAME
 
 def verify_model_features():
     """Verify what features the model expects"""
     try:
         print("🔍 Starting model feature verification...")
         
-        # Connect to S3 and download model
-        s3_client = boto3.client('s3', region_name='eu-north-1')
-        response = s3_client.list_objects_v2(Bucket="shayanforest")
+        # Connect to the configured storage backend and find the model
+        storage = SimpleStorageService()
+        model_key = storage.find_artifact(TRAINING_BUCKET_NAME, MODEL_ARTIFACT_NAME)
         
-        model_key = None
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                if '.pkl' in key and 'model' in key.lower():
-                    model_key = key
+        if not model_key:
+            # models pushed before the artifact manifest existed are only found by listing the bucket
+            for obj in storage.backend.list(TRAINING_BUCKET_NAME):
+                if '.pkl' in obj.key and 'model' in obj.key.lower():
+                    model_key = obj.key
                     break
         
         if not model_key:
-            print("❌ No model file found in S3")
+            print("❌ No model file found in storage")
             return False
         
         print(f"✅ Found model at: {model_key}")
         
-        # Download model
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pkl')
-        temp_file.close()
-        temp_model_path = temp_file.name
-        s3_client.download_file("shayanforest", model_key, temp_model_path)
-        
-        # Load model and inspect
-        model = load_object(temp_model_path)
+        # Load model (served from the local artifact cache when unchanged) and inspect
+        model = storage.load_model(model_key, bucket_name=TRAINING_BUCKET_NAME)
         print(f"✅ Model loaded successfully")
         
         # Check model properties
@@ -101,9 +93,6 @@ def verify_model_features():
         cover_type = cover_types.get(int(prediction), f"Unknown ({prediction})")
         print(f"🎯 Test prediction successful: {cover_type}")
         
-        # Clean up
-        os.unlink(temp_model_path)
-        
         print("\n✅ Verification completed successfully!")
         return True
         